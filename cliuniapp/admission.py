@@ -0,0 +1,81 @@
+"""
+Admission control for the web servers: a bounded queue in front of the workers
+"""
+
+import threading
+from contextlib import nullcontext
+from typing import ContextManager, Optional
+
+# Requests allowed to wait for a worker unless configured otherwise
+DEFAULT_MAX_QUEUE = 64
+
+# Seconds a turned-away client is asked to wait before retrying
+DEFAULT_RETRY_AFTER = 1
+
+_BUSY_BODY = b'{"success": false, "message": "Server busy, please try again shortly"}'
+
+
+def busy_response(retry_after: int) -> bytes:
+    """Complete 503 response sent to requests over the limit"""
+    return (b"HTTP/1.1 503 Service Unavailable\r\n"
+            b"Content-Type: application/json\r\n"
+            b"Retry-After: %d\r\n"
+            b"Content-Length: %d\r\n"
+            b"Connection: close\r\n"
+            b"\r\n" % (retry_after, len(_BUSY_BODY))) + _BUSY_BODY
+
+
+class AdmissionControl:
+    """Bound on the work a server accepts: max_in_flight running plus max_queue waiting
+
+    Servers call admit() before handing work to their worker pool and get
+    None back once the pool and queue are full, so the work can be answered
+    straight away with ``busy`` instead of waiting unpredictably. Admitted
+    work calls started() when a worker picks it up and finished() when done.
+
+    With a metrics registry, time spent waiting is recorded as the
+    ``web_queue`` timer (its in-flight gauge is the queue depth) and every
+    turned-away request counts towards ``web_rejected_total``.
+    """
+
+    def __init__(self, max_in_flight: int, max_queue: int = DEFAULT_MAX_QUEUE,
+                 retry_after: int = DEFAULT_RETRY_AFTER, metrics=None):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.busy = busy_response(retry_after)
+        self.metrics = metrics
+        self._lock = threading.Lock()
+        self.admitted = 0
+        self.running = 0
+
+    @property
+    def queued(self) -> int:
+        """Admitted work still waiting for a worker"""
+        return self.admitted - self.running
+
+    def admit(self) -> Optional[ContextManager]:
+        """Reserve a place, returning a ticket for started(), or None if the server is full"""
+        with self._lock:
+            full = self.admitted >= self.max_in_flight + self.max_queue
+            if not full:
+                self.admitted += 1
+        if full:
+            if self.metrics is not None:
+                self.metrics.count('web_rejected')
+            return None
+        # The ticket times the wait: entered here, exited when a worker starts
+        ticket = self.metrics.timer('web_queue') if self.metrics is not None else nullcontext()
+        ticket.__enter__()
+        return ticket
+
+    def started(self, ticket: ContextManager) -> None:
+        """A worker has picked up admitted work"""
+        with self._lock:
+            self.running += 1
+        ticket.__exit__(None, None, None)
+
+    def finished(self) -> None:
+        """Admitted work is done, freeing its place"""
+        with self._lock:
+            self.running -= 1
+            self.admitted -= 1
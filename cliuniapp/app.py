@@ -6,10 +6,10 @@ Main application loop with University menu
 
 from controllers.university_controller import UniversityController
 
-def main():
+def main(db=None):
     """Main application entry point"""
     print("Welcome to CLI University System")
-    controller = UniversityController()
+    controller = UniversityController(db)
     controller.run()
 
 if __name__ == "__main__":
@@ -0,0 +1,228 @@
+"""
+asyncio HTTP/1.1 server for the web GUI
+
+Connections are owned by a single event loop, so idle keep-alive
+connections cost a socket and a small coroutine rather than a worker
+thread. Each request is parsed on the loop and then dispatched to the same
+``do_GET``/``do_POST`` methods as the threaded server, run on a thread pool
+because the storage backends block. The handler writes its response into a
+buffer which the loop sends with a Content-Length so the connection can be
+reused. Handlers that stream a response flush the buffer as they go; those
+writes are handed to the loop and already carry their own framing. A handler
+that sets ``detached`` to a Future carries on from a thread of its own
+after its worker returns; the connection stays open until the Future is set.
+"""
+
+import asyncio
+import io
+import os
+import socket
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+# Largest request line plus headers accepted, like http.server's 64 KiB line limit
+MAX_HEAD_BYTES = 1 << 16
+
+
+class _ResponseWriter(io.BytesIO):
+    """Response buffer for a handler running on a worker thread
+
+    flush() sends what has been written so far through the event loop and
+    blocks until the client has taken it, so a streaming handler is paced by
+    the client. Anything left over is sent once the handler returns.
+    """
+
+    def __init__(self, loop, writer):
+        super().__init__()
+        self.loop = loop
+        self.writer = writer
+        self.streamed = False
+
+    def flush(self):
+        """Send the buffered bytes to the client now"""
+        data = self.getvalue()
+        if not data:
+            return
+        self.seek(0)
+        self.truncate()
+        self.streamed = True
+        asyncio.run_coroutine_threadsafe(AsyncHTTPServer._send(self.writer, data), self.loop).result()
+
+
+class AsyncHTTPServer:
+    """HTTP/1.1 server on an asyncio event loop with the same interface as PooledHTTPServer
+
+    ``serve_forever`` runs the loop in the calling thread and ``shutdown``
+    stops it from another, so callers can use either server interchangeably.
+    """
+
+    def __init__(self, server_address, handler_class, workers=8, keepalive_timeout=60.0, admission=None,
+                 reuse_port=False):
+        self.handler_class = handler_class
+        self.workers = workers
+        self.keepalive_timeout = keepalive_timeout
+        # Bounds the requests waiting for a worker; None queues without limit
+        self.admission = admission
+        # reuse_port lets several processes listen on the same port
+        self.socket = socket.create_server(server_address, reuse_port=reuse_port)
+        self.server_address = self.socket.getsockname()[:2]
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='web-worker')
+        self._connections = {}  # connection task -> its stream writer
+        self._loop = None
+        self._stop = None
+        self._started = threading.Event()
+        self._stopped = threading.Event()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.server_close()
+
+    def serve_forever(self):
+        """Run the event loop until shutdown() is called"""
+        try:
+            asyncio.run(self._serve())
+        finally:
+            self._stopped.set()
+
+    def shutdown(self):
+        """Stop serve_forever and wait for it to return. Must be called from another thread"""
+        self._started.wait()
+        self._loop.call_soon_threadsafe(self._stop.set)
+        self._stopped.wait()
+
+    def server_close(self):
+        """Close the listening socket and wait for in-flight requests"""
+        self.socket.close()
+        self.executor.shutdown(wait=True)
+
+    async def _serve(self):
+        """Accept connections until asked to stop, then close them all"""
+        self._loop = asyncio.get_running_loop()
+        self._stop = asyncio.Event()
+        server = await asyncio.start_server(self._handle_connection, sock=self.socket, limit=MAX_HEAD_BYTES)
+        self._started.set()
+        async with server:
+            await self._stop.wait()
+            server.close()
+            # Closing the transports ends each connection's read; let them finish cleanly
+            for writer in list(self._connections.values()):
+                writer.close()
+            await asyncio.gather(*self._connections, return_exceptions=True)
+            await server.wait_closed()
+
+    async def _handle_connection(self, reader, writer):
+        """Serve requests on one connection until it is closed or goes idle"""
+        self._connections[asyncio.current_task()] = writer
+        client_address = writer.get_extra_info('peername')
+        try:
+            while not await self._handle_request(reader, writer, client_address):
+                pass
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError):
+            pass
+        finally:
+            self._connections.pop(asyncio.current_task(), None)
+            writer.close()
+
+    async def _handle_request(self, reader, writer, client_address):
+        """Read, dispatch and answer one request. Returns True if the connection should close"""
+        head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), self.keepalive_timeout)
+
+        handler = self._new_handler(client_address, head)
+        if not handler.parse_request():
+            # parse_request has already written an error response
+            await self._send(writer, handler.wfile.getvalue())
+            return True
+
+        try:
+            length = int(handler.headers.get('Content-Length') or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            handler.send_error(400, "Bad Content-Length")
+            await self._send(writer, handler.wfile.getvalue())
+            return True
+        # Send any "100 Continue" before waiting for the body
+        await self._send(writer, handler.wfile.getvalue())
+        handler.wfile = _ResponseWriter(self._loop, writer)
+        handler.rfile = io.BytesIO(await asyncio.wait_for(reader.readexactly(length), self.keepalive_timeout))
+
+        ticket = self.admission.admit() if self.admission is not None else None
+        if self.admission is not None and ticket is None:
+            await self._send(writer, self.admission.busy)
+            return True
+
+        try:
+            await self._loop.run_in_executor(self.executor, self._run, handler, ticket)
+        except ConnectionError:
+            # The client went away part way through a streamed response
+            return True
+        except Exception:
+            traceback.print_exc()
+            return True
+        detached = getattr(handler, 'detached', None)
+        if detached is not None:
+            # The handler carries on writing from a thread of its own, not a
+            # worker; keep the connection until it is done, then close it
+            await asyncio.wrap_future(detached)
+            return True
+        if handler.wfile.streamed:
+            # The head has gone out already, so the rest is sent as the handler framed it
+            await self._send(writer, handler.wfile.getvalue())
+        else:
+            await self._send(writer, _frame_response(handler.wfile.getvalue()))
+        return handler.close_connection
+
+    def _new_handler(self, client_address, head):
+        """Create a request handler bound to buffers instead of a socket"""
+        handler = self.handler_class.__new__(self.handler_class)
+        handler.server = self
+        handler.request = None
+        handler.client_address = client_address
+        handler.directory = os.getcwd()
+        handler.protocol_version = 'HTTP/1.1'
+        handler.rfile = io.BytesIO(head)
+        handler.wfile = io.BytesIO()
+        handler.close_connection = True
+        handler.raw_requestline = handler.rfile.readline(MAX_HEAD_BYTES + 1)
+        return handler
+
+    def _run(self, handler, ticket):
+        """Run an admitted request on a worker thread"""
+        if self.admission is None:
+            self._dispatch(handler)
+            return
+        self.admission.started(ticket)
+        try:
+            self._dispatch(handler)
+        finally:
+            self.admission.finished()
+
+    @staticmethod
+    def _dispatch(handler):
+        """Run the handler's do_<METHOD> on a worker thread"""
+        method = getattr(handler, 'do_' + handler.command, None)
+        if method is None:
+            handler.send_error(501, f"Unsupported method ({handler.command!r})")
+            return
+        method()
+
+    @staticmethod
+    async def _send(writer, data):
+        """Write bytes to the client and wait until they are flushed"""
+        if data:
+            writer.write(data)
+            await writer.drain()
+
+
+def _frame_response(response):
+    """Add a Content-Length header to a buffered response that lacks one"""
+    head, sep, body = response.partition(b'\r\n\r\n')
+    lowered = head.lower()
+    if (not sep or b'\r\ncontent-length:' in lowered or b'\r\ntransfer-encoding:' in lowered
+            or head[9:12] in (b'204', b'304')):
+        # 204 and 304 responses never have a body
+        return response
+    return head + b'\r\nContent-Length: ' + str(len(body)).encode('ascii') + sep + body
@@ -0,0 +1,832 @@
+#!/usr/bin/env python3
+"""
+Benchmarks and stress tests
+
+Runs the same workload against every registered storage backend so they can
+be compared side by side, plus benchmarks for the record format and the web
+server. Conformance tests for the backends live in tests/:
+
+    python3 cliuniapp/benchmarks.py storage --students 2000
+    python3 cliuniapp/benchmarks.py storage --backends pickle,sqlite
+    python3 cliuniapp/benchmarks.py codec --sizes 1000 10000
+    python3 cliuniapp/benchmarks.py stress --rounds 50 --clients 8
+    python3 cliuniapp/benchmarks.py web --clients 16 --idle 200
+    python3 cliuniapp/benchmarks.py compression --sizes 1000 10000 50000
+    python3 cliuniapp/benchmarks.py stream --sizes 10000 50000
+    python3 cliuniapp/benchmarks.py events --subscribers 8 --changes 200
+    python3 cliuniapp/benchmarks.py metrics --requests 500
+    python3 cliuniapp/benchmarks.py surge --clients 200 --max-queue 16
+    python3 cliuniapp/benchmarks.py processes --processes 1 2 4
+    python3 cliuniapp/benchmarks.py serialize --sizes 1000 50000
+    python3 cliuniapp/benchmarks.py group-commit --clients 1 8 32
+"""
+
+import argparse
+import gzip
+import http.client
+import io
+import itertools
+import json
+import multiprocessing
+import os
+import pickle
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import zlib
+from contextlib import contextmanager
+from typing import Optional
+from models import codec
+from models.backends import backend_names, get_backend
+from models.student import Student
+from models.subject import Subject
+from services.grading_service import grade_from_mark
+from services.roster_service import STREAM_BATCH_SIZE, iter_roster_json, roster_page_json, student_row
+from utils.metrics import Metrics
+from web_gui import MAX_PAGE_SIZE, UniversityWebHandler, make_server, stop_background_work
+
+
+def make_student(n: int, subjects: int = 0) -> Student:
+    """Build a deterministic student for workloads"""
+    student = Student(f"{n:06d}", f"Student {n}", f"student{n}@student.uts.edu.au", "Password123")
+    for i in range(subjects):
+        mark = random.randint(25, 100)
+        student.add_subject(Subject(f"{i + 1:03d}", mark, grade_from_mark(mark)))
+    return student
+
+
+def bench_backend(name: str, file_path: str, count: int) -> dict:
+    """Time a registration/login/enrol/report/removal workload. Returns (ops, seconds) per phase"""
+    backend = get_backend(name)
+    db = backend.factory(file_path)
+    ids = list(range(1, count + 1))
+    timings = {}
+
+    start = time.perf_counter()
+    for n in ids:
+        student = make_student(n)
+        if db.find_by_email(student.email) is None:
+            db.upsert(student)
+    timings["register"] = (count, time.perf_counter() - start)
+
+    order = ids[:]
+    random.shuffle(order)
+    start = time.perf_counter()
+    for n in order:
+        db.find_by_email(f"student{n}@student.uts.edu.au")
+    timings["login"] = (count, time.perf_counter() - start)
+
+    # A fresh instance per lookup, like a CLI process that logs in once
+    cold = order[:50]
+    start = time.perf_counter()
+    for n in cold:
+        backend.factory(file_path).find_by_email(f"student{n}@student.uts.edu.au")
+    timings["cold login"] = (len(cold), time.perf_counter() - start if backend.persistent else None)
+
+    start = time.perf_counter()
+    for n in order:
+        student = db.find_by_id(f"{n:06d}")
+        mark = random.randint(25, 100)
+        student.add_subject(Subject(f"{len(student.subjects) + 1:03d}", mark, grade_from_mark(mark)))
+        db.upsert(student)
+    timings["enrol"] = (count, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for _ in range(10):
+        sum(s.avg_mark() for s in db.read_all())
+    timings["report"] = (10, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for n in order[: count // 2]:
+        db.remove_by_id(f"{n:06d}")
+    timings["remove"] = (count // 2, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with db.batch():
+        for n in order[count // 2:]:
+            db.remove_by_id(f"{n:06d}")
+    timings["batch remove"] = (count - count // 2, time.perf_counter() - start)
+
+    return timings
+
+
+def run_storage(args) -> None:
+    """Run the benchmark workload against each backend"""
+    names = args.backends.split(",") if args.backends else backend_names()
+    random.seed(args.seed)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in names:
+            results[name] = bench_backend(name, os.path.join(tmp, f"{name}-bench.data"), args.students)
+
+    phases = list(next(iter(results.values())))
+    print()
+    print(f"{args.students} students, ops/sec (higher is better)")
+    print(f"{'backend':<10}" + "".join(f"{phase:>14}" for phase in phases))
+    for name, timings in results.items():
+        row = "".join(f"{ops / max(seconds, 1e-9):>14.0f}" if seconds is not None else f"{'-':>14}"
+                      for ops, seconds in timings.values())
+        print(f"{name:<10}" + row)
+
+
+def run_codec(args) -> None:
+    """Compare file size and read/write throughput of pickle and the binary codec"""
+    random.seed(args.seed)
+    formats = {
+        "pickle": (lambda students, f: pickle.dump(students, f), pickle.load),
+        "binary": (codec.dump_students, codec.load_students),
+    }
+    print(f"{'students':>9} {'format':<8} {'size KiB':>10} {'bytes/rec':>10} {'write rec/s':>12} {'read rec/s':>11}")
+    for count in args.sizes:
+        students = [make_student(n, subjects=random.randint(0, 4)) for n in range(1, count + 1)]
+        for name, (dump, load) in formats.items():
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                buf = io.BytesIO()
+                dump(students, buf)
+            write_seconds = (time.perf_counter() - start) / args.repeat
+            data = buf.getvalue()
+
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                loaded = load(io.BytesIO(data))
+            read_seconds = (time.perf_counter() - start) / args.repeat
+            assert len(loaded) == count
+
+            print(f"{count:>9} {name:<8} {len(data) / 1024:>10.1f} {len(data) / count:>10.1f} "
+                  f"{count / write_seconds:>12.0f} {count / read_seconds:>11.0f}")
+
+
+class QuietHandler(UniversityWebHandler):
+    """Web handler that doesn't log every request to stderr"""
+
+    def log_message(self, format, *args):
+        pass
+
+
+@contextmanager
+def running_server(backend: str, workers: int, server_kind: str = "threaded", students: int = 0,
+                   max_queue: int = None, group_commit: float = None):
+    """Serve the web GUI on a free local port with a throwaway store. Yields the port"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = get_backend(backend).factory(os.path.join(tmp, "students.data"))
+        if students:
+            db.write_all([make_student(n, subjects=2) for n in range(students)])
+        server = make_server(0, db, workers=workers, host="127.0.0.1", handler_class=QuietHandler,
+                             server=server_kind, max_queue=max_queue, group_commit=group_commit)
+        # Clients that time out leave the server writing to closed sockets; don't report those
+        server.handle_error = lambda request, client_address: None
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            yield server.server_address[1]
+        finally:
+            stop_background_work(server)
+            server.shutdown()
+            server.server_close()
+
+
+def session_headers(token: Optional[str] = None) -> dict:
+    """Headers for a JSON POST, sent on behalf of a logged-in student if given their token"""
+    headers = {"Content-Type": "application/json"}
+    if token is not None:
+        headers["Authorization"] = f"Bearer {token}"
+    return headers
+
+
+def post_json(port: int, path: str, payload: dict, token: Optional[str] = None) -> dict:
+    """POST a JSON body on a fresh connection and decode the JSON reply"""
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    try:
+        conn.request("POST", path, json.dumps(payload), session_headers(token))
+        return json.loads(conn.getresponse().read())
+    finally:
+        conn.close()
+
+
+def login(port: int, email: str) -> dict:
+    """Log a workload student in, returning the reply with their session token and subjects"""
+    return post_json(port, "/api/login", {"email": email, "password": "Password123"})
+
+
+def run_stress(args) -> None:
+    """Fire concurrent enrolments at one student and check none are lost"""
+    with running_server(args.backend, args.workers) as port:
+        post_json(port, "/api/register", {
+            "name": "Stress Test", "email": "stress@student.uts.edu.au", "password": "Password123"})
+        token = login(port, "stress@student.uts.edu.au")["token"]
+
+        lost = 0
+        start = time.perf_counter()
+        for _ in range(args.rounds):
+            barrier = threading.Barrier(args.clients)
+            successes = []
+
+            def enrol():
+                barrier.wait()
+                if post_json(port, "/api/enroll", {}, token).get("success"):
+                    successes.append(1)
+
+            clients = [threading.Thread(target=enrol) for _ in range(args.clients)]
+            for client in clients:
+                client.start()
+            for client in clients:
+                client.join()
+
+            subjects = login(port, "stress@student.uts.edu.au")["student"]["subjects"]
+            ids = [s["id"] for s in subjects]
+            # Every acknowledged enrolment must be stored, and never more than four
+            if len(ids) != len(successes) or len(set(ids)) != len(ids) or len(ids) > 4:
+                lost += 1
+            for subject_id in ids:
+                post_json(port, "/api/remove_subject", {"subject_id": subject_id}, token)
+        elapsed = time.perf_counter() - start
+
+    print(f"{args.rounds} rounds x {args.clients} concurrent enrolments on {args.backend} "
+          f"with {args.workers} workers: {lost} rounds lost updates ({elapsed:.1f}s)")
+
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    """Value at the given fraction of an ascending list (nearest rank)"""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def load_client(port: int, requests: int, students: int, reuse: bool, latencies: list, failures: list) -> None:
+    """Alternate logins and page loads, recording latencies
+
+    With reuse every request goes over one kept-alive connection; without
+    it each request opens a new connection and asks the server to close it.
+    """
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    headers = {} if reuse else {"Connection": "close"}
+    try:
+        for i in range(requests):
+            start = time.perf_counter()
+            try:
+                if i % 2:
+                    conn.request("GET", "/student", headers=headers)
+                else:
+                    n = random.randrange(students)
+                    body = json.dumps({"email": f"student{n}@student.uts.edu.au", "password": "Password123"})
+                    conn.request("POST", "/api/login", body, {"Content-Type": "application/json", **headers})
+                conn.getresponse().read()
+                if not reuse:
+                    conn.close()
+            except OSError:
+                # A server with every worker tied up never answers; give up on this client
+                failures.append(requests - i)
+                return
+            latencies.append(time.perf_counter() - start)
+    finally:
+        conn.close()
+
+
+def run_web(args) -> None:
+    """Load-test the threaded and asyncio servers, with and without connection reuse"""
+    print(f"{args.clients} clients x {args.requests} requests, {args.idle} idle connections, "
+          f"{args.workers} workers, {args.backend} backend")
+    print(f"{'server':<10} {'conn':<7} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'failed':>8}")
+    modes = {"both": (True, False), "reuse": (True,), "new": (False,)}[args.connections]
+    for kind, reuse in itertools.product(args.servers.split(","), modes):
+        with running_server(args.backend, args.workers, kind, students=args.students) as port:
+            # Idle clients connect and never send a request, like parked browser tabs
+            idle = [socket.create_connection(("127.0.0.1", port)) for _ in range(args.idle)]
+            latencies, failures = [], []
+            clients = [threading.Thread(target=load_client,
+                                        args=(port, args.requests, args.students, reuse, latencies, failures))
+                       for _ in range(args.clients)]
+            start = time.perf_counter()
+            for client in clients:
+                client.start()
+            for client in clients:
+                client.join()
+            elapsed = time.perf_counter() - start
+            for sock in idle:
+                sock.close()
+        latencies.sort()
+        print(f"{kind:<10} {'reuse' if reuse else 'new':<7} {len(latencies) / elapsed:>8.0f} {percentile(latencies, 0.5) * 1000:>8.2f} "
+              f"{percentile(latencies, 0.99) * 1000:>8.2f} {sum(failures):>8}")
+
+
+def fetch_roster(port: int, encoding) -> tuple:
+    """Page through the whole roster on one connection. Returns (bytes on the wire, requests)"""
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    headers = {"Accept-Encoding": encoding} if encoding else {}
+    wire = requests = offset = 0
+    try:
+        while True:
+            conn.request("GET", f"/api/get_students?offset={offset}&limit=500", headers=headers)
+            response = conn.getresponse()
+            body = response.read()
+            # Status line and headers count too; http.client doesn't expose their raw size
+            wire += len(body) + sum(len(k) + len(v) + 4 for k, v in response.getheaders()) + 17
+            requests += 1
+            if response.getheader("Content-Encoding") == "gzip":
+                body = gzip.decompress(body)
+            elif response.getheader("Content-Encoding") == "deflate":
+                body = zlib.decompress(body)
+            page = json.loads(body)
+            offset += len(page["students"])
+            if not page["students"] or offset >= page["total"]:
+                return wire, requests
+    finally:
+        conn.close()
+
+
+def run_compression(args) -> None:
+    """Bytes on the wire and CPU time for the roster with and without response compression"""
+    print(f"Whole roster in pages of 500 ({args.backend} backend); CPU is server and client together")
+    print(f"{'students':>9} {'encoding':<9} {'requests':>8} {'wire KiB':>10} {'ratio':>6} {'CPU ms':>8}")
+    for size in args.sizes:
+        with running_server(args.backend, 4, students=size) as port:
+            identity = None
+            for encoding in (None, "gzip", "deflate"):
+                start = time.process_time()
+                wire, requests = fetch_roster(port, encoding)
+                cpu = time.process_time() - start
+                identity = identity or wire
+                print(f"{size:>9} {encoding or 'identity':<9} {requests:>8} {wire / 1024:>10.1f} "
+                      f"{identity / wire:>5.1f}x {cpu * 1000:>8.1f}")
+
+
+def peak_memory(func) -> int:
+    """Peak bytes allocated while func runs"""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def fetch_stream(port: int) -> tuple:
+    """GET the streamed roster. Returns (seconds to first body byte, seconds in total, students)"""
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+    try:
+        start = time.perf_counter()
+        conn.request("GET", "/api/get_students?stream=1")
+        response = conn.getresponse()
+        first = response.read1(1)
+        ttfb = time.perf_counter() - start
+        body = first + response.read()
+        return ttfb, time.perf_counter() - start, json.loads(body)["total"]
+    finally:
+        conn.close()
+
+
+def run_stream(args) -> None:
+    """Memory and time to first byte for the whole roster encoded at once vs streamed in batches"""
+    print(f"Whole roster as one JSON document ({args.backend} backend)")
+    print(f"{'students':>9} {'mode':<9} {'peak KiB':>10} {'encode ms':>10}")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            db = get_backend(args.backend).factory(os.path.join(tmp, "students.data"))
+            db.write_all([make_student(n, subjects=2) for n in range(size)])
+
+            def buffered():
+                rows = [student_row(student) for student in db.iter_students()]
+                return json.dumps({"success": True, "total": len(rows), "students": rows}).encode()
+
+            def streamed():
+                for _ in iter_roster_json(db.iter_batches(STREAM_BATCH_SIZE)):
+                    pass
+
+            for mode, func in (("buffered", buffered), ("streamed", streamed)):
+                start = time.perf_counter()
+                func()
+                elapsed = time.perf_counter() - start
+                print(f"{size:>9} {mode:<9} {peak_memory(func) / 1024:>10.0f} {elapsed * 1000:>10.1f}")
+
+    print()
+    print("GET /api/get_students?stream=1")
+    print(f"{'students':>9} {'server':<9} {'TTFB ms':>9} {'total ms':>9}")
+    for size in args.sizes:
+        for kind in args.servers.split(","):
+            with running_server(args.backend, 4, kind, students=size) as port:
+                fetch_stream(port)  # warm up
+                ttfb, total, count = fetch_stream(port)
+                assert count == size, f"streamed {count} of {size} students"
+                print(f"{size:>9} {kind:<9} {ttfb * 1000:>9.1f} {total * 1000:>9.1f}")
+
+
+def subscribe(port: int, ready: threading.Event, arrivals: dict, wire: list, expected: int) -> None:
+    """Read /api/events until expected removals arrive, recording when each student's event came"""
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    try:
+        conn.request("GET", "/api/events")
+        response = conn.getresponse()
+        ready.set()
+        received = 0
+        while received < expected:
+            line = response.readline()
+            if not line:
+                return
+            wire[0] += len(line)
+            if line.startswith(b"data: {\"id\""):
+                arrivals.setdefault(json.loads(line[6:])["id"], []).append(time.perf_counter())
+                received += 1
+    finally:
+        conn.close()
+
+
+def run_events(args) -> None:
+    """Latency and bytes per subscriber for change events vs reloading a roster page per change"""
+    with running_server(args.backend, args.workers, args.server, students=args.changes) as port:
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        conn.request("GET", "/api/get_students?limit=50")
+        page_bytes = len(conn.getresponse().read())
+        conn.close()
+
+        arrivals, wire, threads = {}, [0], []
+        for _ in range(args.subscribers):
+            ready = threading.Event()
+            threads.append(threading.Thread(target=subscribe, args=(port, ready, arrivals, wire, args.changes)))
+            threads[-1].start()
+            ready.wait()
+
+        # Streams run on threads of their own, so other requests still get a worker
+        start = time.perf_counter()
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        conn.request("GET", "/api/stats/grades")
+        conn.getresponse().read()
+        conn.close()
+        stats_ms = (time.perf_counter() - start) * 1000
+
+        sent = {}
+        for n in range(args.changes):
+            student_id = f"{n:06d}"
+            sent[student_id] = time.perf_counter()
+            post_json(port, "/api/remove_student", {"student_id": student_id})
+        for thread in threads:
+            thread.join()
+
+        latencies = sorted(at - sent[student_id] for student_id, times in arrivals.items() for at in times)
+
+    delivered = len(latencies)
+    print(f"{args.subscribers} subscribers, {args.changes} removals ({args.server} server, {args.backend} backend)")
+    print(f"delivered {delivered}/{args.subscribers * args.changes} events; latency after the POST was sent: "
+          f"p50 {percentile(latencies, 0.5) * 1000:.2f} ms, p99 {percentile(latencies, 0.99) * 1000:.2f} ms")
+    print(f"event bytes per subscriber per change: {wire[0] / max(delivered, 1):.0f} "
+          f"(reloading a 50-row page instead: {page_bytes} bytes)")
+    print(f"GET /api/stats/grades with {args.subscribers} streams open on {args.workers} workers: {stats_ms:.1f} ms")
+
+
+def run_metrics(args) -> None:
+    """Cost of one timer and what /metrics reports after a short load"""
+    metrics = Metrics()
+    count = 200000
+    start = time.perf_counter()
+    for _ in range(count):
+        pass
+    empty = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(count):
+        with metrics.timer("storage_op", op="find_by_id"):
+            pass
+    timed = time.perf_counter() - start
+    print(f"timer overhead: {(timed - empty) / count * 1e6:.2f} µs per timed block")
+
+    with running_server(args.backend, args.workers, args.server, students=args.students) as port:
+        latencies, failures = [], []
+        clients = [threading.Thread(target=load_client,
+                                    args=(port, args.requests, args.students, True, latencies, failures))
+                   for _ in range(args.clients)]
+        for client in clients:
+            client.start()
+        for client in clients:
+            client.join()
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        conn.request("GET", "/metrics")
+        exposition = conn.getresponse().read().decode()
+        conn.close()
+
+    print(f"{len(latencies)} requests ({args.server} server, {args.backend} backend); /metrics samples:")
+    for line in exposition.splitlines():
+        if ('route="/api/login"' in line or 'op="find_by_email"' in line) and not line.startswith("#"):
+            print("  " + line)
+
+
+def surge_client(port: int, n: int, timeout: float, outcomes: list) -> None:
+    """Register one student on a new connection, recording (status or "timeout", seconds)"""
+    body = json.dumps({"name": f"Surge {n}", "email": f"surge{n}@student.uts.edu.au", "password": "Password123"})
+    start = time.perf_counter()
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=timeout)
+    try:
+        conn.request("POST", "/api/register", body, {"Content-Type": "application/json"})
+        response = conn.getresponse()
+        response.read()
+        outcomes.append((response.status, time.perf_counter() - start))
+    except OSError:
+        outcomes.append(("timeout", time.perf_counter() - start))
+    finally:
+        conn.close()
+
+
+def run_surge(args) -> None:
+    """Registration burst against a small worker pool, with an effectively unbounded and a bounded queue"""
+    print(f"{args.clients} simultaneous registrations, {args.workers} workers, {args.timeout:g}s client timeout "
+          f"({args.server} server, {args.backend} backend, {args.students} students)")
+    print(f"{'queue':>7} {'ok':>5} {'503':>5} {'timeout':>8} {'ok p50 ms':>10} {'ok p99 ms':>10} {'503 p99 ms':>11}")
+    for max_queue in (100000, args.max_queue):
+        with running_server(args.backend, args.workers, args.server, students=args.students,
+                            max_queue=max_queue) as port:
+            outcomes = []
+            clients = [threading.Thread(target=surge_client, args=(port, n, args.timeout, outcomes))
+                       for n in range(args.clients)]
+            for client in clients:
+                client.start()
+            for client in clients:
+                client.join()
+        ok = sorted(seconds for status, seconds in outcomes if status == 200)
+        busy = sorted(seconds for status, seconds in outcomes if status == 503)
+        timeouts = sum(1 for status, _ in outcomes if status == "timeout")
+        label = "none" if max_queue == 100000 else str(max_queue)
+        print(f"{label:>7} {len(ok):>5} {len(busy):>5} {timeouts:>8} {percentile(ok, 0.5) * 1000:>10.1f} "
+              f"{percentile(ok, 0.99) * 1000:>10.1f} {percentile(busy, 0.99) * 1000:>11.1f}")
+
+
+@contextmanager
+def running_processes(backend: str, processes: int, workers: int, students: int):
+    """Run web_gui.py with --processes on a free port and a throwaway store. Yields the port"""
+    with tempfile.TemporaryDirectory() as tmp:
+        data_path = os.path.join(tmp, "students.data")
+        get_backend(backend).factory(data_path).write_all([make_student(n, subjects=2) for n in range(students)])
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            port = probe.getsockname()[1]
+        env = dict(os.environ, STUDENT_STORAGE=backend, STUDENT_DATA_PATH=data_path)
+        script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "web_gui.py")
+        server = subprocess.Popen([sys.executable, script, "--port", str(port), "--workers", str(workers),
+                                   "--processes", str(processes)],
+                                  env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            deadline = time.monotonic() + 10
+            while True:
+                try:
+                    socket.create_connection(("127.0.0.1", port), timeout=1).close()
+                    break
+                except OSError:
+                    if server.poll() is not None or time.monotonic() > deadline:
+                        raise RuntimeError(f"web server with {processes} processes did not start")
+                    time.sleep(0.05)
+            yield port
+        finally:
+            server.send_signal(signal.SIGINT)
+            server.wait(timeout=30)
+
+
+def read_client(port: int, requests: int) -> list:
+    """Fetch roster pages sorted by average over one kept-alive connection, returning latencies"""
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    latencies = []
+    try:
+        for i in range(requests):
+            start = time.perf_counter()
+            conn.request("GET", f"/api/get_students?limit=100&sort=avg&offset={i % 5 * 100}")
+            conn.getresponse().read()
+            latencies.append(time.perf_counter() - start)
+    finally:
+        conn.close()
+    return latencies
+
+
+def enrol_client(port: int, token: str) -> bool:
+    """Enrol the token's student once, returning whether the server accepted it"""
+    return bool(post_json(port, "/api/enroll", {}, token).get("success"))
+
+
+def run_processes(args) -> None:
+    """Read throughput of the pre-fork server by process count, and lost updates across processes"""
+    print(f"{args.clients} client processes x {args.requests} roster pages, {args.students} students, "
+          f"{args.backend} backend, {args.workers} worker threads per process, {os.cpu_count()} CPUs; "
+          f"{args.rounds} rounds of {args.clients} concurrent enrolments")
+    print(f"{'processes':>9} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'lost rounds':>12}")
+    # Clients run in their own processes so the load generator isn't held to one core either
+    with multiprocessing.get_context("fork").Pool(args.clients) as pool:
+        for processes in args.processes:
+            with running_processes(args.backend, processes, args.workers, args.students) as port:
+                start = time.perf_counter()
+                results = pool.starmap(read_client, [(port, args.requests)] * args.clients)
+                elapsed = time.perf_counter() - start
+                latencies = sorted(itertools.chain.from_iterable(results))
+
+                # Concurrent enrolments spread over every process must all be kept, and never exceed four
+                lost = 0
+                for n in range(args.rounds):
+                    email = f"student{n}@student.uts.edu.au"
+                    session = login(port, email)
+                    for subject in session["student"]["subjects"]:
+                        post_json(port, "/api/remove_subject", {"subject_id": subject["id"]}, session["token"])
+                    accepted = sum(pool.starmap(enrol_client, [(port, session["token"])] * args.clients))
+                    subjects = login(port, email)["student"]["subjects"]
+                    if len(subjects) != accepted or accepted > 4:
+                        lost += 1
+            print(f"{processes:>9} {len(latencies) / elapsed:>8.0f} {percentile(latencies, 0.5) * 1000:>8.2f} "
+                  f"{percentile(latencies, 0.99) * 1000:>8.2f} {lost:>12}")
+
+
+def run_serialize(args) -> None:
+    """Roster encoding time with every student encoded afresh vs joined from memoized JSON"""
+    print(f"{'students':>9} {'response':<14} {'fresh ms':>9} {'memo ms':>9} {'speedup':>8}")
+    for size in args.sizes:
+        students = [make_student(n, subjects=2) for n in range(size)]
+        page = students[:MAX_PAGE_SIZE]
+        batches = [students[i:i + STREAM_BATCH_SIZE] for i in range(0, size, STREAM_BATCH_SIZE)]
+        responses = {
+            f"page of {len(page)}": lambda: roster_page_json(size, 0, len(page), page),
+            "whole roster": lambda: b"".join(iter_roster_json(batches)),
+        }
+
+        def forget():
+            for student in students:
+                student.__dict__.pop("_row_json", None)
+
+        for name, encode in responses.items():
+            fresh = memo = float("inf")
+            for _ in range(args.repeat):
+                forget()
+                start = time.perf_counter()
+                encode()
+                fresh = min(fresh, time.perf_counter() - start)
+                start = time.perf_counter()
+                encode()
+                memo = min(memo, time.perf_counter() - start)
+            print(f"{size:>9} {name:<14} {fresh * 1000:>9.2f} {memo * 1000:>9.2f} {fresh / memo:>7.1f}x")
+
+
+def write_client(port: int, token: str, cycles: int, latencies: list, failures: list) -> None:
+    """Enrol the token's student in a subject and withdraw them again, cycles times over one kept-alive connection"""
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+
+    def post(path, payload):
+        start = time.perf_counter()
+        conn.request("POST", path, json.dumps(payload), session_headers(token))
+        reply = json.loads(conn.getresponse().read())
+        latencies.append(time.perf_counter() - start)
+        if not reply.get("success"):
+            failures.append(reply.get("message"))
+        return reply
+
+    try:
+        for _ in range(cycles):
+            subjects = post("/api/enroll", {}).get("student", {}).get("subjects", [])
+            if subjects:
+                post("/api/remove_subject", {"subject_id": subjects[-1]["id"]})
+    finally:
+        conn.close()
+
+
+def run_group_commit(args) -> None:
+    """Web write throughput by concurrency with each change persisted on its own vs in group commits"""
+    modes = {"direct": None, f"group {args.delay:g}ms": args.delay}
+    print(f"{args.students} students, {args.cycles} enrol/withdraw cycles per client, "
+          f"{max(args.clients)} worker threads")
+    print(f"{'backend':<8} {'clients':>7} {'mode':<12} {'writes/s':>9} {'p50 ms':>8} {'p99 ms':>8} "
+          f"{'per commit':>10} {'failed':>7}")
+    for backend in args.backends.split(","):
+        for clients in args.clients:
+            for mode, delay in modes.items():
+                latencies, failures = [], []
+                with running_server(backend, max(args.clients), students=args.students,
+                                    max_queue=max(args.clients), group_commit=delay) as port:
+                    tokens = [login(port, f"student{n}@student.uts.edu.au")["token"] for n in range(clients)]
+                    threads = [threading.Thread(target=write_client,
+                                                args=(port, token, args.cycles, latencies, failures))
+                               for token in tokens]
+                    start = time.perf_counter()
+                    for thread in threads:
+                        thread.start()
+                    for thread in threads:
+                        thread.join()
+                    elapsed = time.perf_counter() - start
+                    writes = QuietHandler.writes
+                    per_commit = f"{writes.writes / max(writes.batches, 1):.1f}" if writes is not None else "1"
+                latencies.sort()
+                print(f"{backend:<8} {clients:>7} {mode:<12} {len(latencies) / elapsed:>9.0f} "
+                      f"{percentile(latencies, 0.5) * 1000:>8.2f} {percentile(latencies, 0.99) * 1000:>8.2f} "
+                      f"{per_commit:>10} {len(failures):>7}")
+
+
+def main(argv=None) -> None:
+    """Benchmark entry point"""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    storage = commands.add_parser("storage", help="workload timings for storage backends")
+    storage.add_argument("--backends", help="comma separated backend names (default: all)")
+    storage.add_argument("--students", type=int, default=1000, help="cohort size (default: 1000)")
+    storage.add_argument("--seed", type=int, default=1, help="random seed (default: 1)")
+    storage.set_defaults(func=run_storage)
+
+    codec_cmd = commands.add_parser("codec", help="pickle vs binary codec size and throughput")
+    codec_cmd.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000],
+                           help="cohort sizes (default: 1000 10000 100000)")
+    codec_cmd.add_argument("--repeat", type=int, default=3, help="repetitions per measurement (default: 3)")
+    codec_cmd.add_argument("--seed", type=int, default=1, help="random seed (default: 1)")
+    codec_cmd.set_defaults(func=run_codec)
+
+    stress = commands.add_parser("stress", help="lost-update check with concurrent web enrolments")
+    stress.add_argument("--backend", default="pickle", help="storage backend (default: pickle)")
+    stress.add_argument("--workers", type=int, default=8, help="server worker threads (default: 8)")
+    stress.add_argument("--clients", type=int, default=8, help="concurrent requests per round (default: 8)")
+    stress.add_argument("--rounds", type=int, default=50, help="rounds (default: 50)")
+    stress.set_defaults(func=run_stress)
+
+    web = commands.add_parser("web", help="threaded vs asyncio web server load test")
+    web.add_argument("--servers", default="threaded,asyncio", help="comma-separated servers (default: both)")
+    web.add_argument("--backend", default="pickle", help="storage backend (default: pickle)")
+    web.add_argument("--workers", type=int, default=8, help="server worker threads (default: 8)")
+    web.add_argument("--students", type=int, default=1000, help="students in the store (default: 1000)")
+    web.add_argument("--clients", type=int, default=16, help="concurrent keep-alive clients (default: 16)")
+    web.add_argument("--requests", type=int, default=200, help="requests per client (default: 200)")
+    web.add_argument("--idle", type=int, default=0, help="idle connections held open during the run (default: 0)")
+    web.add_argument("--connections", choices=("both", "reuse", "new"), default="both",
+                     help="keep connections alive, open one per request, or compare both (default: both)")
+    web.set_defaults(func=run_web)
+
+    compression = commands.add_parser("compression", help="roster bytes on the wire with gzip/deflate")
+    compression.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000],
+                             help="cohort sizes (default: 1000 10000 50000)")
+    compression.add_argument("--backend", default="memory", help="storage backend (default: memory)")
+    compression.set_defaults(func=run_compression)
+
+    stream = commands.add_parser("stream", help="buffered vs streamed roster memory and time to first byte")
+    stream.add_argument("--sizes", type=int, nargs="+", default=[10000, 50000],
+                        help="cohort sizes (default: 10000 50000)")
+    stream.add_argument("--backend", default="memory", help="storage backend (default: memory)")
+    stream.add_argument("--servers", default="threaded,asyncio", help="comma-separated servers (default: both)")
+    stream.set_defaults(func=run_stream)
+
+    events = commands.add_parser("events", help="change event latency and bytes for admin page subscribers")
+    events.add_argument("--subscribers", type=int, default=8, help="open event streams (default: 8)")
+    events.add_argument("--changes", type=int, default=200, help="students removed during the run (default: 200)")
+    events.add_argument("--server", choices=("threaded", "asyncio"), default="threaded",
+                        help="web server (default: threaded)")
+    events.add_argument("--workers", type=int, default=8, help="server worker threads (default: 8)")
+    events.add_argument("--backend", default="memory", help="storage backend (default: memory)")
+    events.set_defaults(func=run_events)
+
+    metrics = commands.add_parser("metrics", help="timer overhead and /metrics output under load")
+    metrics.add_argument("--server", choices=("threaded", "asyncio"), default="threaded",
+                         help="web server (default: threaded)")
+    metrics.add_argument("--backend", default="pickle", help="storage backend (default: pickle)")
+    metrics.add_argument("--workers", type=int, default=8, help="server worker threads (default: 8)")
+    metrics.add_argument("--students", type=int, default=1000, help="students in the store (default: 1000)")
+    metrics.add_argument("--clients", type=int, default=8, help="concurrent keep-alive clients (default: 8)")
+    metrics.add_argument("--requests", type=int, default=500, help="requests per client (default: 500)")
+    metrics.set_defaults(func=run_metrics)
+
+    surge = commands.add_parser("surge", help="503 backpressure under a registration burst")
+    surge.add_argument("--server", choices=("threaded", "asyncio"), default="threaded",
+                       help="web server (default: threaded)")
+    surge.add_argument("--backend", default="pickle", help="storage backend (default: pickle)")
+    surge.add_argument("--workers", type=int, default=4, help="server worker threads (default: 4)")
+    surge.add_argument("--max-queue", type=int, default=16, help="bounded queue length (default: 16)")
+    surge.add_argument("--students", type=int, default=5000, help="students in the store (default: 5000)")
+    surge.add_argument("--clients", type=int, default=200, help="simultaneous registrations (default: 200)")
+    surge.add_argument("--timeout", type=float, default=2.0, help="client timeout in seconds (default: 2)")
+    surge.set_defaults(func=run_surge)
+
+    processes = commands.add_parser("processes", help="pre-fork server read scaling and cross-process writes")
+    processes.add_argument("--processes", type=int, nargs="+", default=[1, 2, 4],
+                           help="server process counts to compare (default: 1 2 4)")
+    processes.add_argument("--backend", default="pickle", help="persistent storage backend (default: pickle)")
+    processes.add_argument("--workers", type=int, default=8, help="worker threads per process (default: 8)")
+    processes.add_argument("--students", type=int, default=5000, help="students in the store (default: 5000)")
+    processes.add_argument("--clients", type=int, default=8, help="concurrent client processes (default: 8)")
+    processes.add_argument("--requests", type=int, default=100, help="roster pages per client (default: 100)")
+    processes.add_argument("--rounds", type=int, default=10, help="concurrent enrolment rounds (default: 10)")
+    processes.set_defaults(func=run_processes)
+
+    serialize = commands.add_parser("serialize", help="roster encoding with and without memoized student JSON")
+    serialize.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000],
+                           help="cohort sizes (default: 1000 10000 50000)")
+    serialize.add_argument("--repeat", type=int, default=5, help="repetitions per measurement (default: 5)")
+    serialize.set_defaults(func=run_serialize)
+
+    group_commit = commands.add_parser("group-commit", help="web write throughput with and without group commit")
+    group_commit.add_argument("--backends", default="pickle,journal,sqlite",
+                              help="comma separated backend names (default: pickle,journal,sqlite)")
+    group_commit.add_argument("--clients", type=int, nargs="+", default=[1, 8, 32],
+                              help="concurrent writing clients to compare (default: 1 8 32)")
+    group_commit.add_argument("--cycles", type=int, default=20,
+                              help="enrol/withdraw cycles per client (default: 20)")
+    group_commit.add_argument("--students", type=int, default=5000, help="students in the store (default: 5000)")
+    group_commit.add_argument("--delay", type=float, default=2,
+                              help="group commit delay in milliseconds (default: 2)")
+    group_commit.set_defaults(func=run_group_commit)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+HTTP content-coding negotiation and compression for the web GUI
+"""
+
+import gzip
+import hashlib
+import zlib
+from typing import Dict, Optional
+
+# Content codings we can produce, in order of preference when the client rates them equally
+ENCODINGS = ('gzip', 'deflate')
+
+# Smaller bodies are sent as-is: headers dominate and compression barely shrinks them
+COMPRESS_MIN_BYTES = 1024
+
+# Level for bodies compressed per response; prepared bodies use the maximum
+DYNAMIC_LEVEL = 6
+
+
+def accepted_encoding(header: Optional[str]) -> Optional[str]:
+    """Best coding in an Accept-Encoding header we can produce, or None for identity"""
+    if not header:
+        return None
+    offers = {}
+    for part in header.split(','):
+        coding, _, params = part.partition(';')
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name.lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        offers[coding.strip().lower()] = quality
+    best, best_quality = None, 0.0
+    for coding in ENCODINGS:
+        quality = offers.get(coding, offers.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+def compress(body: bytes, encoding: str, level: int = DYNAMIC_LEVEL) -> bytes:
+    """Compress a body with the given content coding"""
+    if encoding == 'gzip':
+        # Fixed mtime so identical bodies compress to identical bytes
+        return gzip.compress(body, compresslevel=level, mtime=0)
+    if encoding == 'deflate':
+        # HTTP "deflate" is the zlib format, not raw deflate
+        return zlib.compress(body, level)
+    raise ValueError(f"Unsupported content coding {encoding!r}")
+
+
+def compressor(encoding: str, level: int = DYNAMIC_LEVEL):
+    """Incremental compressor for a streamed body in the given content coding"""
+    if encoding == 'gzip':
+        return zlib.compressobj(level, zlib.DEFLATED, 31)
+    if encoding == 'deflate':
+        return zlib.compressobj(level, zlib.DEFLATED, 15)
+    raise ValueError(f"Unsupported content coding {encoding!r}")
+
+
+def variant_etag(etag: str, encoding: Optional[str]) -> str:
+    """ETag for one content coding of a representation"""
+    if encoding is None:
+        return etag
+    return f'{etag[:-1]}-{encoding}"'
+
+
+def base_etag(tag: str) -> str:
+    """Strip the weak prefix and any content-coding suffix from an ETag"""
+    tag = tag.strip()
+    if tag.startswith('W/'):
+        tag = tag[2:]
+    for encoding in ENCODINGS:
+        suffix = f'-{encoding}"'
+        if tag.endswith(suffix):
+            return tag[:-len(suffix)] + '"'
+    return tag
+
+
+class PreparedBody:
+    """Response body encoded once in every supported content coding
+
+    Used for content that never changes while the server runs, so each
+    request only has to pick a variant and copy it out.
+    """
+
+    def __init__(self, body: bytes, content_type: str):
+        self.content_type = content_type
+        self.etag = '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+        self.variants: Dict[Optional[str], bytes] = {None: body}
+        if len(body) >= COMPRESS_MIN_BYTES:
+            for encoding in ENCODINGS:
+                self.variants[encoding] = compress(body, encoding, level=9)
+
+    def variant(self, encoding: Optional[str]):
+        """(encoding, bytes) to send for a negotiated coding, falling back to identity"""
+        if encoding in self.variants:
+            return encoding, self.variants[encoding]
+        return None, self.variants[None]
@@ -2,15 +2,16 @@
 Admin controller - handles administrative functions
 """
 
-from models.database import Database
+from models.backends import open_database
+from services.analytics_service import grade_distribution, iter_partition
 from utils.ioutils import safe_input, print_error, print_success, print_info
 
 
 class AdminController:
     """Admin system controller"""
     
-    def __init__(self):
-        self.db = Database()
+    def __init__(self, db=None):
+        self.db = db if db is not None else open_database()
     
     def run(self):
         """Admin system main loop"""
@@ -46,69 +47,41 @@ class AdminController:
     
     def show_all_students(self):
         """Show all students with their details"""
-        students = self.db.read_all()
-        if not students:
-            print_info("No students found.")
-            return
-        
-        print_info("All Students:")
-        for student in students:
+        found = False
+        for student in self.db.iter_students():
+            if not found:
+                print_info("All Students:")
+                found = True
             avg_mark = student.avg_mark()
             status = "PASS" if student.is_pass() else "FAIL"
             subject_count = len(student.subjects)
             print(f"  {student.id} {student.name} ({student.email}) avg={avg_mark} status={status} subjects={subject_count}")
+        
+        if not found:
+            print_info("No students found.")
     
     def group_students(self):
         """Group students by grade buckets"""
-        students = self.db.read_all()
-        if not students:
+        if not self.db.cohort_stats().students:
             print_info("No students found.")
             return
         
-        grade_counts = {"HD": 0, "D": 0, "C": 0, "P": 0, "F": 0}
-        
-        for student in students:
-            if not student.subjects:
-                continue
-            
-            # Use highest grade among all subjects
-            highest_grade = "F"
-            for subject in student.subjects:
-                if subject.grade == "HD":
-                    highest_grade = "HD"
-                elif subject.grade == "D" and highest_grade not in ["HD"]:
-                    highest_grade = "D"
-                elif subject.grade == "C" and highest_grade not in ["HD", "D"]:
-                    highest_grade = "C"
-                elif subject.grade == "P" and highest_grade not in ["HD", "D", "C"]:
-                    highest_grade = "P"
-            
-            grade_counts[highest_grade] += 1
-        
+        grade_counts = grade_distribution(self.db)
         print_info(f"HD: {grade_counts['HD']}  D: {grade_counts['D']}  C: {grade_counts['C']}  P: {grade_counts['P']}  F: {grade_counts['F']}")
     
     def partition_students(self):
         """Partition students into PASS/FAIL groups"""
-        students = self.db.read_all()
-        if not students:
+        if not self.db.cohort_stats().students:
             print_info("No students found.")
             return
         
-        pass_students = []
-        fail_students = []
-        
-        for student in students:
-            if student.is_pass():
-                pass_students.append(student)
-            else:
-                fail_students.append(student)
-        
+        # One streaming pass per group keeps memory flat for large cohorts
         print_info("PASS:")
-        for student in pass_students:
+        for student in iter_partition(self.db, passed=True):
             print(f"  {student.id} {student.name} (avg {student.avg_mark()})")
         
         print_info("FAIL:")
-        for student in fail_students:
+        for student in iter_partition(self.db, passed=False):
             print(f"  {student.id} {student.name} (avg {student.avg_mark()})")
     
     def remove_student(self):
@@ -14,19 +14,23 @@ class EnrolmentController:
     """Subject enrollment controller"""
     
     def run(self, student, db):
-        """Subject enrollment main loop"""
+        """Subject enrollment main loop
+        
+        Changes replace the stored student with a changed copy, which the
+        loop carries on with.
+        """
         while True:
             self.show_menu()
             choice = safe_input("> ").lower()
             
             if choice == 'e':
-                self.enrol_subject(student, db)
+                student = self.enrol_subject(student, db)
             elif choice == 'r':
-                self.remove_subject(student, db)
+                student = self.remove_subject(student, db)
             elif choice == 's':
                 self.show_subjects(student)
             elif choice == 'c':
-                self.change_password(student, db)
+                student = self.change_password(student, db)
             elif choice == 'x':
                 print("Returning to Student menu...")
                 break
@@ -43,10 +47,10 @@ class EnrolmentController:
         print("(x) exit")
     
     def enrol_subject(self, student, db):
-        """Enroll student in a new subject"""
+        """Enroll student in a new subject, returning the updated student"""
         if len(student.subjects) >= 4:
             print_error("Cannot enrol more than four (4) subjects.")
-            return
+            return student
         
         # Generate random mark between 25 and 100
         mark = random.randint(25, 100)
@@ -54,24 +58,28 @@ class EnrolmentController:
         subject_id = new_subject_id(student)
         
         subject = Subject(subject_id, mark, grade)
+        student = student.copy()
         student.add_subject(subject)
         db.upsert(student)
         
         current_count = len(student.subjects)
         print_success(f"Enrolled subject {subject_id} with mark {mark} (grade {grade}). [{current_count}/4]")
+        return student
     
     def remove_subject(self, student, db):
-        """Remove a subject by ID"""
+        """Remove a subject by ID, returning the updated student"""
         subject_id = safe_input("Enter subject id to remove: ")
         if not subject_id:
             print_error("Subject ID cannot be empty.")
-            return
+            return student
         
-        if student.remove_subject_by_id(subject_id):
-            db.upsert(student)
+        updated = student.copy()
+        if updated.remove_subject_by_id(subject_id):
+            db.upsert(updated)
             print_success(f"Removed subject {subject_id}.")
-        else:
-            print_error("Subject not found.")
+            return updated
+        print_error("Subject not found.")
+        return student
     
     def show_subjects(self, student):
         """Show all enrolled subjects with average and status"""
@@ -88,17 +96,19 @@ class EnrolmentController:
         print(f"Average: {avg_mark}  Status: {status}")
     
     def change_password(self, student, db):
-        """Change student password"""
+        """Change student password, returning the updated student"""
         new_password = safe_input("Enter new password: ")
         if not is_valid_password(new_password):
             print_error("Invalid password format. Must start with uppercase, have at least 5 letters, then at least 3 digits.")
-            return
+            return student
         
         confirm_password = safe_input("Confirm new password: ")
         if new_password != confirm_password:
             print_error("Passwords do not match.")
-            return
+            return student
         
+        student = student.copy()
         student.change_password(new_password)
         db.upsert(student)
         print_success("Password changed.")
+        return student
@@ -4,8 +4,9 @@ GUI Controller - Handles GUI interactions and business logic
 
 import tkinter as tk
 from tkinter import ttk, messagebox
-from models.database import Database
+from models.backends import open_database
 from models.student import Student
+from services.analytics_service import grade_distribution, partition
 from services.auth_service import is_valid_email, is_valid_password, authenticate
 from services.id_service import new_student_id, new_subject_id
 from services.grading_service import grade_from_mark
@@ -14,8 +15,8 @@ import random
 class GUIController:
     """Main GUI controller for handling user interactions"""
     
-    def __init__(self):
-        self.db = Database()
+    def __init__(self, db=None):
+        self.db = db if db is not None else open_database()
         self.current_student = None
         
     def open_student_portal(self, parent):
@@ -589,8 +590,10 @@ class StudentDashboardWindow:
         # Create and add subject
         from models.subject import Subject
         subject = Subject(subject_id, mark, grade)
-        self.controller.current_student.add_subject(subject)
-        self.controller.db.upsert(self.controller.current_student)
+        student = self.controller.current_student.copy()
+        student.add_subject(subject)
+        self.controller.db.upsert(student)
+        self.controller.current_student = student
         
         messagebox.showinfo("Success", f"Enrolled subject {subject_id} with mark {mark} (grade {grade}). [{len(self.controller.current_student.subjects)}/4]")
         self.refresh_subjects()
@@ -611,8 +614,10 @@ class StudentDashboardWindow:
             messagebox.showerror("Error", f"Subject {subject_id} not found in student's subjects")
             return
         
-        if self.controller.current_student.remove_subject_by_id(subject_id):
-            self.controller.db.upsert(self.controller.current_student)
+        student = self.controller.current_student.copy()
+        if student.remove_subject_by_id(subject_id):
+            self.controller.db.upsert(student)
+            self.controller.current_student = student
             messagebox.showinfo("Success", f"Removed subject {subject_id}")
             self.refresh_subjects()
         else:
@@ -680,8 +685,10 @@ class PasswordChangeDialog:
             messagebox.showerror("Error", "Invalid password format. Must start with uppercase, have at least 5 letters, then at least 3 digits.")
             return
             
-        self.controller.current_student.change_password(new_password)
-        self.controller.db.upsert(self.controller.current_student)
+        student = self.controller.current_student.copy()
+        student.change_password(new_password)
+        self.controller.db.upsert(student)
+        self.controller.current_student = student
         messagebox.showinfo("Success", "Password changed successfully")
         self.dialog.destroy()
 
@@ -910,43 +917,22 @@ class AdminPortalWindow:
             
     def group_by_grade(self):
         """Group students by grade"""
-        students = self.controller.db.read_all()
-        grade_counts = {"HD": 0, "D": 0, "C": 0, "P": 0, "F": 0}
-        
-        for student in students:
-            if not student.subjects:
-                continue
-                
-            # Use highest grade among all subjects
-            highest_grade = "F"
-            for subject in student.subjects:
-                if subject.grade == "HD":
-                    highest_grade = "HD"
-                elif subject.grade == "D" and highest_grade not in ["HD"]:
-                    highest_grade = "D"
-                elif subject.grade == "C" and highest_grade not in ["HD", "D"]:
-                    highest_grade = "C"
-                elif subject.grade == "P" and highest_grade not in ["HD", "D", "C"]:
-                    highest_grade = "P"
-                    
-            grade_counts[highest_grade] += 1
+        grade_counts = grade_distribution(self.controller.db)
             
         message = f"Grade Distribution:\nHD: {grade_counts['HD']}\nD: {grade_counts['D']}\nC: {grade_counts['C']}\nP: {grade_counts['P']}\nF: {grade_counts['F']}"
         messagebox.showinfo("Grade Distribution", message)
         
     def partition_pass_fail(self):
         """Partition students by pass/fail"""
-        students = self.controller.db.read_all()
-        pass_students = [s for s in students if s.is_pass()]
-        fail_students = [s for s in students if not s.is_pass()]
+        groups = partition(self.controller.db)
         
-        message = f"Pass/Fail Partition:\n\nPASS: {len(pass_students)} students\n"
-        for student in pass_students:
-            message += f"  {student.id} {student.name} (avg {student.avg_mark()})\n"
+        message = f"Pass/Fail Partition:\n\nPASS: {groups['pass']['count']} students\n"
+        for student in groups['pass']['students']:
+            message += f"  {student['id']} {student['name']} (avg {student['avg']})\n"
             
-        message += f"\nFAIL: {len(fail_students)} students\n"
-        for student in fail_students:
-            message += f"  {student.id} {student.name} (avg {student.avg_mark()})\n"
+        message += f"\nFAIL: {groups['fail']['count']} students\n"
+        for student in groups['fail']['students']:
+            message += f"  {student['id']} {student['name']} (avg {student['avg']})\n"
             
         messagebox.showinfo("Pass/Fail Partition", message)
         
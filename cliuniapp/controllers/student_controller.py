@@ -3,7 +3,7 @@ Student controller - handles registration and login
 """
 
 import random
-from models.database import Database
+from models.backends import open_database
 from models.student import Student
 from services.auth_service import is_valid_email, is_valid_password, authenticate
 from services.id_service import new_student_id
@@ -14,8 +14,8 @@ from utils.ioutils import safe_input, print_error, print_success
 class StudentController:
     """Student system controller for registration and login"""
     
-    def __init__(self):
-        self.db = Database()
+    def __init__(self, db=None):
+        self.db = db if db is not None else open_database()
         self.enrolment_controller = EnrolmentController()
     
     def run(self):
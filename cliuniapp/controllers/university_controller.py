@@ -2,6 +2,7 @@
 University controller - main menu system
 """
 
+from models.backends import open_database
 from controllers.student_controller import StudentController
 from controllers.admin_controller import AdminController
 from utils.ioutils import safe_input, print_error
@@ -10,9 +11,11 @@ from utils.ioutils import safe_input, print_error
 class UniversityController:
     """Main university system controller"""
     
-    def __init__(self):
-        self.student_controller = StudentController()
-        self.admin_controller = AdminController()
+    def __init__(self, db=None):
+        # Both menus share one store so in-memory backends see the same data
+        db = db if db is not None else open_database()
+        self.student_controller = StudentController(db)
+        self.admin_controller = AdminController(db)
     
     def run(self):
         """Main application loop"""
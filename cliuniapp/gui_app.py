@@ -11,7 +11,7 @@ from controllers.gui_controller import GUIController
 class UniversityGUI:
     """Main GUI application for the University Student System"""
     
-    def __init__(self):
+    def __init__(self, db=None):
         self.root = tk.Tk()
         self.root.title("University Student System")
         self.root.geometry("1000x700")
@@ -25,7 +25,7 @@ class UniversityGUI:
         self.setup_styles()
         
         # Initialize controller
-        self.controller = GUIController()
+        self.controller = GUIController(db)
         
         # Create main interface
         self.create_main_interface()
@@ -0,0 +1,63 @@
+"""
+Storage backend registry
+
+Backends are selected by name, either explicitly or through the
+STUDENT_STORAGE environment variable. STUDENT_DATA_PATH overrides the
+backend's default data file.
+"""
+
+import os
+from typing import Callable, Dict, List, NamedTuple, Optional
+from .binary_database import BinaryDatabase
+from .database import Database
+from .journaled_database import JournaledDatabase
+from .memory_database import MemoryDatabase
+from .sqlite_database import SqliteDatabase
+
+STORAGE_ENV = "STUDENT_STORAGE"
+DATA_PATH_ENV = "STUDENT_DATA_PATH"
+DEFAULT_BACKEND = "pickle"
+
+
+class Backend(NamedTuple):
+    """A registered storage backend"""
+    factory: Callable[..., object]
+    persistent: bool
+    description: str
+
+
+_BACKENDS: Dict[str, Backend] = {}
+
+
+def register_backend(name: str, factory: Callable[..., object], persistent: bool = True,
+                     description: str = "") -> None:
+    """Register a storage backend factory taking an optional file path"""
+    _BACKENDS[name] = Backend(factory, persistent, description)
+
+
+def backend_names() -> List[str]:
+    """Names of all registered backends"""
+    return list(_BACKENDS)
+
+
+def get_backend(name: str) -> Backend:
+    """Look up a registered backend by name"""
+    try:
+        return _BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown storage backend '{name}'. Choose one of: {', '.join(_BACKENDS)}") from None
+
+
+def open_database(name: Optional[str] = None, file_path: Optional[str] = None):
+    """Create a storage backend, defaulting to the one configured in the environment"""
+    name = name or os.environ.get(STORAGE_ENV) or DEFAULT_BACKEND
+    file_path = file_path or os.environ.get(DATA_PATH_ENV)
+    backend = get_backend(name)
+    return backend.factory(file_path) if file_path else backend.factory()
+
+
+register_backend("pickle", Database, description="pickle snapshot rewritten on every change")
+register_backend("journal", JournaledDatabase, description="pickle snapshot plus append-only journal")
+register_backend("binary", BinaryDatabase, description="compact struct-encoded records")
+register_backend("sqlite", SqliteDatabase, description="SQLite tables in WAL mode")
+register_backend("memory", MemoryDatabase, persistent=False, description="in-process only, nothing written to disk")
@@ -0,0 +1,113 @@
+"""
+Database persistence layer using the compact binary record format
+"""
+
+import mmap
+from typing import BinaryIO, Iterator, List, Optional, Tuple
+from . import codec
+from . import offset_index
+from .database import Database
+from .student import Student
+
+# Returned by _indexed_lookup when the sidecar index cannot answer
+_UNINDEXED = object()
+
+
+class BinaryDatabase(Database):
+    """Database that stores students in the struct-based binary format
+
+    Behaves like the pickle Database (same cache and change detection) but
+    the data file holds compact versioned frames instead of pickled objects,
+    so it is smaller and carries no class paths.
+
+    Every write also refreshes a sidecar index (``<file_path>.idx``) mapping
+    id and email to frame offsets. While the in-memory cache is cold or stale,
+    find_by_id/find_by_email use it to decode just the matching frame from
+    the memory-mapped data file instead of loading every student, so a single
+    CLI login no longer costs a full read.
+    """
+
+    def __init__(self, file_path: str = "io/students.bin"):
+        super().__init__(file_path)
+        self.index_path = file_path + ".idx"
+        self._frame_offsets: List[int] = []
+
+    def _dump(self, students: List[Student], f: BinaryIO) -> None:
+        """Serialize students as binary frames"""
+        self._frame_offsets = codec.dump_students(students, f)
+
+    def _parse(self, f: BinaryIO) -> List[Student]:
+        """Deserialize students from binary frames"""
+        try:
+            return codec.load_students(f)
+        except codec.CodecError:
+            # File is corrupted or empty, treat as no students
+            return []
+
+    def iter_students(self) -> Iterator[Student]:
+        """Yield every student, decoding frames straight from the data file
+
+        When the cache is cold the file is memory-mapped and decoded one frame
+        at a time, so reports over large cohorts run in constant memory.
+        """
+        signature = self._file_signature()
+        if signature is not None and signature == self._signature:
+            yield from list(self._idx.by_id.values())
+            return
+        self.ensure_file()
+        with open(self.file_path, 'rb') as f, \
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            try:
+                for _, student in codec.iter_students(data, codec.check_header(data)):
+                    yield student
+            except codec.CodecError:
+                # File is corrupted, stop like a failed full load would
+                return
+
+    def _write_file(self, students: List[Student]) -> None:
+        """Write the data file, then an index matching it"""
+        super()._write_file(students)
+        entries = [(s.id, s.email, offset) for s, offset in zip(students, self._frame_offsets)]
+        offset_index.write_index(self.index_path, entries, self._signature)
+
+    def _indexed_lookup(self, table: str, key: str, signature: Tuple[int, int, int]):
+        """Decode only the frame matching key, or return _UNINDEXED if the index can't be used"""
+        index = offset_index.open_index(self.index_path, signature)
+        if index is None:
+            return _UNINDEXED
+        try:
+            with open(self.file_path, 'rb') as f, \
+                    mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                for offset in offset_index.candidate_offsets(index, table, key):
+                    student, _ = codec.decode_student(data, offset)
+                    if (student.id if table == 'id' else student.email) == key:
+                        return student
+        except (OSError, ValueError):
+            # ValueError covers CodecError and mapping an empty file
+            return _UNINDEXED
+        finally:
+            index.close()
+        return None
+
+    def _find(self, table: str, key: str) -> Optional[Student]:
+        """Answer from the cache when it is current, otherwise from the index"""
+        signature = self._file_signature()
+        if signature is not None and signature == self._signature:
+            if table == 'id':
+                return self._idx.by_id.get(key)
+            return self._idx.find_by_email(key)
+        if signature is not None:
+            student = self._indexed_lookup(table, key, signature)
+            if student is not _UNINDEXED:
+                return student
+        if table == 'id':
+            return super().find_by_id(key)
+        return super().find_by_email(key)
+
+    def find_by_email(self, email: str) -> Optional[Student]:
+        """Find a student by email address"""
+        return self._find('email', email)
+
+    def find_by_id(self, student_id: str) -> Optional[Student]:
+        """Find a student by ID"""
+        return self._find('id', student_id)
@@ -0,0 +1,68 @@
+"""
+Feed of recent changes to a shared store, for pushing to live clients
+"""
+
+import threading
+from collections import deque
+from typing import List, NamedTuple, Optional
+from .student import Student
+
+# Kinds of change event
+UPSERTED = 'upserted'
+REMOVED = 'removed'
+CLEARED = 'cleared'
+# The subscriber missed events or the whole roster was replaced; it must reload
+RESET = 'reset'
+
+
+class ChangeEvent(NamedTuple):
+    """One change, numbered in the order it was made"""
+    seq: int
+    kind: str
+    student_id: Optional[str] = None
+    student: Optional[Student] = None
+
+
+class ChangeFeed:
+    """Numbered change events with a bounded history that subscribers poll from
+
+    Publishing never blocks on subscribers: each one remembers the last
+    sequence number it has seen and asks for everything after it. A
+    subscriber that falls further behind than the history reaches gets a
+    single reset event instead.
+    """
+
+    def __init__(self, history: int = 1000):
+        self._cond = threading.Condition(threading.Lock())
+        self._events = deque(maxlen=history)
+        self.seq = 0
+        self.closed = False
+
+    def publish(self, kind: str, student_id: Optional[str] = None, student: Optional[Student] = None) -> None:
+        """Record a change and wake every waiting subscriber"""
+        with self._cond:
+            self.seq += 1
+            self._events.append(ChangeEvent(self.seq, kind, student_id, student))
+            self._cond.notify_all()
+
+    def reset_event(self) -> ChangeEvent:
+        """Reset event for a subscriber starting from an unknown point"""
+        with self._cond:
+            return ChangeEvent(self.seq, RESET)
+
+    def close(self) -> None:
+        """Wake every waiting subscriber and stop future waits from blocking"""
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    def wait(self, after: int, timeout: float) -> List[ChangeEvent]:
+        """Events numbered after `after`, waiting up to timeout for one. Empty on timeout or close"""
+        with self._cond:
+            self._cond.wait_for(lambda: self.seq > after or self.closed, timeout)
+            if self.seq <= after:
+                return []
+            if self._events[0].seq > after + 1:
+                # Some of the events the subscriber needs have been dropped
+                return [ChangeEvent(self.seq, RESET)]
+            return [event for event in self._events if event.seq > after]
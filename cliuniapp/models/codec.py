@@ -0,0 +1,132 @@
+"""
+Compact binary record format for students and subjects
+
+A data file is a header (magic + schema version) followed by one frame per
+student. Each frame is self-describing so it can be decoded on its own:
+
+    u32   frame length (bytes after this field)
+    6s    student id (6 ASCII digits)
+    u16   name length, u16 email length, u16 password length
+    u8    subject count (0-4)
+    ...   name, email, password (UTF-8)
+    per subject: 3s subject id, u8 mark, u8 grade code
+
+All integers are little endian.
+"""
+
+import struct
+from typing import BinaryIO, Iterator, List, Tuple
+from .student import Student
+from .subject import Subject
+
+MAGIC = b'USDB'
+SCHEMA_VERSION = 1
+
+GRADES = ('HD', 'D', 'C', 'P', 'F')
+_GRADE_CODES = {grade: code for code, grade in enumerate(GRADES)}
+
+_FILE_HEADER = struct.Struct('<4sB')
+_FRAME_HEADER = struct.Struct('<I6sHHHB')
+_SUBJECT = struct.Struct('<3sBB')
+_LENGTH = struct.Struct('<I')
+
+FILE_HEADER_SIZE = _FILE_HEADER.size
+
+
+class CodecError(ValueError):
+    """Raised when data cannot be encoded in, or decoded from, the binary format"""
+
+
+def encode_header() -> bytes:
+    """Encode the file header for the current schema version"""
+    return _FILE_HEADER.pack(MAGIC, SCHEMA_VERSION)
+
+
+def check_header(buf) -> int:
+    """Validate a file header, returning the offset of the first frame"""
+    if len(buf) < _FILE_HEADER.size:
+        raise CodecError("File is too short for a header")
+    magic, version = _FILE_HEADER.unpack_from(buf, 0)
+    if magic != MAGIC:
+        raise CodecError("Not a binary student data file")
+    if version != SCHEMA_VERSION:
+        raise CodecError(f"Unsupported schema version {version}")
+    return _FILE_HEADER.size
+
+
+def encode_student(student: Student) -> bytes:
+    """Encode one student as a frame"""
+    student_id = student.id.encode('ascii')
+    name = student.name.encode('utf-8')
+    email = student.email.encode('utf-8')
+    password = student.password.encode('utf-8')
+    if len(student_id) != 6:
+        raise CodecError(f"Student id must be 6 characters: {student.id!r}")
+    if len(student.subjects) > 4:
+        raise CodecError("Cannot encode more than four (4) subjects")
+    if max(len(name), len(email), len(password)) > 0xFFFF:
+        raise CodecError("Field too long to encode")
+
+    parts = [b'', name, email, password]
+    for subject in student.subjects:
+        subject_id = subject.id.encode('ascii')
+        if len(subject_id) != 3:
+            raise CodecError(f"Subject id must be 3 characters: {subject.id!r}")
+        if subject.grade not in _GRADE_CODES:
+            raise CodecError(f"Unknown grade {subject.grade!r}")
+        if not 0 <= subject.mark <= 255:
+            raise CodecError(f"Mark out of range: {subject.mark}")
+        parts.append(_SUBJECT.pack(subject_id, subject.mark, _GRADE_CODES[subject.grade]))
+    length = _FRAME_HEADER.size - _LENGTH.size + sum(len(part) for part in parts)
+    parts[0] = _FRAME_HEADER.pack(length, student_id, len(name), len(email), len(password),
+                                  len(student.subjects))
+    return b''.join(parts)
+
+
+def decode_student(buf, offset: int = 0) -> Tuple[Student, int]:
+    """Decode the frame at offset, returning the student and the next frame's offset"""
+    try:
+        length, student_id, name_len, email_len, password_len, count = _FRAME_HEADER.unpack_from(buf, offset)
+        end = offset + _LENGTH.size + length
+        if end > len(buf):
+            raise CodecError("Truncated frame")
+        pos = offset + _FRAME_HEADER.size
+        name = bytes(buf[pos:pos + name_len]).decode('utf-8')
+        pos += name_len
+        email = bytes(buf[pos:pos + email_len]).decode('utf-8')
+        pos += email_len
+        password = bytes(buf[pos:pos + password_len]).decode('utf-8')
+        pos += password_len
+        subjects = [Subject(subject_id.decode('ascii'), mark, GRADES[code])
+                    for subject_id, mark, code in _SUBJECT.iter_unpack(buf[pos:pos + count * _SUBJECT.size])]
+    except (struct.error, UnicodeDecodeError, IndexError) as e:
+        raise CodecError(f"Corrupt frame at offset {offset}: {e}") from None
+    return Student(student_id.decode('ascii'), name, email, password, subjects), end
+
+
+def iter_students(buf, offset: int = FILE_HEADER_SIZE) -> Iterator[Tuple[int, Student]]:
+    """Yield (frame offset, student) for every frame from offset to the end of buf"""
+    size = len(buf)
+    while offset < size:
+        student, next_offset = decode_student(buf, offset)
+        yield offset, student
+        offset = next_offset
+
+
+def dump_students(students: List[Student], f: BinaryIO) -> List[int]:
+    """Write a header and one frame per student to a binary file. Returns each frame's offset"""
+    frames = [encode_student(student) for student in students]
+    offsets = []
+    offset = FILE_HEADER_SIZE
+    for frame in frames:
+        offsets.append(offset)
+        offset += len(frame)
+    f.write(encode_header())
+    f.write(b''.join(frames))
+    return offsets
+
+
+def load_students(f: BinaryIO) -> List[Student]:
+    """Read every student from a binary file"""
+    buf = f.read()
+    return [student for _, student in iter_students(buf, check_header(buf))]
@@ -0,0 +1,123 @@
+"""
+Cohort aggregates maintained incrementally by the storage backends
+"""
+
+from typing import Dict, Iterable, Optional
+from .student import Student
+
+GRADE_ORDER = ("HD", "D", "C", "P", "F")
+
+COUNTERS = ("students", "pass", "fail", "subjects", "mark_sum") + tuple(f"grade_{g}" for g in GRADE_ORDER)
+
+_GRADE_RANK = {grade: rank for rank, grade in enumerate(GRADE_ORDER)}
+
+
+def highest_grade(student: Student) -> Optional[str]:
+    """Best grade among a student's subjects, or None if not enrolled in any"""
+    if not student.subjects:
+        return None
+    # Unrecognised grades rank as F, like the original admin report
+    best = "F"
+    for subject in student.subjects:
+        if _GRADE_RANK.get(subject.grade, _GRADE_RANK["F"]) < _GRADE_RANK[best]:
+            best = subject.grade
+    return best
+
+
+def student_counters(student: Student) -> Dict[str, int]:
+    """One student's contribution to each cohort counter"""
+    passed = student.is_pass()
+    counters = {
+        "students": 1,
+        "pass": 1 if passed else 0,
+        "fail": 0 if passed else 1,
+        "subjects": len(student.subjects),
+        "mark_sum": sum(subject.mark for subject in student.subjects),
+    }
+    grade = highest_grade(student)
+    if grade is not None:
+        counters[f"grade_{grade}"] = 1
+    return counters
+
+
+def counter_deltas(old: Optional[Dict[str, int]], new: Optional[Dict[str, int]]) -> Dict[str, int]:
+    """Non-zero counter changes when a student's contribution goes from old to new"""
+    deltas = dict(new or {})
+    for name, value in (old or {}).items():
+        deltas[name] = deltas.get(name, 0) - value
+    return {name: value for name, value in deltas.items() if value}
+
+
+class CohortStats:
+    """Grade buckets, pass/fail counts and mark totals for a cohort
+
+    Backends keep one of these up to date by applying each student's
+    contribution as a delta on upsert and remove, so reading it is O(1).
+    Grade buckets count students with at least one subject by their highest
+    grade, matching the admin "group students" report.
+    """
+
+    def __init__(self, counters: Optional[Dict[str, int]] = None):
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        if counters:
+            self.counters.update(counters)
+
+    @classmethod
+    def from_students(cls, students: Iterable[Student]) -> "CohortStats":
+        """Compute stats with a full pass over students"""
+        stats = cls()
+        for student in students:
+            stats.apply(student_counters(student))
+        return stats
+
+    def apply(self, deltas: Dict[str, int], sign: int = 1) -> None:
+        """Add (or with sign=-1, subtract) counter deltas"""
+        for name, value in deltas.items():
+            self.counters[name] = self.counters.get(name, 0) + sign * value
+
+    def copy(self) -> "CohortStats":
+        """Independent copy of these stats"""
+        return CohortStats(self.counters)
+
+    @property
+    def students(self) -> int:
+        return self.counters["students"]
+
+    @property
+    def pass_count(self) -> int:
+        return self.counters["pass"]
+
+    @property
+    def fail_count(self) -> int:
+        return self.counters["fail"]
+
+    @property
+    def subject_count(self) -> int:
+        return self.counters["subjects"]
+
+    @property
+    def mark_sum(self) -> int:
+        return self.counters["mark_sum"]
+
+    @property
+    def grade_counts(self) -> Dict[str, int]:
+        """Students per highest grade, in HD..F order"""
+        return {grade: self.counters[f"grade_{grade}"] for grade in GRADE_ORDER}
+
+    def average_mark(self) -> int:
+        """Average mark across every enrolled subject in the cohort"""
+        if not self.subject_count:
+            return 0
+        return self.mark_sum // self.subject_count
+
+    def to_dict(self) -> Dict[str, object]:
+        """JSON-friendly summary"""
+        return {
+            "students": self.students,
+            "grades": self.grade_counts,
+            "pass": self.pass_count,
+            "fail": self.fail_count,
+            "subjects": self.subject_count,
+            "mark_sum": self.mark_sum,
+            "average_mark": self.average_mark(),
+        }
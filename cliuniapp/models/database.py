@@ -2,18 +2,111 @@
 Database persistence layer using pickle
 """
 
+import itertools
 import pickle
 import os
-from typing import List, Optional
+import tempfile
+import threading
+from contextlib import contextmanager, nullcontext
+from typing import BinaryIO, ContextManager, Dict, Iterable, Iterator, List, Optional, Tuple
+from .cohort_stats import CohortStats, student_counters
 from .student import Student
 
+try:
+    import fcntl
+except ImportError:  # Windows: writers in different processes are not coordinated
+    fcntl = None
+
+
+class StudentIndex:
+    """Students keyed by id and email, plus the cohort stats derived from them"""
+
+    def __init__(self, students: Iterable[Student] = ()):
+        self.by_id: Dict[str, Student] = {}
+        self.id_by_email: Dict[str, str] = {}
+        self.email_by_id: Dict[str, str] = {}
+        # Each student's last counted contribution, so stats can be updated by
+        # delta without re-deriving it from the instance being replaced
+        self.counters_by_id: Dict[str, Dict[str, int]] = {}
+        self.stats = CohortStats()
+        for student in students:
+            self.add(student)
+
+    def add(self, student: Student) -> None:
+        """Add or replace a single student"""
+        self._unindex_email(student.id)
+        previous = self.counters_by_id.get(student.id)
+        if previous is not None:
+            self.stats.apply(previous, -1)
+        counters = student_counters(student)
+        self.stats.apply(counters)
+        self.counters_by_id[student.id] = counters
+        self.by_id[student.id] = student
+        self.id_by_email[student.email] = student.id
+        self.email_by_id[student.id] = student.email
+
+    def remove(self, student_id: str) -> Optional[Student]:
+        """Remove a student, returning it if present"""
+        student = self.by_id.pop(student_id, None)
+        if student is not None:
+            self._unindex_email(student_id)
+            self.stats.apply(self.counters_by_id.pop(student_id), -1)
+        return student
+
+    def find_by_email(self, email: str) -> Optional[Student]:
+        """Look up a student by email"""
+        student_id = self.id_by_email.get(email)
+        return self.by_id.get(student_id) if student_id is not None else None
+
+    def _unindex_email(self, student_id: str) -> None:
+        """Drop the email entry recorded for a student id"""
+        # The recorded email is used, so unindexing never depends on what the
+        # stored instance holds
+        email = self.email_by_id.pop(student_id, None)
+        if email is not None and self.id_by_email.get(email) == student_id:
+            del self.id_by_email[email]
+
 
 class Database:
-    """Database class for persisting student data using pickle"""
-    
+    """Database class for persisting student data using pickle
+
+    Students are kept resident in memory with dict indexes on id and email.
+    The cache is only reloaded when the data file's inode, size or mtime
+    changes, so lookups are O(1) while writes made by another process (e.g.
+    the CLI while the web server is running) are still picked up.
+
+    Lookups return the cached Student instances, which other readers may be
+    holding, so they are never changed once stored: to change a student,
+    upsert a changed ``copy()`` of it.
+
+    data_version() increases whenever the cached data changes, whether by a
+    write through this instance or a reload after another process wrote.
+
+    Upserts, removals and clears made inside ``with db.batch():`` are
+    applied to the cache straight away but persisted together when the block
+    ends.
+
+    Every write holds an exclusive lock on ``<file_path>.lock``, shared with
+    other processes, from refreshing the cache to persisting the change, so
+    writers in several processes (web server workers, the CLI) never persist
+    a cache that misses each other's changes.
+    """
+
     def __init__(self, file_path: str = "io/students.data"):
         self.file_path = file_path
-    
+        self._signature: Optional[Tuple[int, int, int]] = None
+        self._idx = StudentIndex()
+        self._version = 0
+        # Serializes reloads so concurrent readers never rebuild the cache twice
+        self._reload_lock = threading.RLock()
+        # Records of changes waiting to be persisted while a batch is open
+        self._pending: Optional[List[Tuple]] = None
+        # Serializes writers in this process; the lock file serializes processes
+        self._write_lock = threading.Lock()
+        self._lock_owner: Optional[int] = None
+        self._lock_file: Optional[BinaryIO] = None
+        self._lock_pid: Optional[int] = None
+
     def ensure_file(self) -> None:
         """Create the data file if it doesn't exist"""
         directory = os.path.dirname(self.file_path)
@@ -22,58 +115,241 @@ class Database:
         if not os.path.exists(self.file_path):
             # Write empty list directly without calling write_all to avoid recursion
             with open(self.file_path, 'wb') as f:
-                pickle.dump([], f)
-    
-    def read_all(self) -> List[Student]:
-        """Read all students from the data file"""
-        self.ensure_file()
+                self._dump([], f)
+
+    def _dump(self, students: List[Student], f: BinaryIO) -> None:
+        """Serialize students to an open file"""
+        pickle.dump(students, f)
+
+    def _parse(self, f: BinaryIO) -> List[Student]:
+        """Deserialize students from an open file"""
         try:
-            with open(self.file_path, 'rb') as f:
-                return pickle.load(f)
+            return pickle.load(f)
         except (EOFError, pickle.UnpicklingError):
-            # File is corrupted or empty, return empty list
+            # File is corrupted or empty, treat as no students
             return []
-    
+
+    def _file_signature(self) -> Optional[Tuple[int, int, int]]:
+        """Return (inode, size, mtime) of the data file, or None if missing"""
+        try:
+            st = os.stat(self.file_path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+    def _load(self) -> Tuple[List[Student], Tuple[int, int, int]]:
+        """Read the data file, returning the students and the file signature"""
+        with open(self.file_path, 'rb') as f:
+            st = os.fstat(f.fileno())
+            signature = (st.st_ino, st.st_size, st.st_mtime_ns)
+            students = self._parse(f)
+        return students, signature
+
+    def _rebuild_index(self, students: List[Student]) -> None:
+        """Replace the in-memory indexes with the given students"""
+        # Built aside and swapped in, so concurrent readers see old or new, never partial
+        self._idx = StudentIndex(students)
+        self._version += 1
+
+    def _index(self, student: Student) -> None:
+        """Add or replace a single student in the in-memory indexes"""
+        self._idx.add(student)
+        self._version += 1
+
+    def _unindex(self, student_id: str) -> Optional[Student]:
+        """Remove a student from the in-memory indexes, returning it if present"""
+        student = self._idx.remove(student_id)
+        if student is not None:
+            self._version += 1
+        return student
+
+    def _refresh(self) -> None:
+        """Reload the cache if the data file changed since it was last read"""
+        if self._pending is not None:
+            return  # Batched changes exist only in the cache until the batch ends
+        signature = self._file_signature()
+        if signature is not None and signature == self._signature:
+            return
+        with self._reload_lock:
+            signature = self._file_signature()
+            if signature is not None and signature == self._signature:
+                return  # Another thread reloaded while we waited
+            self.ensure_file()
+            students, signature = self._load()
+            self._rebuild_index(students)
+            self._signature = signature
+
+    def _write_file(self, students: List[Student]) -> None:
+        """Atomically replace the data file with the given students"""
+        self.ensure_file()
+        directory = os.path.dirname(self.file_path) or '.'
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.students-', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                self._dump(students, f)
+                f.flush()
+                st = os.fstat(f.fileno())
+            os.replace(tmp_path, self.file_path)
+        except BaseException:
+            # Leave the cache to be reloaded from whatever is on disk
+            self._signature = None
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self._signature = (st.st_ino, st.st_size, st.st_mtime_ns)
+
+    def _persist_upsert(self, student: Student) -> None:
+        """Persist a student already applied to the cache"""
+        self._write_file(list(self._idx.by_id.values()))
+
+    def _persist_remove(self, student_id: str) -> None:
+        """Persist a removal already applied to the cache"""
+        self._write_file(list(self._idx.by_id.values()))
+
+    def _persist_batch(self, records: List[Tuple]) -> None:
+        """Persist ('upsert', student), ('remove', id) and ('write_all',) records already applied to the cache"""
+        self._write_file(list(self._idx.by_id.values()))
+
+    @contextmanager
+    def _file_lock(self) -> Iterator[None]:
+        """Hold the exclusive lock file other processes' writers wait on"""
+        if fcntl is None:
+            yield
+            return
+        if self._lock_pid != os.getpid():
+            # A forked child reopens it: locks taken through the parent's open
+            # file would not exclude the parent or the child's siblings
+            try:
+                self._lock_file = open(self.file_path + '.lock', 'ab')
+            except FileNotFoundError:
+                self.ensure_file()
+                self._lock_file = open(self.file_path + '.lock', 'ab')
+            self._lock_pid = os.getpid()
+        fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def locked(self) -> ContextManager["Database"]:
+        """Hold the write lock, shared with other processes, for a read-modify-write
+
+        The cache is refreshed once the lock is held, so changes made in the
+        block are based on the latest data and no other writer can persist
+        in between. Reentrant; every write takes it for itself too.
+        """
+        if self._lock_owner == threading.get_ident():
+            return nullcontext(self)
+        return self._locked()
+
+    @contextmanager
+    def _locked(self) -> Iterator["Database"]:
+        """Take the write lock for a thread not already holding it"""
+        with self._write_lock, self._file_lock():
+            self._lock_owner = threading.get_ident()
+            try:
+                self._refresh()
+                yield self
+            finally:
+                self._lock_owner = None
+
+    @contextmanager
+    def batch(self) -> Iterator["Database"]:
+        """Persist every upsert and removal made in the block with a single write
+
+        If the block raises, nothing is persisted and the cache is reloaded
+        from the data file on next use. Nested batches join the outer one.
+        """
+        with self.locked():
+            if self._pending is not None:
+                yield self
+                return
+            self._pending = []
+            try:
+                yield self
+            except BaseException:
+                self._pending = None
+                self._signature = None
+                raise
+            records, self._pending = self._pending, None
+            if records:
+                try:
+                    self._persist_batch(records)
+                except BaseException:
+                    self._signature = None
+                    raise
+
+    def read_all(self) -> List[Student]:
+        """Read all students from the data file"""
+        self._refresh()
+        return list(self._idx.by_id.values())
+
+    def iter_students(self) -> Iterator[Student]:
+        """Yield every student one at a time"""
+        # The whole pickle is already resident, so this walks the cache
+        self._refresh()
+        yield from list(self._idx.by_id.values())
+
+    def iter_batches(self, size: int) -> Iterator[List[Student]]:
+        """Yield students in lists of at most size"""
+        students = self.iter_students()
+        while True:
+            batch = list(itertools.islice(students, size))
+            if not batch:
+                return
+            yield batch
+
+    def cohort_stats(self) -> CohortStats:
+        """Grade buckets, pass/fail counts and mark totals, maintained on every change"""
+        self._refresh()
+        return self._idx.stats.copy()
+
+    def data_version(self) -> int:
+        """Counter that increases on every change to the data"""
+        self._refresh()
+        return self._version
+
     def write_all(self, students: List[Student]) -> None:
         """Write all students to the data file"""
-        self.ensure_file()
-        with open(self.file_path, 'wb') as f:
-            pickle.dump(students, f)
-    
+        with self.locked():
+            if self._pending is not None:
+                # Supersedes the batch's earlier changes; the whole cache is persisted when it ends
+                self._rebuild_index(students)
+                self._pending.append(('write_all',))
+                return
+            self._write_file(students)
+            self._rebuild_index(students)
+
     def clear(self) -> None:
         """Clear all data from the database"""
         self.write_all([])
-    
+
     def upsert(self, student: Student) -> None:
         """Insert or update a student in the database"""
-        students = self.read_all()
-        # Remove existing student with same ID if it exists
-        students = [s for s in students if s.id != student.id]
-        students.append(student)
-        self.write_all(students)
-    
+        with self.locked():
+            self._index(student)
+            if self._pending is not None:
+                self._pending.append(('upsert', student))
+            else:
+                self._persist_upsert(student)
+
     def remove_by_id(self, student_id: str) -> bool:
         """Remove a student by ID. Returns True if found and removed"""
-        students = self.read_all()
-        original_count = len(students)
-        students = [s for s in students if s.id != student_id]
-        removed = len(students) < original_count
-        if removed:
-            self.write_all(students)
-        return removed
-    
+        with self.locked():
+            if self._unindex(student_id) is None:
+                return False
+            if self._pending is not None:
+                self._pending.append(('remove', student_id))
+            else:
+                self._persist_remove(student_id)
+            return True
+
     def find_by_email(self, email: str) -> Optional[Student]:
         """Find a student by email address"""
-        students = self.read_all()
-        for student in students:
-            if student.email == email:
-                return student
-        return None
-    
+        self._refresh()
+        return self._idx.find_by_email(email)
+
     def find_by_id(self, student_id: str) -> Optional[Student]:
         """Find a student by ID"""
-        students = self.read_all()
-        for student in students:
-            if student.id == student_id:
-                return student
-        return None
+        self._refresh()
+        return self._idx.by_id.get(student_id)
@@ -0,0 +1,196 @@
+"""
+Pickle database with an append-only write-ahead journal
+"""
+
+import os
+import pickle
+import struct
+import zlib
+from typing import BinaryIO, Iterator, List, Tuple
+from .database import Database
+from .student import Student
+
+# Each journal frame is: payload length, crc32 of payload, pickled record
+_FRAME_HEADER = struct.Struct('<II')
+
+
+class JournaledDatabase(Database):
+    """Pickle database that journals upserts and removals
+
+    Instead of rewriting the whole snapshot on every change, upserts and
+    removals are appended to ``<file_path>.journal`` and replayed on top of
+    the snapshot when loading, so a write costs O(record). Once the journal
+    grows past ``compact_threshold`` bytes it is folded back into the
+    snapshot and deleted.
+
+    The journal starts with a frame naming the snapshot (by inode) it applies
+    to. Snapshots are always written to a new file and renamed into place, so
+    a journal left behind by an interrupted compaction is recognised as stale
+    and ignored.
+    """
+
+    def __init__(self, file_path: str = "io/students.data", compact_threshold: int = 1 << 20):
+        super().__init__(file_path)
+        self.journal_path = file_path + ".journal"
+        self.compact_threshold = compact_threshold
+        self._journal_ino = None
+        self._journal_offset = 0
+
+    def _refresh(self) -> None:
+        """Reload the snapshot if it changed, then replay any new journal frames"""
+        if self._pending is not None:
+            return  # Batched changes exist only in the cache until the batch ends
+        signature = self._file_signature()
+        if signature is not None and signature == self._signature and self._journal_unchanged():
+            return
+        with self._reload_lock:
+            signature = self._file_signature()
+            if signature is None or signature != self._signature:
+                self.ensure_file()
+                students, self._signature = self._load()
+                self._rebuild_index(students)
+                self._journal_ino, self._journal_offset = None, 0
+            self._replay_journal()
+
+    def _journal_unchanged(self) -> bool:
+        """Whether the journal is exactly as it was after the last replay"""
+        try:
+            st = os.stat(self.journal_path)
+        except FileNotFoundError:
+            return self._journal_ino is None
+        return st.st_ino == self._journal_ino and st.st_size == self._journal_offset
+
+    def _replay_journal(self) -> None:
+        """Apply journal frames appended since the last replay"""
+        try:
+            st = os.stat(self.journal_path)
+            if st.st_ino == self._journal_ino and st.st_size == self._journal_offset:
+                return
+            f = open(self.journal_path, 'rb')
+        except FileNotFoundError:
+            self._journal_ino, self._journal_offset = None, 0
+            return
+        with f:
+            st = os.fstat(f.fileno())
+            if st.st_ino != self._journal_ino or st.st_size < self._journal_offset:
+                if self._journal_offset:
+                    # The journal was replaced underneath us, start over from the snapshot
+                    students, self._signature = self._load()
+                    self._rebuild_index(students)
+                self._journal_ino, self._journal_offset = st.st_ino, 0
+            if st.st_size == self._journal_offset:
+                return
+
+            f.seek(self._journal_offset)
+            offset = self._journal_offset
+            torn = False
+            for record, end in _read_frames(f, offset):
+                if record is None:
+                    torn = True
+                    break
+                if record[0] == 'base':
+                    if offset == 0 and record[1] != self._signature[0]:
+                        # Left over from a compaction that was interrupted after
+                        # the new snapshot was written; its changes are already in it
+                        self._discard_journal()
+                        return
+                else:
+                    self._apply(record)
+                offset = end
+
+        if torn:
+            # A crash interrupted an append; drop the partial frame so later
+            # appends are not hidden behind it
+            os.truncate(self.journal_path, offset)
+        self._journal_offset = offset
+
+    def _apply(self, record: Tuple) -> None:
+        """Apply a single journal record to the in-memory indexes"""
+        op = record[0]
+        if op == 'upsert':
+            self._index(record[1])
+        elif op == 'remove':
+            self._unindex(record[1])
+
+    def _append(self, *records: Tuple) -> None:
+        """Append records to the journal, compacting it if it grew too large"""
+        frame = b''.join(_encode_frame(record) for record in records)
+        if self._journal_offset == 0:
+            frame = _encode_frame(('base', self._signature[0])) + frame
+
+        # O_APPEND with a single write keeps frames from concurrent writers intact
+        fd = os.open(self.journal_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, frame)
+            st = os.fstat(fd)
+        finally:
+            os.close(fd)
+
+        if self._journal_offset == 0 and st.st_size == len(frame):
+            self._journal_ino = st.st_ino
+        if st.st_ino == self._journal_ino and st.st_size == self._journal_offset + len(frame):
+            self._journal_offset = st.st_size
+        # Otherwise another process appended too; the next refresh replays both
+
+        if st.st_size >= self.compact_threshold:
+            self.compact()
+
+    def _discard_journal(self) -> None:
+        """Delete the journal file"""
+        try:
+            os.remove(self.journal_path)
+        except FileNotFoundError:
+            pass
+        self._journal_ino, self._journal_offset = None, 0
+
+    def _persist_upsert(self, student: Student) -> None:
+        """Journal an upsert"""
+        self._append(('upsert', student))
+
+    def _persist_remove(self, student_id: str) -> None:
+        """Journal a removal"""
+        self._append(('remove', student_id))
+
+    def _persist_batch(self, records: List[Tuple]) -> None:
+        """Journal a batch of changes with one append, or snapshot it if it replaced every student"""
+        if any(record[0] == 'write_all' for record in records):
+            self._write_file(list(self._idx.by_id.values()))
+            self._discard_journal()
+        else:
+            self._append(*records)
+
+    def write_all(self, students: List[Student]) -> None:
+        """Write all students to a fresh snapshot and drop the journal"""
+        with self.locked():
+            super().write_all(students)
+            if self._pending is None:
+                self._discard_journal()
+
+    def compact(self) -> None:
+        """Fold the journal into a new snapshot"""
+        with self.locked():
+            self.write_all(list(self._idx.by_id.values()))
+
+
+def _encode_frame(record: Tuple) -> bytes:
+    """Encode a journal record as a length and checksum prefixed frame"""
+    payload = pickle.dumps(record, protocol=pickle.HIGHEST_PROTOCOL)
+    return _FRAME_HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def _read_frames(f: BinaryIO, offset: int) -> Iterator[Tuple[Tuple, int]]:
+    """Yield (record, end offset) for each frame; record is None for a torn frame"""
+    while True:
+        header = f.read(_FRAME_HEADER.size)
+        if not header:
+            return
+        if len(header) < _FRAME_HEADER.size:
+            yield None, offset
+            return
+        length, crc = _FRAME_HEADER.unpack(header)
+        payload = f.read(length)
+        if len(payload) < length or zlib.crc32(payload) != crc:
+            yield None, offset
+            return
+        offset += _FRAME_HEADER.size + length
+        yield pickle.loads(payload), offset
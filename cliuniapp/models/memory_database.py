@@ -0,0 +1,34 @@
+"""
+In-memory database that never touches disk
+"""
+
+from contextlib import nullcontext
+from typing import ContextManager, List
+from .database import Database
+from .student import Student
+
+
+class MemoryDatabase(Database):
+    """Database that keeps students in memory only
+
+    Uses the same indexes as the pickle Database but skips all file I/O,
+    which makes it useful for demos and as a baseline when benchmarking the
+    persistent backends. Data is lost when the process exits. A batch that
+    raises keeps the changes it made, as there is no file to go back to.
+    """
+
+    def __init__(self, file_path: str = ""):
+        super().__init__(file_path)
+
+    def ensure_file(self) -> None:
+        """Nothing to create for an in-memory database"""
+
+    def _file_lock(self) -> ContextManager[None]:
+        """No other process can see the data, so there is nothing to lock"""
+        return nullcontext()
+
+    def _refresh(self) -> None:
+        """The in-memory indexes are always current"""
+
+    def _write_file(self, students: List[Student]) -> None:
+        """Nothing to persist for an in-memory database"""
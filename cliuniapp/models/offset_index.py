@@ -0,0 +1,98 @@
+"""
+Sidecar index mapping student id and email to frame offsets
+
+The index is a pair of open-addressing hash tables written next to a binary
+data file. Each slot holds a crc32 of the key and the byte offset of the
+matching frame, so a lookup reads one or two slots and then decodes a single
+frame from the memory-mapped data file. The header records the data file's
+signature (inode, size, mtime) so a stale index is never trusted.
+"""
+
+import mmap
+import os
+import struct
+import tempfile
+import zlib
+from typing import Iterable, Iterator, Optional, Tuple
+
+MAGIC = b'USIX'
+VERSION = 1
+TABLES = ('id', 'email')
+
+_HEADER = struct.Struct('<4sBxxxQQQI')  # magic, version, data inode/size/mtime, slots per table
+_SLOT = struct.Struct('<II')  # key hash, frame offset (0 marks an empty slot)
+
+
+def _hash(key: str) -> int:
+    """Stable 32-bit hash of an index key"""
+    return zlib.crc32(key.encode('utf-8'))
+
+
+def build_index(entries: Iterable[Tuple[str, str, int]], signature: Tuple[int, int, int]) -> bytes:
+    """Build index bytes from (student id, email, frame offset) entries"""
+    entries = list(entries)
+    slots = 8
+    while slots < 2 * len(entries):
+        slots *= 2
+    mask = slots - 1
+    parts = [_HEADER.pack(MAGIC, VERSION, *signature, slots)]
+    for column in range(len(TABLES)):
+        # Flat [hash, offset, hash, offset, ...] list packed in one call
+        table = [0] * (2 * slots)
+        for entry in entries:
+            key_hash = _hash(entry[column])
+            slot = key_hash & mask
+            while table[2 * slot + 1]:
+                slot = (slot + 1) & mask
+            table[2 * slot] = key_hash
+            table[2 * slot + 1] = entry[2]
+        parts.append(struct.pack(f'<{2 * slots}I', *table))
+    return b''.join(parts)
+
+
+def write_index(path: str, entries: Iterable[Tuple[str, str, int]], signature: Tuple[int, int, int]) -> None:
+    """Atomically write an index file for the data file with the given signature"""
+    data = build_index(entries, signature)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', prefix='.index-', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def open_index(path: str, signature: Tuple[int, int, int]) -> Optional[mmap.mmap]:
+    """Memory-map an index file, or return None if it is missing or stale"""
+    try:
+        with open(path, 'rb') as f:
+            index = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (FileNotFoundError, ValueError):
+        return None
+    if len(index) < _HEADER.size:
+        index.close()
+        return None
+    magic, version, ino, size, mtime_ns, slots = _HEADER.unpack_from(index, 0)
+    if magic != MAGIC or version != VERSION or (ino, size, mtime_ns) != tuple(signature) \
+            or len(index) < _HEADER.size + len(TABLES) * slots * _SLOT.size:
+        index.close()
+        return None
+    return index
+
+
+def candidate_offsets(index: mmap.mmap, table: str, key: str) -> Iterator[int]:
+    """Yield frame offsets whose key hash matches; callers must check the decoded key"""
+    slots = _HEADER.unpack_from(index, 0)[-1]
+    mask = slots - 1
+    base = _HEADER.size + TABLES.index(table) * slots * _SLOT.size
+    key_hash = _hash(key)
+    slot = key_hash & mask
+    while True:
+        slot_hash, offset = _SLOT.unpack_from(index, base + slot * _SLOT.size)
+        if not offset:
+            return
+        if slot_hash == key_hash:
+            yield offset
+        slot = (slot + 1) & mask
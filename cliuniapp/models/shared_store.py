@@ -0,0 +1,242 @@
+"""
+Thread-safe wrapper sharing one storage backend between server threads
+"""
+
+import secrets
+import threading
+from contextlib import contextmanager, nullcontext
+from typing import Iterator, List, Optional
+from .change_feed import CLEARED, REMOVED, RESET, UPSERTED, ChangeFeed
+from .cohort_stats import CohortStats
+from .student import Student
+
+
+class ReadWriteLock:
+    """Many concurrent readers or one writer, with writers given priority
+
+    The writing thread may re-enter the write lock and also take the read
+    lock, so a read-modify-write sequence can call the same store methods as
+    everyone else.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer: Optional[int] = None
+        self._write_depth = 0
+        self._waiting_writers = 0
+
+    def acquire_read(self) -> None:
+        """Block until no writer holds or is waiting for the lock"""
+        with self._cond:
+            if self._writer == threading.get_ident():
+                self._write_depth += 1
+                return
+            while self._writer is not None or self._waiting_writers:
+                self._cond.wait()
+            self._readers += 1
+
+    def release_read(self) -> None:
+        """Release a read acquired by this thread"""
+        with self._cond:
+            if self._writer == threading.get_ident():
+                self._write_depth -= 1
+                return
+            self._readers -= 1
+            if not self._readers:
+                self._cond.notify_all()
+
+    def acquire_write(self) -> None:
+        """Block until this thread is the only holder"""
+        with self._cond:
+            me = threading.get_ident()
+            if self._writer == me:
+                self._write_depth += 1
+                return
+            self._waiting_writers += 1
+            while self._writer is not None or self._readers:
+                self._cond.wait()
+            self._waiting_writers -= 1
+            self._writer = me
+            self._write_depth = 1
+
+    def release_write(self) -> None:
+        """Release one level of this thread's write lock"""
+        with self._cond:
+            self._write_depth -= 1
+            if not self._write_depth:
+                self._writer = None
+                self._cond.notify_all()
+
+    @contextmanager
+    def read(self) -> Iterator[None]:
+        """Context manager holding the read lock"""
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write(self) -> Iterator[None]:
+        """Context manager holding the write lock"""
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+
+class SharedStore:
+    """One storage backend shared safely by every request-handling thread
+
+    Lookups run concurrently under a read lock; mutations take the write lock.
+    Handlers that read a student, change it and upsert it again must wrap the
+    whole sequence in ``with store.write():`` so concurrent requests for the
+    same student cannot overwrite each other's changes.
+
+    ``epoch`` is random per store, so cache validators built from it and
+    data_version() never match across restarts that reset the version.
+
+    Writes also hold the backend's ``locked()`` write lock, so a
+    read-modify-write sequence is safe against writers in other processes
+    too, such as the other workers of a multi-process web server.
+
+    Every mutation made through the store is published to ``changes`` while
+    the write lock is held, so events come out in the order they were made.
+    Changes made by other processes cannot be described event by event;
+    check_external_changes() publishes a reset once it notices them.
+
+    Given a metrics registry (anything with a ``timer(name, **labels)``
+    context manager, such as utils.metrics.Metrics), each backend call is
+    timed as a ``storage_op`` labelled with the operation. Time spent
+    waiting for the lock is not included.
+    """
+
+    def __init__(self, db, metrics=None):
+        self.db = db
+        self.lock = ReadWriteLock()
+        self.epoch = secrets.token_hex(4)
+        self.changes = ChangeFeed()
+        self.metrics = metrics
+        # data_version() after this store's own latest write, or None before any
+        self._seen_version: Optional[int] = None
+
+    def _timed(self, op: str):
+        """Context timing one backend operation, if the store has metrics"""
+        if self.metrics is None:
+            return nullcontext()
+        return self.metrics.timer('storage_op', op=op)
+
+    @contextmanager
+    def _writing(self) -> Iterator[None]:
+        """Hold this store's write lock and the backend's, noting the version the writes leave"""
+        with self.lock.write(), self.db.locked():
+            try:
+                yield
+            finally:
+                # Read while still locked, so no other process's write can be
+                # mistaken for ours; backends count their uncommitted writes
+                self._seen_version = self.db.data_version()
+
+    @contextmanager
+    def write(self) -> Iterator["SharedStore"]:
+        """Hold the write lock for a read-modify-write sequence"""
+        with self._writing():
+            yield self
+
+    @contextmanager
+    def batch(self) -> Iterator["SharedStore"]:
+        """Hold the write lock and persist every change made in the block together"""
+        with self._writing():
+            try:
+                with self._timed('batch'), self.db.batch():
+                    yield self
+            except BaseException:
+                # Subscribers have seen changes that were not persisted
+                self.changes.publish(RESET)
+                raise
+
+    def check_external_changes(self) -> bool:
+        """Publish a reset if the data changed other than through this store since the last check
+
+        Returns True if it did. The first call only records the version.
+        """
+        with self.lock.read(), self._timed('data_version'):
+            version = self.db.data_version()
+            seen, self._seen_version = self._seen_version, version
+        if seen is None or version == seen:
+            return False
+        self.changes.publish(RESET)
+        return True
+
+    def read_all(self) -> List[Student]:
+        """Read all students under the read lock"""
+        with self.lock.read(), self._timed('read_all'):
+            return self.db.read_all()
+
+    def iter_students(self) -> Iterator[Student]:
+        """Yield every student, locking one batch at a time"""
+        for batch in self.iter_batches(500):
+            yield from batch
+
+    def iter_batches(self, size: int) -> Iterator[List[Student]]:
+        """Yield students in lists of at most size"""
+        # The read lock is held per batch, not while the caller handles it
+        batches = self.db.iter_batches(size)
+        while True:
+            with self.lock.read(), self._timed('iter_batches'):
+                batch = next(batches, None)
+            if batch is None:
+                return
+            yield batch
+
+    def find_by_email(self, email: str) -> Optional[Student]:
+        """Find a student by email address"""
+        with self.lock.read(), self._timed('find_by_email'):
+            return self.db.find_by_email(email)
+
+    def find_by_id(self, student_id: str) -> Optional[Student]:
+        """Find a student by ID"""
+        with self.lock.read(), self._timed('find_by_id'):
+            return self.db.find_by_id(student_id)
+
+    def cohort_stats(self) -> CohortStats:
+        """Current cohort aggregates"""
+        with self.lock.read(), self._timed('cohort_stats'):
+            return self.db.cohort_stats()
+
+    def data_version(self) -> int:
+        """Counter that increases on every change to the data"""
+        with self.lock.read(), self._timed('data_version'):
+            return self.db.data_version()
+
+    def upsert(self, student: Student) -> None:
+        """Insert or update a student"""
+        with self._writing():
+            with self._timed('upsert'):
+                self.db.upsert(student)
+            self.changes.publish(UPSERTED, student.id, student)
+
+    def remove_by_id(self, student_id: str) -> bool:
+        """Remove a student by ID. Returns True if found and removed"""
+        with self._writing():
+            with self._timed('remove_by_id'):
+                removed = self.db.remove_by_id(student_id)
+            if removed:
+                self.changes.publish(REMOVED, student_id)
+            return removed
+
+    def write_all(self, students: List[Student]) -> None:
+        """Replace all students"""
+        with self._writing():
+            with self._timed('write_all'):
+                self.db.write_all(students)
+            self.changes.publish(RESET)
+
+    def clear(self) -> None:
+        """Clear all data from the store"""
+        with self._writing():
+            with self._timed('clear'):
+                self.db.clear()
+            self.changes.publish(CLEARED)
@@ -0,0 +1,295 @@
+"""
+SQLite persistence layer
+"""
+
+import itertools
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+from .cohort_stats import COUNTERS, CohortStats, counter_deltas, student_counters
+from .database import Database
+from .student import Student
+from .subject import Subject
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS students (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    email TEXT NOT NULL,
+    password TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS students_email ON students (email);
+CREATE TABLE IF NOT EXISTS subjects (
+    student_id TEXT NOT NULL REFERENCES students (id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    id TEXT NOT NULL,
+    mark INTEGER NOT NULL,
+    grade TEXT NOT NULL,
+    PRIMARY KEY (student_id, position)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS cohort_stats (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS data_version (
+    value INTEGER NOT NULL
+);
+INSERT INTO data_version (value) SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM data_version);
+"""
+
+
+class SqliteDatabase:
+    """Drop-in replacement for Database that stores students in SQLite
+
+    Students and their subjects live in indexed tables, so lookups and
+    writes touch only the affected rows. The database runs in WAL mode,
+    letting readers in other threads or processes proceed while a write is
+    in progress. Each thread gets its own connection.
+
+    Cohort counters (see CohortStats) are stored in the cohort_stats table and
+    adjusted by delta inside the same transaction as each write. Every write
+    transaction that changes rows also bumps the data_version row, so the
+    version is shared by all processes using the file. Writes made inside ``with db.batch():``
+    share one transaction.
+    """
+
+    def __init__(self, file_path: str = "io/students.db"):
+        self.file_path = file_path
+        self._local = threading.local()
+        self._schema_ready = False
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return this thread's connection, opening it on first use"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            self.ensure_file()
+            # Autocommit mode; writes open their own IMMEDIATE transaction
+            conn = sqlite3.connect(self.file_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+            if not self._schema_ready:
+                conn.executescript(_SCHEMA)
+                with self._transaction() as conn:
+                    if conn.execute("SELECT COUNT(*) FROM cohort_stats").fetchone()[0] == 0:
+                        # Database created before counters existed
+                        self._rebuild_stats(conn)
+                self._schema_ready = True
+        return conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """Run a block in a write transaction, committing only if it succeeds"""
+        conn = self._connection()
+        if getattr(self._local, 'in_transaction', False):
+            # Part of an enclosing transaction, which commits or rolls back
+            yield conn
+            return
+        # IMMEDIATE takes the write lock up front so reads made while
+        # computing counter deltas cannot go stale before the commit
+        conn.execute("BEGIN IMMEDIATE")
+        self._local.in_transaction = True
+        self._local.changes_at_begin = conn.total_changes
+        try:
+            yield conn
+            # A transaction that changed nothing, such as a locked() block that
+            # only read, leaves the version alone so caches stay valid
+            if conn.total_changes != self._local.changes_at_begin:
+                conn.execute("UPDATE data_version SET value = value + 1")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            self._local.in_transaction = False
+        conn.execute("COMMIT")
+
+    @contextmanager
+    def locked(self) -> Iterator["SqliteDatabase"]:
+        """Hold the write lock for a read-modify-write; other writers, in any process, wait"""
+        with self._transaction():
+            yield self
+
+    @contextmanager
+    def batch(self) -> Iterator["SqliteDatabase"]:
+        """Make every write in the block in a single transaction, rolled back if it raises"""
+        with self._transaction():
+            yield self
+
+    def ensure_file(self) -> None:
+        """Create the directory holding the database file if needed"""
+        directory = os.path.dirname(self.file_path)
+        if directory:  # Only create directory if there is one
+            os.makedirs(directory, exist_ok=True)
+
+    def close(self) -> None:
+        """Close this thread's connection"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def _load_subjects(self, conn: sqlite3.Connection, student_id: str) -> List[Subject]:
+        """Load one student's subjects in enrolment order"""
+        rows = conn.execute(
+            "SELECT id, mark, grade FROM subjects WHERE student_id = ? ORDER BY position",
+            (student_id,))
+        return [Subject(id, mark, grade) for id, mark, grade in rows]
+
+    def _find_one(self, where: str, value: str) -> Optional[Student]:
+        """Load the first student matching a single-column condition"""
+        conn = self._connection()
+        row = conn.execute(
+            f"SELECT id, name, email, password FROM students WHERE {where} = ? ORDER BY rowid LIMIT 1",
+            (value,)).fetchone()
+        if row is None:
+            return None
+        return Student(*row, subjects=self._load_subjects(conn, row[0]))
+
+    def _find_in(self, conn: sqlite3.Connection, student_id: str) -> Optional[Student]:
+        """Load a student by id using the given connection"""
+        row = conn.execute(
+            "SELECT id, name, email, password FROM students WHERE id = ?", (student_id,)).fetchone()
+        if row is None:
+            return None
+        return Student(*row, subjects=self._load_subjects(conn, row[0]))
+
+    def _update_stats(self, conn: sqlite3.Connection, deltas: Dict[str, int]) -> None:
+        """Apply counter deltas to the cohort_stats table"""
+        conn.executemany(
+            "UPDATE cohort_stats SET value = value + ? WHERE name = ?",
+            [(value, name) for name, value in deltas.items()])
+
+    def _rebuild_stats(self, conn: sqlite3.Connection) -> None:
+        """Recompute every cohort counter from the stored students"""
+        stats = CohortStats.from_students(self.iter_students())
+        conn.execute("DELETE FROM cohort_stats")
+        conn.executemany(
+            "INSERT INTO cohort_stats (name, value) VALUES (?, ?)",
+            [(name, stats.counters[name]) for name in COUNTERS])
+
+    def _insert(self, conn: sqlite3.Connection, student: Student) -> None:
+        """Insert or replace a student row and its subject rows"""
+        previous = self._find_in(conn, student.id)
+        self._update_stats(conn, counter_deltas(
+            student_counters(previous) if previous is not None else None,
+            student_counters(student)))
+        conn.execute(
+            "INSERT INTO students (id, name, email, password) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (id) DO UPDATE SET name = excluded.name, "
+            "email = excluded.email, password = excluded.password",
+            (student.id, student.name, student.email, student.password))
+        conn.execute("DELETE FROM subjects WHERE student_id = ?", (student.id,))
+        conn.executemany(
+            "INSERT INTO subjects (student_id, position, id, mark, grade) VALUES (?, ?, ?, ?, ?)",
+            [(student.id, position, s.id, s.mark, s.grade) for position, s in enumerate(student.subjects)])
+
+    def read_all(self) -> List[Student]:
+        """Read all students from the database"""
+        conn = self._connection()
+        students: Dict[str, Student] = {}
+        for id, name, email, password in conn.execute(
+                "SELECT id, name, email, password FROM students ORDER BY rowid"):
+            students[id] = Student(id, name, email, password)
+        for student_id, id, mark, grade in conn.execute(
+                "SELECT student_id, id, mark, grade FROM subjects ORDER BY student_id, position"):
+            student = students.get(student_id)
+            if student is not None:
+                student.subjects.append(Subject(id, mark, grade))
+        return list(students.values())
+
+    def iter_students(self) -> Iterator[Student]:
+        """Yield every student one at a time, streaming rows from a cursor"""
+        conn = self._connection()
+        # Students are scanned in rowid order and joined through the subjects
+        # primary key, so SQLite streams rows without a temporary sort
+        rows = conn.execute(
+            "SELECT s.id, s.name, s.email, s.password, j.id, j.mark, j.grade "
+            "FROM students s LEFT JOIN subjects j ON j.student_id = s.id "
+            "ORDER BY s.rowid, j.position")
+        student = None
+        for id, name, email, password, subject_id, mark, grade in rows:
+            if student is None or student.id != id:
+                if student is not None:
+                    yield student
+                student = Student(id, name, email, password)
+            if subject_id is not None:
+                student.subjects.append(Subject(subject_id, mark, grade))
+        if student is not None:
+            yield student
+
+    def iter_batches(self, size: int) -> Iterator[List[Student]]:
+        """Yield students in lists of at most size"""
+        students = self.iter_students()
+        while True:
+            batch = list(itertools.islice(students, size))
+            if not batch:
+                return
+            yield batch
+
+    def cohort_stats(self) -> CohortStats:
+        """Grade buckets, pass/fail counts and mark totals, read from the counters table"""
+        conn = self._connection()
+        return CohortStats(dict(conn.execute("SELECT name, value FROM cohort_stats")))
+
+    def data_version(self) -> int:
+        """Counter that increases on every write transaction that changes data
+
+        Inside this thread's write transaction it is the version the
+        transaction will commit, so a writer still holding the lock can note
+        the version its own changes leave.
+        """
+        conn = self._connection()
+        version = conn.execute("SELECT value FROM data_version").fetchone()[0]
+        if getattr(self._local, 'in_transaction', False) and conn.total_changes != self._local.changes_at_begin:
+            version += 1  # The bump made when the transaction commits
+        return version
+
+    def write_all(self, students: List[Student]) -> None:
+        """Replace all students in the database"""
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM subjects")
+            conn.execute("DELETE FROM students")
+            conn.execute("UPDATE cohort_stats SET value = 0")
+            for student in students:
+                self._insert(conn, student)
+
+    def clear(self) -> None:
+        """Clear all data from the database"""
+        self.write_all([])
+
+    def upsert(self, student: Student) -> None:
+        """Insert or update a student in the database"""
+        with self._transaction() as conn:
+            self._insert(conn, student)
+
+    def remove_by_id(self, student_id: str) -> bool:
+        """Remove a student by ID. Returns True if found and removed"""
+        with self._transaction() as conn:
+            previous = self._find_in(conn, student_id)
+            if previous is None:
+                return False
+            self._update_stats(conn, counter_deltas(student_counters(previous), None))
+            conn.execute("DELETE FROM subjects WHERE student_id = ?", (student_id,))
+            conn.execute("DELETE FROM students WHERE id = ?", (student_id,))
+        return True
+
+    def find_by_email(self, email: str) -> Optional[Student]:
+        """Find a student by email address"""
+        return self._find_one("email", email)
+
+    def find_by_id(self, student_id: str) -> Optional[Student]:
+        """Find a student by ID"""
+        return self._find_one("id", student_id)
+
+    def import_pickle(self, pickle_path: str = "io/students.data") -> int:
+        """One-shot migration of a pickle data file. Returns the number of students imported"""
+        if not os.path.exists(pickle_path):
+            raise FileNotFoundError(f"No pickle data file at {pickle_path}")
+        students = Database(pickle_path).read_all()
+        with self._transaction() as conn:
+            for student in students:
+                self._insert(conn, student)
+        return len(students)
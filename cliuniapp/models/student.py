@@ -7,7 +7,16 @@ from .subject import Subject
 
 
 class Student:
-    """Student model with subject enrollment management"""
+    """Student model with subject enrollment management
+    
+    ``version`` goes up whenever a method changes the student, so values
+    derived from it can be cached on the instance and recomputed once stale.
+    Such caches are kept in attributes starting with an underscore, which
+    are not pickled.
+    """
+    
+    # Students unpickled from before versions existed start at 0
+    version = 0
     
     def __init__(self, id: str, name: str, email: str, password: str, subjects: Optional[List[Subject]] = None):
         self.id = id
@@ -21,12 +30,14 @@ class Student:
         if len(self.subjects) >= 4:
             raise ValueError("Cannot enrol more than four (4) subjects")
         self.subjects.append(subject)
+        self.version += 1
     
     def remove_subject_by_id(self, subject_id: str) -> bool:
         """Remove a subject by ID. Returns True if found and removed, False otherwise"""
         for i, subject in enumerate(self.subjects):
             if subject.id == subject_id:
                 del self.subjects[i]
+                self.version += 1
                 return True
         return False
     
@@ -44,3 +55,19 @@ class Student:
     def change_password(self, new_pw: str) -> None:
         """Change student password"""
         self.password = new_pw
+        self.version += 1
+    
+    def copy(self) -> "Student":
+        """A copy to change and upsert, leaving this instance as readers last saw it
+        
+        The subject list is copied; the subjects themselves are shared since
+        they are never changed, only added or removed.
+        """
+        clone = Student.__new__(Student)
+        clone.__dict__.update(self.__dict__)
+        clone.subjects = list(self.subjects)
+        return clone
+    
+    def __getstate__(self) -> dict:
+        """Pickled state: every attribute except underscore-prefixed caches"""
+        return {name: value for name, value in self.__dict__.items() if not name.startswith('_')}
@@ -0,0 +1,123 @@
+"""
+Group commit: writes queued by many threads and persisted together by one
+"""
+
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List, Optional, Tuple, TypeVar
+
+# Milliseconds the writer waits for more writes to join a batch unless configured otherwise
+DEFAULT_COMMIT_DELAY_MS = 2
+
+# Most writes persisted by one group commit
+DEFAULT_MAX_BATCH = 1000
+
+T = TypeVar('T')
+
+
+class WriteQueue:
+    """Writes to a SharedStore run by one writer thread and persisted in groups
+
+    submit(write) queues a function of the store and blocks until it has run
+    and been persisted, then returns its result or raises its exception. The
+    writer thread takes the writes queued so far, waiting up to delay_ms after
+    the first for more to arrive, runs them in order inside one
+    ``store.batch()`` and answers them all once that single persist is done.
+    Each write sees the changes made by the ones before it and runs under the
+    store's write lock, so a read-modify-write needs no lock of its own.
+
+    Writes arriving while a group is being persisted wait for the next one,
+    so the more concurrent writers there are, the more each persist carries.
+    A write that raises gets its exception back and the rest of its group is
+    still persisted; if persisting fails, every write in the group gets that
+    error.
+
+    The writer thread starts on the first submit, so a queue may be created
+    before forking. submit() must not be called while holding the store's
+    write lock, since the writer needs it. After close(), writes run
+    directly on the calling thread.
+    """
+
+    def __init__(self, store, delay_ms: float = DEFAULT_COMMIT_DELAY_MS, max_batch: int = DEFAULT_MAX_BATCH):
+        self.store = store
+        self.delay_ms = delay_ms
+        self.max_batch = max_batch
+        self._cond = threading.Condition(threading.Lock())
+        self._queue: List[Tuple[Callable, Future]] = []
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        # Group commits made and writes they persisted
+        self.batches = 0
+        self.writes = 0
+
+    def submit(self, write: Callable[..., T]) -> T:
+        """Run write(store) in the next group commit, returning its result once persisted"""
+        future = Future()
+        with self._cond:
+            closed = self._closed
+            if not closed:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='write-queue', daemon=True)
+                    self._thread.start()
+                self._queue.append((write, future))
+                # The writer only needs waking for a new group or a full one
+                if len(self._queue) == 1 or len(self._queue) >= self.max_batch:
+                    self._cond.notify()
+        if closed:
+            with self.store.write():
+                return write(self.store)
+        return future.result()
+
+    def close(self) -> None:
+        """Persist the writes already queued and stop the writer thread"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+            thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+
+    def _run(self) -> None:
+        """Writer thread: commit queued writes in groups until closed and drained"""
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if not self._queue:
+                    return
+                # Give writers that are about to submit a chance to join this group
+                deadline = time.monotonic() + self.delay_ms / 1000
+                while len(self._queue) < self.max_batch and not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                group, self._queue = self._queue[:self.max_batch], self._queue[self.max_batch:]
+            self._commit(group)
+
+    def _commit(self, group: List[Tuple[Callable, Future]]) -> None:
+        """Run a group of writes in one store batch and answer them once it is persisted"""
+        outcomes = []
+        try:
+            with self.store.batch():
+                for write, _ in group:
+                    try:
+                        outcomes.append((write(self.store), None))
+                    except Exception as e:
+                        outcomes.append((None, e))
+        except Exception as e:
+            for _, future in group:
+                future.set_exception(e)
+            return
+        self.batches += 1
+        self.writes += len(group)
+        metrics = self.store.metrics
+        if metrics is not None:
+            metrics.count('group_commit_batches')
+            metrics.count('group_commit_writes', len(group))
+        for (_, future), (result, error) in zip(group, outcomes):
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
@@ -0,0 +1,121 @@
+"""
+Pre-fork serving: several worker processes accepting on one port through SO_REUSEPORT
+"""
+
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+import traceback
+from typing import Any, Callable, ContextManager, Optional
+
+# A worker that dies sooner than this after starting is not restarted, since
+# its replacement would most likely fail the same way
+MIN_WORKER_SECONDS = 1.0
+
+
+def reserve_port(host: str, port: int) -> socket.socket:
+    """Bind, without listening, a socket fixing the port the workers will share
+
+    Workers each bind their own listening socket to the port with
+    SO_REUSEPORT, and the kernel spreads new connections between them. The
+    reserving socket never listens, so it gets no connections; keep it open
+    until the workers stop so the port cannot be taken in between.
+    """
+    if not hasattr(os, 'fork') or not hasattr(socket, 'SO_REUSEPORT'):
+        raise RuntimeError("Multiple server processes need os.fork and SO_REUSEPORT (Linux, macOS or BSD)")
+    sock = socket.socket(socket.AF_INET6 if ':' in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    try:
+        sock.bind((host, port))
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+def _run_worker(make_server: Callable[[], ContextManager], before_shutdown: Optional[Callable[[Any], None]]) -> None:
+    """Body of a forked worker; never returns"""
+    # The parent turns Ctrl+C into one SIGTERM per worker, so shutdown
+    # starts once and in-flight requests finish
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    code = 0
+    try:
+        with make_server() as httpd:
+            def stop():
+                if before_shutdown is not None:
+                    before_shutdown(httpd)
+                httpd.shutdown()
+
+            def on_term(signum, frame):
+                signal.signal(signal.SIGTERM, signal.SIG_IGN)
+                # shutdown() waits for serve_forever, which runs in this thread
+                threading.Thread(target=stop, daemon=True).start()
+
+            signal.signal(signal.SIGTERM, on_term)
+            httpd.serve_forever()
+    except BaseException:
+        traceback.print_exc()
+        code = 1
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(code)
+
+
+def run_workers(processes: int, make_server: Callable[[], ContextManager],
+                before_shutdown: Optional[Callable[[Any], None]] = None) -> None:
+    """Fork processes workers each serving forever from make_server(), until Ctrl+C or SIGTERM
+
+    make_server() is called in each worker, after the fork, and must return
+    a server with serve_forever() and shutdown() that can be used in a with
+    block. Nothing holding threads or open connections may cross the fork,
+    so it creates the worker's own. When asked to stop, a worker calls
+    before_shutdown(server) and then shutdown(), letting in-flight requests
+    finish.
+
+    A worker that crashes is replaced unless it failed straight after
+    starting, in which case every worker is stopped and RuntimeError raised.
+    """
+    started = {}  # pid -> monotonic start time
+
+    def spawn():
+        sys.stdout.flush()
+        sys.stderr.flush()
+        pid = os.fork()
+        if pid == 0:
+            _run_worker(make_server, before_shutdown)
+        started[pid] = time.monotonic()
+
+    previous_term = signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        for _ in range(processes):
+            spawn()
+        while started:
+            pid, status = os.wait()
+            began = started.pop(pid, None)
+            if began is None or status == 0:
+                continue
+            code = os.waitstatus_to_exitcode(status)
+            if time.monotonic() - began < MIN_WORKER_SECONDS:
+                raise RuntimeError(f"Worker process {pid} failed on startup (exit status {code})")
+            print(f"Worker process {pid} exited with status {code}; starting a replacement")
+            spawn()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        signal.signal(signal.SIGTERM, previous_term)
+        for pid in started:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        for pid in started:
+            try:
+                os.waitpid(pid, 0)
+            except ChildProcessError:
+                pass
@@ -0,0 +1,46 @@
+"""
+Cohort analytics shared by the CLI, desktop and web front ends
+"""
+
+from typing import Dict, Iterator, Optional
+from models.student import Student
+
+
+def grade_distribution(db) -> Dict[str, int]:
+    """Students per highest grade, in HD..F order"""
+    # Maintained incrementally by the store, so this doesn't scan the roster
+    return db.cohort_stats().grade_counts
+
+
+def cohort_summary(db) -> Dict[str, object]:
+    """Grade distribution, pass/fail counts and average mark for the whole cohort"""
+    return db.cohort_stats().to_dict()
+
+
+def iter_partition(db, passed: bool) -> Iterator[Student]:
+    """Stream the students who pass (or, with passed=False, fail)"""
+    for student in db.iter_students():
+        if student.is_pass() == passed:
+            yield student
+
+
+def partition(db, limit: Optional[int] = None) -> Dict[str, Dict[str, object]]:
+    """PASS and FAIL groups with their sizes and up to limit members each
+
+    Counts come from the cohort stats. Members are collected in one pass,
+    which stops as soon as both groups are full.
+    """
+    stats = db.cohort_stats()
+    groups = {
+        'pass': {'count': stats.pass_count, 'students': []},
+        'fail': {'count': stats.fail_count, 'students': []},
+    }
+    wanted = {name: group['count'] if limit is None else min(limit, group['count'])
+              for name, group in groups.items()}
+    for student in db.iter_students():
+        if limit is not None and all(len(groups[name]['students']) >= wanted[name] for name in groups):
+            break
+        members = groups['pass' if student.is_pass() else 'fail']['students']
+        if limit is None or len(members) < limit:
+            members.append({'id': student.id, 'name': student.name, 'avg': student.avg_mark()})
+    return groups
@@ -0,0 +1,122 @@
+"""
+Student changes made through the Web API, singly or in batches
+
+Stored students may be in use by concurrent readers, so each change is made
+to a copy which then replaces the stored one.
+"""
+
+import random
+from typing import Callable, Dict, List
+from models.student import Student
+from models.subject import Subject
+from services.auth_service import is_valid_password
+from services.grading_service import grade_from_mark
+from services.id_service import new_student_id, new_subject_id
+from services.roster_service import student_row
+
+# Most operations /api/batch applies in one request
+MAX_BATCH_OPERATIONS = 1000
+
+INVALID_PASSWORD = ('Invalid password format. Must start with uppercase, have at least 5 letters, '
+                    'then at least 3 digits.')
+
+
+def register_student(db, name: str, email: str, password: str) -> Dict[str, object]:
+    """Add a new student with a fresh id unless the email is already registered
+
+    Call it holding the write lock, so concurrent sign-ups can't both claim
+    the email or the id.
+    """
+    if db.find_by_email(email):
+        return {'success': False, 'message': 'Email already registered'}
+    student_id = new_student_id(db)
+    db.upsert(Student(student_id, name, email, password))
+    return {'success': True, 'student_id': student_id}
+
+
+def enroll(db, student_id: str) -> Dict[str, object]:
+    """Enroll a student in a new subject with a random mark"""
+    student = db.find_by_id(student_id)
+    if not student:
+        return {'success': False, 'message': 'Student not found'}
+    if len(student.subjects) >= 4:
+        return {'success': False, 'message': 'Cannot enroll more than four (4) subjects'}
+
+    mark = random.randint(25, 100)
+    grade = grade_from_mark(mark)
+    subject_id = new_subject_id(student)
+    student = student.copy()
+    student.add_subject(Subject(subject_id, mark, grade))
+    db.upsert(student)
+    return {
+        'success': True,
+        'message': f'Enrolled subject {subject_id} with mark {mark} (grade {grade}). [{len(student.subjects)}/4]',
+        'student': student_row(student)
+    }
+
+
+def remove_subject(db, student_id: str, subject_id: str) -> Dict[str, object]:
+    """Withdraw a student from one subject"""
+    student = db.find_by_id(student_id)
+    if not student:
+        return {'success': False, 'message': 'Student not found'}
+    student = student.copy()
+    if not student.remove_subject_by_id(subject_id):
+        return {'success': False, 'message': 'Subject not found'}
+    db.upsert(student)
+    return {'success': True, 'message': f'Removed subject {subject_id}', 'student': student_row(student)}
+
+
+def change_password(db, student_id: str, password: str) -> Dict[str, object]:
+    """Set a student's password if it is valid"""
+    student = db.find_by_id(student_id)
+    if not student:
+        return {'success': False, 'message': 'Student not found'}
+    if not is_valid_password(password):
+        return {'success': False, 'message': INVALID_PASSWORD}
+    student = student.copy()
+    student.change_password(password)
+    db.upsert(student)
+    return {'success': True, 'message': 'Password changed successfully'}
+
+
+def remove_student(db, student_id: str) -> Dict[str, object]:
+    """Remove a student and all their enrolments"""
+    if db.remove_by_id(student_id):
+        return {'success': True, 'message': f'Removed student {student_id}'}
+    return {'success': False, 'message': 'Student not found'}
+
+
+# Operations accepted by apply_operations, with the request fields each takes
+OPERATIONS: Dict[str, Callable[..., Dict[str, object]]] = {
+    'enroll': lambda db, op: enroll(db, op.get('student_id')),
+    'remove_subject': lambda db, op: remove_subject(db, op.get('student_id'), op.get('subject_id')),
+    'change_password': lambda db, op: change_password(db, op.get('student_id'), op.get('password')),
+    'remove_student': lambda db, op: remove_student(db, op.get('student_id')),
+}
+
+
+def apply_operations(store, operations: List[Dict[str, object]]) -> List[Dict[str, object]]:
+    """Apply operations in order as one storage batch, returning a result per operation
+
+    Each operation is a dict with an ``op`` name from OPERATIONS and that
+    operation's fields. One that fails validation gets an unsuccessful result
+    and the rest still run; every change is persisted once, at the end.
+    """
+    if not isinstance(operations, list):
+        raise ValueError("operations must be a list")
+    if len(operations) > MAX_BATCH_OPERATIONS:
+        raise ValueError(f"At most {MAX_BATCH_OPERATIONS} operations per batch")
+
+    results = []
+    with store.batch():
+        for op in operations:
+            apply = OPERATIONS.get(op.get('op')) if isinstance(op, dict) else None
+            if apply is None:
+                results.append({'success': False, 'message': f"Unknown operation. Choose from: {', '.join(OPERATIONS)}"})
+                continue
+            try:
+                results.append(apply(store, op))
+            except (TypeError, ValueError) as e:
+                results.append({'success': False, 'message': str(e)})
+    return results
@@ -0,0 +1,124 @@
+"""
+Roster query service for paging, filtering and sorting students
+"""
+
+import heapq
+import json
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from models.student import Student
+
+# Sort keys accepted by query_students; ties are broken by student ID
+SORT_KEYS = {
+    'id': lambda student: student.id,
+    'name': lambda student: (student.name.lower(), student.id),
+    'avg': lambda student: (student.avg_mark(), student.id),
+}
+
+STATUSES = ('pass', 'fail')
+
+# Students encoded per chunk when streaming the roster
+STREAM_BATCH_SIZE = 500
+
+
+def student_row(student: Student) -> Dict[str, object]:
+    """JSON-friendly roster row for one student"""
+    return {
+        'id': student.id,
+        'name': student.name,
+        'email': student.email,
+        'avg': student.avg_mark(),
+        'status': 'PASS' if student.is_pass() else 'FAIL',
+        'subjects': [{'id': s.id, 'mark': s.mark, 'grade': s.grade} for s in student.subjects],
+    }
+
+
+def student_json(student: Student) -> bytes:
+    """student_row() encoded as JSON, memoized on the student until its version changes
+
+    Every response and event that includes a student's row uses this, so an
+    unchanged student is encoded once however often it is sent.
+    """
+    cached = student.__dict__.get('_row_json')
+    if cached is not None and cached[0] == student.version:
+        return cached[1]
+    # Versioned as it was before encoding, so a change made meanwhile is never cached as current
+    version = student.version
+    encoded = json.dumps(student_row(student)).encode()
+    student._row_json = (version, encoded)
+    return encoded
+
+
+def roster_page_json(total: int, offset: int, limit: int, students: Iterable[Student]) -> bytes:
+    """A roster page response body, joining each student's memoized JSON"""
+    rows = b', '.join(student_json(student) for student in students)
+    return b'{"success": true, "total": %d, "offset": %d, "limit": %d, "students": [%s]}' % (
+        total, offset, limit, rows)
+
+
+def matches(student: Student, status: Optional[str] = None, min_avg: Optional[int] = None,
+            max_avg: Optional[int] = None, subject_count: Optional[int] = None) -> bool:
+    """Whether a student passes every given filter; None means no filter"""
+    if subject_count is not None and len(student.subjects) != subject_count:
+        return False
+    if status is not None and student.is_pass() != (status == 'pass'):
+        return False
+    if min_avg is not None or max_avg is not None:
+        avg = student.avg_mark()
+        if min_avg is not None and avg < min_avg:
+            return False
+        if max_avg is not None and avg > max_avg:
+            return False
+    return True
+
+
+def check_filters(status: Optional[str] = None, **filters) -> None:
+    """Raise ValueError for filter values matches() doesn't understand"""
+    if status is not None and status not in STATUSES:
+        raise ValueError(f"Unknown status {status!r}. Choose from: {', '.join(STATUSES)}")
+
+
+def query_students(students: Iterable[Student], offset: int = 0, limit: int = 50, sort: str = 'id',
+                   descending: bool = False, **filters) -> Tuple[int, List[Student]]:
+    """One page of the students matching filters, in sort order, and the total match count
+
+    Students are consumed in a single streaming pass and only the best
+    offset + limit matches are kept, so memory stays proportional to the
+    page rather than the roster.
+    """
+    if sort not in SORT_KEYS:
+        raise ValueError(f"Unknown sort key {sort!r}. Choose from: {', '.join(SORT_KEYS)}")
+    check_filters(**filters)
+    if offset < 0 or limit < 0:
+        raise ValueError("offset and limit must not be negative")
+
+    total = 0
+
+    def matching():
+        nonlocal total
+        for student in students:
+            if matches(student, **filters):
+                total += 1
+                yield student
+
+    select = heapq.nlargest if descending else heapq.nsmallest
+    page = select(offset + limit, matching(), key=SORT_KEYS[sort])
+    return total, page[offset:]
+
+
+def iter_roster_json(batches: Iterable[List[Student]], **filters) -> Iterator[bytes]:
+    """Encode every matching student as one JSON document, yielding a chunk per batch
+
+    The document has the same shape as a roster page, except that the
+    total comes last because it is only known once every batch has been
+    seen. Only one batch is held in memory at a time. Filters are checked
+    before the first chunk is yielded.
+    """
+    check_filters(**filters)
+    yield b'{"success": true, "students": ['
+    total = 0
+    for batch in batches:
+        rows = [student_json(student) for student in batch if matches(student, **filters)]
+        if rows:
+            yield (b',' if total else b'') + b','.join(rows)
+            total += len(rows)
+    yield f'], "total": {total}}}'.encode()
@@ -0,0 +1,97 @@
+"""
+Login sessions: tokens that stand for a student on later requests
+"""
+
+import base64
+import hashlib
+import hmac
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+# Seconds a session token stays valid after login
+DEFAULT_SESSION_TTL = 30 * 60
+
+# Most sessions kept in memory; older ones are verified again when next used
+DEFAULT_MAX_SESSIONS = 10000
+
+SESSION_EXPIRED = 'Session expired, please log in again'
+
+LOGIN_REQUIRED = 'Please log in first'
+
+
+class SessionStore:
+    """Session tokens issued at login, each naming one student until it expires
+
+    A token is ``<student id>.<expiry>.<signature>``, signed with a secret
+    held by the store, so it cannot be forged or extended. Tokens this store
+    has issued or verified are kept in memory and resolve with one dict
+    lookup; an unknown token is checked against its signature instead, which
+    lets every process forked from the same parent accept every other's
+    tokens. Sessions are evicted oldest first as new ones are added, once
+    expired or when there are more than max_sessions.
+
+    There is no logout: a token stays valid until it expires or the server
+    restarts with a new secret.
+    """
+
+    def __init__(self, ttl: float = DEFAULT_SESSION_TTL, max_sessions: int = DEFAULT_MAX_SESSIONS,
+                 secret: Optional[bytes] = None):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._secret = secret if secret is not None else secrets.token_bytes(32)
+        self._lock = threading.Lock()
+        self._sessions: "OrderedDict[str, Tuple[str, int]]" = OrderedDict()  # token -> (student id, expiry)
+
+    def _sign(self, payload: str) -> str:
+        """Signature for a token payload"""
+        digest = hmac.new(self._secret, payload.encode(), hashlib.sha256).digest()[:18]
+        return base64.urlsafe_b64encode(digest).decode()
+
+    def _remember(self, token: str, student_id: str, expires: int) -> None:
+        """Keep a valid session in memory, evicting expired and excess ones"""
+        now = time.time()
+        with self._lock:
+            self._sessions[token] = (student_id, expires)
+            # Sessions are kept in the order they were added, roughly the order they expire
+            while self._sessions:
+                oldest, (_, oldest_expires) = next(iter(self._sessions.items()))
+                if oldest_expires > now and len(self._sessions) <= self.max_sessions:
+                    break
+                del self._sessions[oldest]
+
+    def issue(self, student_id: str) -> str:
+        """New session token for a student who has just logged in"""
+        expires = int(time.time() + self.ttl)
+        payload = f"{student_id}.{expires}"
+        token = f"{payload}.{self._sign(payload)}"
+        self._remember(token, student_id, expires)
+        return token
+
+    def resolve(self, token: str) -> Optional[str]:
+        """The student id a token stands for, or None if it is invalid or expired"""
+        now = time.time()
+        with self._lock:
+            session = self._sessions.get(token)
+            if session is not None:
+                if session[1] > now:
+                    return session[0]
+                del self._sessions[token]
+                return None
+        # Not seen by this process: trust it only if the signature checks out.
+        # Clients can send anything, so only ASCII digits count as an expiry
+        # and the signature is compared as bytes, which takes any characters
+        payload, _, signature = token.rpartition('.')
+        student_id, _, expires = payload.rpartition('.')
+        if not student_id or not (expires.isascii() and expires.isdecimal()) or int(expires) <= now:
+            return None
+        try:
+            if not hmac.compare_digest(signature.encode(), self._sign(payload).encode()):
+                return None
+        except UnicodeEncodeError:
+            # Lone surrogates, which no token we issued contains
+            return None
+        self._remember(token, student_id, int(expires))
+        return student_id
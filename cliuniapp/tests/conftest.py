@@ -0,0 +1,8 @@
+"""
+Test configuration: import modules the way the app does, from inside cliuniapp
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
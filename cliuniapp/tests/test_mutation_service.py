@@ -0,0 +1,36 @@
+"""
+Tests for the student changes made through the Web API
+"""
+
+import pytest
+from models.backends import backend_names, get_backend
+from models.student import Student
+from models.subject import Subject
+from services.mutation_service import change_password, enroll, remove_subject
+
+
+@pytest.fixture(params=backend_names())
+def db(request, tmp_path):
+    """A store of each backend holding one student with one subject"""
+    store = get_backend(request.param).factory(str(tmp_path / "students.data"))
+    student = Student("000001", "Student 1", "student1@student.uts.edu.au", "Password123")
+    student.add_subject(Subject("001", 75, "D"))
+    store.upsert(student)
+    yield store
+    if hasattr(store, 'close'):
+        store.close()
+
+
+@pytest.mark.parametrize("change", [
+    lambda db: enroll(db, "000001"),
+    lambda db: remove_subject(db, "000001", "001"),
+    lambda db: change_password(db, "000001", "Newpass123"),
+], ids=["enroll", "remove_subject", "change_password"])
+def test_changes_leave_looked_up_students_alone(db, change):
+    """A student already looked up is not changed by a later write"""
+    before = db.find_by_id("000001")
+    assert change(db)['success'] is True
+    assert [s.id for s in before.subjects] == ["001"]
+    assert before.password == "Password123"
+    after = db.find_by_id("000001")
+    assert ([s.id for s in after.subjects], after.password) != (["001"], "Password123"), "the change should be stored"
@@ -0,0 +1,56 @@
+"""
+Tests for login session tokens
+"""
+
+import pytest
+from services.session_service import SessionStore
+
+
+@pytest.fixture
+def sessions():
+    """A session store with a fixed secret"""
+    return SessionStore(ttl=60, secret=b"test secret")
+
+
+def test_issued_token_resolves(sessions):
+    """A token resolves to the student it was issued for"""
+    assert sessions.resolve(sessions.issue("000001")) == "000001"
+
+
+def test_token_from_another_process_resolves(sessions):
+    """A store sharing the secret accepts a token it has not seen"""
+    token = sessions.issue("000001")
+    assert SessionStore(secret=b"test secret").resolve(token) == "000001"
+
+
+def test_expired_token_is_rejected(sessions):
+    """A token is rejected once it has expired"""
+    expired = SessionStore(ttl=-1, secret=b"test secret")
+    token = expired.issue("000001")
+    assert expired.resolve(token) is None
+    assert sessions.resolve(token) is None
+
+
+@pytest.mark.parametrize("tamper", [
+    lambda token: "000002" + token[len("000001"):],
+    lambda token: token.replace(token.split(".")[1], "9999999999"),
+    lambda token: token[:-2] + ("AA" if not token.endswith("AA") else "BB"),
+], ids=["student", "expiry", "signature"])
+def test_altered_token_is_rejected(sessions, tamper):
+    """Changing any part of a token invalidates it"""
+    assert sessions.resolve(tamper(sessions.issue("000001"))) is None
+    assert SessionStore(secret=b"other secret").resolve(sessions.issue("000001")) is None
+
+
+@pytest.mark.parametrize("token", [
+    "",
+    "garbage",
+    "000001.9999999999.é",
+    "000001.²²².abc",
+    "000001.٣٣٣.abc",
+    "000001.9999999999.\udcff",
+    ".9999999999.abc",
+])
+def test_malformed_token_is_rejected(sessions, token):
+    """Malformed tokens resolve to None rather than raising"""
+    assert sessions.resolve(token) is None
@@ -0,0 +1,209 @@
+"""
+Conformance tests every registered storage backend must pass
+"""
+
+import pytest
+from models.backends import backend_names, get_backend
+from models.cohort_stats import CohortStats
+from models.student import Student
+from models.subject import Subject
+from services.grading_service import grade_from_mark
+
+
+def make_student(n: int, subjects: int = 0) -> Student:
+    """Build a deterministic student"""
+    student = Student(f"{n:06d}", f"Student {n}", f"student{n}@student.uts.edu.au", "Password123")
+    for i in range(subjects):
+        mark = 40 + 10 * i
+        student.add_subject(Subject(f"{i + 1:03d}", mark, grade_from_mark(mark)))
+    return student
+
+
+def assert_stats_match(db) -> None:
+    """Incrementally maintained stats must equal a full recomputation"""
+    assert db.cohort_stats().counters == CohortStats.from_students(db.read_all()).counters
+
+
+@pytest.fixture(params=backend_names())
+def backend(request):
+    """Each registered backend in turn"""
+    return get_backend(request.param)
+
+
+@pytest.fixture
+def file_path(tmp_path):
+    """Data file for a throwaway store"""
+    return str(tmp_path / "students.data")
+
+
+@pytest.fixture
+def db(backend, file_path):
+    """An empty store of each backend"""
+    store = backend.factory(file_path)
+    yield store
+    if hasattr(store, 'close'):
+        store.close()
+
+
+def test_new_store_is_empty(db):
+    """A new store has no students"""
+    assert db.read_all() == []
+    assert db.find_by_id("000001") is None
+    assert db.find_by_email("nobody@student.uts.edu.au") is None
+
+
+def test_upsert_and_lookups(db):
+    """Upserted students are found by id and email"""
+    db.upsert(make_student(1, subjects=2))
+    db.upsert(make_student(2))
+    found = db.find_by_id("000001")
+    assert found is not None and found.email == "student1@student.uts.edu.au"
+    assert [s.id for s in found.subjects] == ["001", "002"], "subjects should keep enrolment order"
+    assert db.find_by_email("student2@student.uts.edu.au").id == "000002"
+    assert sorted(s.id for s in db.read_all()) == ["000001", "000002"]
+
+
+def test_upsert_replaces_record_and_email_index(db):
+    """Upserting an existing id replaces it, including its email entry"""
+    db.upsert(make_student(1, subjects=2))
+    db.upsert(make_student(2))
+    updated = make_student(1, subjects=3)
+    updated.email = "renamed@student.uts.edu.au"
+    db.upsert(updated)
+    assert db.find_by_email("student1@student.uts.edu.au") is None
+    assert len(db.find_by_email("renamed@student.uts.edu.au").subjects) == 3
+    assert len(db.read_all()) == 2, "upsert must not duplicate a student"
+    assert_stats_match(db)
+
+
+def test_upserting_a_changed_student_updates_stats(db):
+    """Upserting a changed student keeps the cohort stats right"""
+    db.upsert(make_student(1, subjects=3))
+    changed = db.find_by_id("000001").copy()
+    changed.remove_subject_by_id("001")
+    db.upsert(changed)
+    assert [s.id for s in db.find_by_id("000001").subjects] == ["002", "003"]
+    assert_stats_match(db)
+
+
+def test_remove(db):
+    """Removal reports whether the student was there"""
+    db.upsert(make_student(1))
+    db.upsert(make_student(2))
+    assert db.remove_by_id("000002") is True
+    assert db.remove_by_id("000002") is False
+    assert db.find_by_email("student2@student.uts.edu.au") is None
+    assert_stats_match(db)
+
+
+def test_iteration_matches_read_all(db):
+    """iter_students and iter_batches yield what read_all returns"""
+    for n in range(1, 4):
+        db.upsert(make_student(n, subjects=n))
+    streamed = list(db.iter_students())
+    assert [s.id for s in streamed] == [s.id for s in db.read_all()]
+    assert [len(s.subjects) for s in streamed] == [len(s.subjects) for s in db.read_all()]
+    assert [len(batch) for batch in db.iter_batches(1)] == [1] * len(streamed)
+
+
+def test_data_version_moves_only_on_changes(db):
+    """Reads and no-op writes leave the data version alone"""
+    db.upsert(make_student(1))
+    version = db.data_version()
+    db.find_by_id("000001")
+    db.read_all()
+    assert db.remove_by_id("999999") is False
+    with db.locked():
+        db.find_by_id("000001")
+    assert db.data_version() == version, "reads must not change the data version"
+    db.upsert(make_student(6))
+    assert db.data_version() > version, "upsert must bump the data version"
+    version = db.data_version()
+    assert db.remove_by_id("000006") is True
+    assert db.data_version() > version, "remove must bump the data version"
+
+
+def test_second_instance_sees_writes(backend, file_path, db):
+    """Another instance on the same file sees each write"""
+    if not backend.persistent:
+        pytest.skip("nothing is shared between instances")
+    db.upsert(make_student(1))
+    other = backend.factory(file_path)
+    assert [s.id for s in other.read_all()] == ["000001"]
+    version = db.data_version()
+    other.upsert(make_student(3))
+    assert db.find_by_id("000003") is not None, "writes from another instance should be visible"
+    assert db.data_version() > version, "writes from another instance must bump the data version"
+    assert_stats_match(db)
+
+
+def test_batch_applies_changes_together(backend, file_path, db):
+    """A batch is visible as it goes and persisted at the end"""
+    with db.batch():
+        db.upsert(make_student(7))
+        assert db.remove_by_id("000007") is True
+        db.upsert(make_student(8))
+        assert db.find_by_id("000008") is not None, "batched changes should be visible inside the batch"
+    assert db.find_by_id("000007") is None and db.find_by_id("000008") is not None
+    assert_stats_match(db)
+    if backend.persistent:
+        assert backend.factory(file_path).find_by_id("000008") is not None, "a batch should be persisted"
+
+
+def test_failed_batch_persists_nothing(backend, file_path, db):
+    """A batch that raises is discarded"""
+    if not backend.persistent:
+        pytest.skip("a memory store has nothing to roll back to")
+    db.upsert(make_student(1))
+    with pytest.raises(RuntimeError):
+        with db.batch():
+            db.upsert(make_student(9))
+            raise RuntimeError("abandon batch")
+    assert db.find_by_id("000009") is None, "a failed batch must be discarded"
+    assert backend.factory(file_path).find_by_id("000009") is None, "a failed batch must not be persisted"
+    assert_stats_match(db)
+
+
+def test_clear_in_a_batch(backend, file_path, db):
+    """A clear inside a batch replaces the changes before it and is persisted, or discarded, with the batch"""
+    db.upsert(make_student(1))
+    with db.batch():
+        db.upsert(make_student(2))
+        db.clear()
+        db.upsert(make_student(3))
+    assert [s.id for s in db.read_all()] == ["000003"]
+    assert_stats_match(db)
+    if not backend.persistent:
+        return
+    assert [s.id for s in backend.factory(file_path).read_all()] == ["000003"], "the batch should be persisted"
+    with pytest.raises(RuntimeError):
+        with db.batch():
+            db.clear()
+            raise RuntimeError("abandon batch")
+    assert [s.id for s in db.read_all()] == ["000003"], "a failed batch must not clear the store"
+    assert [s.id for s in backend.factory(file_path).read_all()] == ["000003"]
+
+
+def test_write_lock_is_reentrant(db):
+    """locked() may be nested, and writes inside it go through"""
+    with db.locked():
+        with db.locked():
+            db.upsert(make_student(10))
+        assert db.remove_by_id("000010") is True
+    assert db.find_by_id("000010") is None
+
+
+def test_write_all_and_clear(db):
+    """write_all replaces every student and clear removes them"""
+    db.upsert(make_student(1))
+    db.write_all([make_student(4), make_student(5)])
+    assert sorted(s.id for s in db.read_all()) == ["000004", "000005"]
+    assert db.find_by_id("000001") is None
+    assert_stats_match(db)
+
+    version = db.data_version()
+    db.clear()
+    assert db.data_version() > version, "clear must bump the data version"
+    assert db.read_all() == []
+    assert db.cohort_stats().students == 0
+    assert db.find_by_email("student4@student.uts.edu.au") is None
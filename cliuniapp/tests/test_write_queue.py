@@ -0,0 +1,56 @@
+"""
+Tests for group commit through the write queue
+"""
+
+import threading
+import pytest
+from models.backends import backend_names, get_backend
+from models.cohort_stats import CohortStats
+from models.shared_store import SharedStore
+from models.student import Student
+from models.write_queue import WriteQueue
+
+
+def make_student(n: int) -> Student:
+    """Build a deterministic student"""
+    return Student(f"{n:06d}", f"Student {n}", f"student{n}@student.uts.edu.au", "Password123")
+
+
+@pytest.fixture(params=backend_names())
+def backend(request):
+    """Each registered backend in turn"""
+    return get_backend(request.param)
+
+
+def test_clear_is_ordered_with_queued_writes(backend, tmp_path):
+    """A clear queued among upserts removes exactly the students written before it"""
+    file_path = str(tmp_path / "students.data")
+    store = SharedStore(backend.factory(file_path))
+    store.upsert(make_student(0))
+    writes = WriteQueue(store, delay_ms=50)
+    ran = []  # What the writer thread ran, in order
+
+    def upsert(n):
+        def write(s):
+            s.upsert(make_student(n))
+            ran.append(n)
+        return write
+
+    def clear(s):
+        s.clear()
+        ran.append('clear')
+
+    submitted = [upsert(n) for n in range(1, 6)] + [clear] + [upsert(n) for n in range(6, 11)]
+    threads = [threading.Thread(target=writes.submit, args=(write,)) for write in submitted]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    writes.close()
+
+    expected = sorted(f"{n:06d}" for n in ran[ran.index('clear') + 1:])
+    assert sorted(s.id for s in store.read_all()) == expected
+    assert store.cohort_stats().counters == CohortStats.from_students(store.read_all()).counters
+    assert writes.batches < writes.writes, "the writes should have been committed in groups"
+    if backend.persistent:
+        assert sorted(s.id for s in backend.factory(file_path).read_all()) == expected
@@ -4,37 +4,220 @@ Web-based GUI for University Student System
 Simple HTTP server with HTML/JavaScript interface
 """
 
+import argparse
 import http.server
-import socketserver
+import io
+import itertools
 import json
+import os
+import socket
+import threading
+import time
 import urllib.parse
-from models.database import Database
-from models.student import Student
+import zlib
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import nullcontext
+from admission import DEFAULT_MAX_QUEUE, DEFAULT_RETRY_AFTER, AdmissionControl, busy_response
+from async_web import AsyncHTTPServer
+from content_encoding import (COMPRESS_MIN_BYTES, PreparedBody, accepted_encoding, base_etag, compress,
+                              compressor, variant_etag)
+from prefork import reserve_port, run_workers
+from models.backends import open_database
+from models.change_feed import UPSERTED, REMOVED
+from models.memory_database import MemoryDatabase
+from models.shared_store import SharedStore
+from models.write_queue import WriteQueue
+from services.analytics_service import cohort_summary, partition
 from services.auth_service import is_valid_email, is_valid_password, authenticate
-from services.id_service import new_student_id, new_subject_id
-from services.grading_service import grade_from_mark
-import random
+from services.mutation_service import (INVALID_PASSWORD, apply_operations, change_password, enroll, register_student,
+                                       remove_student, remove_subject)
+from services.roster_service import (STREAM_BATCH_SIZE, iter_roster_json, query_students, roster_page_json,
+                                     student_json, student_row)
+from services.session_service import DEFAULT_SESSION_TTL, LOGIN_REQUIRED, SESSION_EXPIRED, SessionStore
+from utils.metrics import Metrics
+
+# Largest page /api/get_students will return
+MAX_PAGE_SIZE = 500
+
+# Members listed per group by /api/stats/partition unless the request asks otherwise
+PARTITION_LIMIT = 100
+
+def int_param(params, name, default=None):
+    """Read an optional whole-number request parameter"""
+    value = params.get(name)
+    if value is None or value == '':
+        return default
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be a whole number") from None
+
+# An /api/events stream holds a thread of its own, so it is ended after this
+# long; the browser reconnects and resumes from the last event it received
+EVENT_STREAM_SECONDS = 30
+
+# Event streams open at once unless configured otherwise; any more get 503
+DEFAULT_MAX_EVENT_STREAMS = 100
+
+# Comment line sent on an idle event stream so proxies don't drop it
+EVENT_HEARTBEAT_SECONDS = 10
+
+# How often an idle event stream checks for changes written by other processes
+EVENT_POLL_SECONDS = 1
+
+# How long browsers wait before reconnecting to a finished event stream
+EVENT_RETRY_MS = 1000
+
+# Request and storage timings for every server in this process, served at /metrics
+METRICS = Metrics()
+METRICS.describe('web_request', "Time to handle a web request")
+METRICS.describe('storage_op', "Time spent in a storage backend call")
+METRICS.describe('web_queue', "Time a request waited for a worker")
+METRICS.describe('web_rejected', "Requests turned away with 503 because the queue was full")
+METRICS.describe('event_stream', "Time an event stream stayed open")
+METRICS.describe('event_rejected', "Event streams turned away with 503 because too many were open")
+METRICS.describe('group_commit_batches', "Group commits persisted by the write queue")
+METRICS.describe('group_commit_writes', "Writes persisted by group commits")
+
+# Login sessions for every server in this process; forked worker processes
+# share its secret, so each accepts tokens issued by the others
+SESSIONS = SessionStore(ttl=float(os.environ.get('STUDENT_SESSION_TTL', DEFAULT_SESSION_TTL)))
+
+# Paths timed under their own route label; anything else is timed as "other"
+ROUTES = frozenset({
+    '/', '/student', '/admin', '/metrics',
+    '/api/get_students', '/api/stats/grades', '/api/stats/partition', '/api/events',
+    '/api/register', '/api/login', '/api/enroll', '/api/remove_subject', '/api/change_password',
+    '/api/remove_student', '/api/clear_database', '/api/batch',
+})
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates')
+
+# Browsers may reuse a page this long before revalidating it with its ETag
+PAGE_CACHE_CONTROL = 'public, max-age=300'
+
+def load_page(name):
+    """Read a page template and prepare its encoded and compressed bodies"""
+    with open(os.path.join(TEMPLATE_DIR, name), 'rb') as f:
+        return PreparedBody(f.read(), 'text/html; charset=utf-8')
+
+# Pages are read, encoded and compressed once, when the module is loaded.
+# They don't embed student data, so their ETags come from their content
+MAIN_PAGE = load_page('main.html')
+STUDENT_PAGE = load_page('student.html')
+ADMIN_PAGE = load_page('admin.html')
 
 class UniversityWebHandler(http.server.SimpleHTTPRequestHandler):
     """Custom handler for the university web interface"""
     
-    def __init__(self, *args, **kwargs):
-        self.db = Database()
-        super().__init__(*args, **kwargs)
+    # Keep connections open between requests; every response carries a Content-Length
+    protocol_version = 'HTTP/1.1'
+    
+    # Headers and body are written separately; without TCP_NODELAY the body of
+    # a response on a reused connection waits ~40 ms for the client's delayed ACK
+    disable_nagle_algorithm = True
+    
+    # SharedStore used by every request; set by make_server
+    database = None
+    
+    # WriteQueue persisting changes in group commits, or None to write each directly; set by make_server
+    writes = None
+    
+    # Open event streams, each on its own thread rather than a worker; set by make_server
+    event_streams = threading.BoundedSemaphore(DEFAULT_MAX_EVENT_STREAMS)
+    
+    # Future set once a handler that carried on past its worker, such as an
+    # event stream, has finished with the connection; servers close it then
+    detached = None
+    
+    # Registry the handler and its store record timings in
+    metrics = METRICS
+    
+    # Sessions issued at login
+    sessions = SESSIONS
+    
+    # Prepared pages by path, for HEAD requests
+    pages = {'/': MAIN_PAGE, '/student': STUDENT_PAGE, '/admin': ADMIN_PAGE}
+    
+    @property
+    def db(self):
+        """The store shared by every request, opened on first use if make_server didn't set one"""
+        if self.database is None:
+            type(self).database = SharedStore(open_database(), metrics=self.metrics)
+        return self.database
+    
+    def mutate(self, write):
+        """Run write(store) under the write lock, through the group commit queue if there is one"""
+        if self.writes is not None:
+            return self.writes.submit(write)
+        with self.db.write():
+            return write(self.db)
+    
+    def finish(self):
+        """Close the connection's files, unless a detached stream is still using them"""
+        if self.detached is None:
+            super().finish()
+    
+    def end_headers(self):
+        """Finish the headers, closing kept-alive connections while others wait for a worker"""
+        if getattr(self.server, 'connections_waiting', 0) and not self.close_connection:
+            self.send_header('Connection', 'close')
+        super().end_headers()
+    
+    def timed(self, path):
+        """Time a request, labelled with its method and route"""
+        return self.metrics.timer('web_request', method=self.command, route=path if path in ROUTES else 'other')
     
     def do_GET(self):
         """Handle GET requests"""
-        if self.path == '/':
+        path = urllib.parse.urlsplit(self.path).path
+        with self.timed(path):
+            self.route_get(path)
+    
+    def route_get(self, path):
+        """Dispatch a GET request"""
+        if path == '/':
             self.serve_main_page()
-        elif self.path == '/student':
+        elif path == '/student':
             self.serve_student_page()
-        elif self.path == '/admin':
+        elif path == '/admin':
             self.serve_admin_page()
+        elif path == '/api/get_students':
+            self.handle_get_students()
+        elif path == '/api/stats/grades':
+            self.handle_grade_stats()
+        elif path == '/api/stats/partition':
+            self.handle_partition_stats()
+        elif path == '/api/events':
+            self.handle_events()
+        elif path == '/metrics':
+            self.serve_metrics()
         else:
             super().do_GET()
     
+    def do_HEAD(self):
+        """Handle HEAD requests"""
+        path = urllib.parse.urlsplit(self.path).path
+        with self.timed(path):
+            if path in self.pages:
+                self.send_prepared(self.pages[path])
+            else:
+                super().do_HEAD()
+    
     def do_POST(self):
         """Handle POST requests"""
+        # Read the whole body up front, so a handler that ignores it can't leave
+        # bytes behind to be parsed as the next request on a kept-alive connection
+        connection_file = self.rfile
+        self.rfile = io.BytesIO(connection_file.read(int(self.headers.get('Content-Length') or 0)))
+        try:
+            with self.timed(self.path):
+                self.route_post()
+        finally:
+            self.rfile = connection_file
+    
+    def route_post(self):
+        """Dispatch a POST request whose body has been read"""
         if self.path == '/api/register':
             self.handle_register()
         elif self.path == '/api/login':
@@ -51,733 +234,33 @@ class UniversityWebHandler(http.server.SimpleHTTPRequestHandler):
             self.handle_remove_student()
         elif self.path == '/api/clear_database':
             self.handle_clear_database()
+        elif self.path == '/api/batch':
+            self.handle_batch()
         else:
             self.send_error(404)
     
+    def serve_metrics(self):
+        """Serve request and storage timings in the Prometheus text format"""
+        body = self.metrics.render().encode()
+        encoding = self.negotiate_encoding(len(body))
+        if encoding is not None:
+            body = compress(body, encoding)
+        self.send_response(200)
+        self.send_header('Content-type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Cache-Control', 'no-store')
+        self.send_encoded_body(body, encoding)
+    
     def serve_main_page(self):
         """Serve the main page"""
-        html = """
-<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>University Student System</title>
-    <style>
-        body {
-            font-family: Arial, sans-serif;
-            max-width: 800px;
-            margin: 0 auto;
-            padding: 20px;
-            background-color: #f5f5f5;
-        }
-        .container {
-            background: white;
-            padding: 30px;
-            border-radius: 10px;
-            box-shadow: 0 2px 10px rgba(0,0,0,0.1);
-        }
-        h1 {
-            color: #333;
-            text-align: center;
-            margin-bottom: 30px;
-        }
-        .button-group {
-            display: flex;
-            gap: 20px;
-            justify-content: center;
-            margin: 30px 0;
-        }
-        .btn {
-            padding: 15px 30px;
-            font-size: 16px;
-            border: none;
-            border-radius: 5px;
-            cursor: pointer;
-            text-decoration: none;
-            display: inline-block;
-            text-align: center;
-        }
-        .btn-primary {
-            background-color: #007bff;
-            color: white;
-        }
-        .btn-primary:hover {
-            background-color: #0056b3;
-        }
-        .btn-success {
-            background-color: #28a745;
-            color: white;
-        }
-        .btn-success:hover {
-            background-color: #1e7e34;
-        }
-        .status {
-            text-align: center;
-            margin-top: 20px;
-            padding: 10px;
-            background-color: #d4edda;
-            border: 1px solid #c3e6cb;
-            border-radius: 5px;
-            color: #155724;
-        }
-    </style>
-</head>
-<body>
-    <div class="container">
-        <h1>University Student System</h1>
-        <p style="text-align: center; color: #666;">Welcome to the University Student Management System</p>
-        
-        <div class="button-group">
-            <a href="/student" class="btn btn-primary">Student Portal</a>
-            <a href="/admin" class="btn btn-success">Admin Portal</a>
-        </div>
-        
-        <div class="status">
-            <strong>System Status:</strong> Ready
-        </div>
-    </div>
-</body>
-</html>
-        """
-        self.send_response(200)
-        self.send_header('Content-type', 'text/html')
-        self.end_headers()
-        self.wfile.write(html.encode())
+        self.send_prepared(MAIN_PAGE)
     
     def serve_student_page(self):
         """Serve the student portal page"""
-        html = """
-<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Student Portal</title>
-    <style>
-        body {
-            font-family: Arial, sans-serif;
-            max-width: 1000px;
-            margin: 0 auto;
-            padding: 20px;
-            background-color: #f5f5f5;
-        }
-        .container {
-            background: white;
-            padding: 30px;
-            border-radius: 10px;
-            box-shadow: 0 2px 10px rgba(0,0,0,0.1);
-        }
-        .tabs {
-            display: flex;
-            margin-bottom: 20px;
-        }
-        .tab {
-            padding: 10px 20px;
-            background-color: #e9ecef;
-            border: none;
-            cursor: pointer;
-            margin-right: 5px;
-        }
-        .tab.active {
-            background-color: #007bff;
-            color: white;
-        }
-        .tab-content {
-            display: none;
-        }
-        .tab-content.active {
-            display: block;
-        }
-        .form-group {
-            margin-bottom: 15px;
-        }
-        label {
-            display: block;
-            margin-bottom: 5px;
-            font-weight: bold;
-        }
-        input, select {
-            width: 100%;
-            padding: 8px;
-            border: 1px solid #ddd;
-            border-radius: 4px;
-            box-sizing: border-box;
-        }
-        .btn {
-            padding: 10px 20px;
-            background-color: #007bff;
-            color: white;
-            border: none;
-            border-radius: 4px;
-            cursor: pointer;
-            margin-right: 10px;
-        }
-        .btn:hover {
-            background-color: #0056b3;
-        }
-        .btn-success {
-            background-color: #28a745;
-        }
-        .btn-danger {
-            background-color: #dc3545;
-        }
-        table {
-            width: 100%;
-            border-collapse: collapse;
-            margin-top: 20px;
-        }
-        th, td {
-            border: 1px solid #ddd;
-            padding: 8px;
-            text-align: left;
-        }
-        th {
-            background-color: #f2f2f2;
-        }
-        .alert {
-            padding: 10px;
-            margin: 10px 0;
-            border-radius: 4px;
-        }
-        .alert-success {
-            background-color: #d4edda;
-            color: #155724;
-            border: 1px solid #c3e6cb;
-        }
-        .alert-danger {
-            background-color: #f8d7da;
-            color: #721c24;
-            border: 1px solid #f5c6cb;
-        }
-        .hidden {
-            display: none;
-        }
-    </style>
-</head>
-<body>
-    <div class="container">
-        <h1>Student Portal</h1>
-        
-        <div class="tabs">
-            <button class="tab active" onclick="showTab('login')">Login</button>
-            <button class="tab" onclick="showTab('register')">Register</button>
-            <button class="tab" onclick="showTab('dashboard')" id="dashboardTab" style="display:none;">Dashboard</button>
-        </div>
-        
-        <!-- Login Tab -->
-        <div id="login" class="tab-content active">
-            <h2>Student Login</h2>
-            <form id="loginForm">
-                <div class="form-group">
-                    <label for="loginEmail">Email:</label>
-                    <input type="email" id="loginEmail" required>
-                </div>
-                <div class="form-group">
-                    <label for="loginPassword">Password:</label>
-                    <input type="password" id="loginPassword" required>
-                </div>
-                <button type="submit" class="btn">Login</button>
-            </form>
-        </div>
-        
-        <!-- Register Tab -->
-        <div id="register" class="tab-content">
-            <h2>New Student Registration</h2>
-            <form id="registerForm">
-                <div class="form-group">
-                    <label for="regName">Name:</label>
-                    <input type="text" id="regName" required>
-                </div>
-                <div class="form-group">
-                    <label for="regEmail">Email:</label>
-                    <input type="email" id="regEmail" required>
-                </div>
-                <div class="form-group">
-                    <label for="regPassword">Password:</label>
-                    <input type="password" id="regPassword" required>
-                </div>
-                <button type="submit" class="btn">Register</button>
-            </form>
-        </div>
-        
-        <!-- Dashboard Tab -->
-        <div id="dashboard" class="tab-content">
-            <h2>Student Dashboard</h2>
-            <div id="studentInfo"></div>
-            
-            <h3>Subject Enrollment</h3>
-            <div id="enrollmentStatus"></div>
-            
-            <table id="subjectsTable">
-                <thead>
-                    <tr>
-                        <th>Subject ID</th>
-                        <th>Mark</th>
-                        <th>Grade</th>
-                        <th>Action</th>
-                    </tr>
-                </thead>
-                <tbody></tbody>
-            </table>
-            
-            <div style="margin-top: 20px;">
-                <button class="btn" onclick="enrollSubject()">Enroll Subject</button>
-                <button class="btn" onclick="changePassword()">Change Password</button>
-            </div>
-        </div>
-        
-        <div id="alerts"></div>
-    </div>
-    
-    <script>
-        let currentStudent = null;
-        
-        function showTab(tabName) {
-            // Hide all tabs
-            document.querySelectorAll('.tab-content').forEach(tab => {
-                tab.classList.remove('active');
-            });
-            document.querySelectorAll('.tab').forEach(tab => {
-                tab.classList.remove('active');
-            });
-            
-            // Show selected tab
-            document.getElementById(tabName).classList.add('active');
-            event.target.classList.add('active');
-        }
-        
-        function showAlert(message, type = 'success') {
-            const alertsDiv = document.getElementById('alerts');
-            const alertDiv = document.createElement('div');
-            alertDiv.className = `alert alert-${type}`;
-            alertDiv.textContent = message;
-            alertsDiv.appendChild(alertDiv);
-            
-            setTimeout(() => {
-                alertDiv.remove();
-            }, 5000);
-        }
-        
-        // Login form
-        document.getElementById('loginForm').addEventListener('submit', async (e) => {
-            e.preventDefault();
-            const email = document.getElementById('loginEmail').value;
-            const password = document.getElementById('loginPassword').value;
-            
-            try {
-                const response = await fetch('/api/login', {
-                    method: 'POST',
-                    headers: {'Content-Type': 'application/json'},
-                    body: JSON.stringify({email, password})
-                });
-                
-                const result = await response.json();
-                if (result.success) {
-                    currentStudent = result.student;
-                    showAlert('Login successful!');
-                    showTab('dashboard');
-                    document.getElementById('dashboardTab').style.display = 'block';
-                    loadDashboard();
-                } else {
-                    showAlert(result.message, 'danger');
-                }
-            } catch (error) {
-                showAlert('Login failed: ' + error.message, 'danger');
-            }
-        });
-        
-        // Register form
-        document.getElementById('registerForm').addEventListener('submit', async (e) => {
-            e.preventDefault();
-            const name = document.getElementById('regName').value;
-            const email = document.getElementById('regEmail').value;
-            const password = document.getElementById('regPassword').value;
-            
-            try {
-                const response = await fetch('/api/register', {
-                    method: 'POST',
-                    headers: {'Content-Type': 'application/json'},
-                    body: JSON.stringify({name, email, password})
-                });
-                
-                const result = await response.json();
-                if (result.success) {
-                    showAlert('Registration successful! Student ID: ' + result.student_id);
-                    document.getElementById('registerForm').reset();
-                } else {
-                    showAlert(result.message, 'danger');
-                }
-            } catch (error) {
-                showAlert('Registration failed: ' + error.message, 'danger');
-            }
-        });
-        
-        function loadDashboard() {
-            if (!currentStudent) return;
-            
-            document.getElementById('studentInfo').innerHTML = `
-                <p><strong>Student ID:</strong> ${currentStudent.id}</p>
-                <p><strong>Name:</strong> ${currentStudent.name}</p>
-                <p><strong>Email:</strong> ${currentStudent.email}</p>
-            `;
-            
-            const avgMark = currentStudent.subjects.reduce((sum, s) => sum + s.mark, 0) / currentStudent.subjects.length || 0;
-            const status = avgMark >= 50 ? 'PASS' : 'FAIL';
-            
-            document.getElementById('enrollmentStatus').innerHTML = `
-                <p><strong>Enrollment:</strong> ${currentStudent.subjects.length}/4</p>
-                <p><strong>Average Mark:</strong> ${Math.round(avgMark)}</p>
-                <p><strong>Status:</strong> ${status}</p>
-            `;
-            
-            const tbody = document.querySelector('#subjectsTable tbody');
-            tbody.innerHTML = '';
-            currentStudent.subjects.forEach(subject => {
-                const row = tbody.insertRow();
-                row.innerHTML = `
-                    <td>${subject.id}</td>
-                    <td>${subject.mark}</td>
-                    <td>${subject.grade}</td>
-                    <td><button class="btn btn-danger" onclick="removeSubject('${subject.id}')">Remove</button></td>
-                `;
-            });
-        }
-        
-        async function enrollSubject() {
-            if (!currentStudent) return;
-            
-            try {
-                const response = await fetch('/api/enroll', {
-                    method: 'POST',
-                    headers: {'Content-Type': 'application/json'},
-                    body: JSON.stringify({student_id: currentStudent.id})
-                });
-                
-                const result = await response.json();
-                if (result.success) {
-                    showAlert(result.message);
-                    currentStudent = result.student;
-                    loadDashboard();
-                } else {
-                    showAlert(result.message, 'danger');
-                }
-            } catch (error) {
-                showAlert('Enrollment failed: ' + error.message, 'danger');
-            }
-        }
-        
-        async function removeSubject(subjectId) {
-            if (!currentStudent) return;
-            
-            try {
-                const response = await fetch('/api/remove_subject', {
-                    method: 'POST',
-                    headers: {'Content-Type': 'application/json'},
-                    body: JSON.stringify({student_id: currentStudent.id, subject_id: subjectId})
-                });
-                
-                const result = await response.json();
-                if (result.success) {
-                    showAlert(result.message);
-                    currentStudent = result.student;
-                    loadDashboard();
-                } else {
-                    showAlert(result.message, 'danger');
-                }
-            } catch (error) {
-                showAlert('Removal failed: ' + error.message, 'danger');
-            }
-        }
-        
-        function changePassword() {
-            const newPassword = prompt('Enter new password:');
-            if (!newPassword) return;
-            
-            const confirmPassword = prompt('Confirm new password:');
-            if (newPassword !== confirmPassword) {
-                showAlert('Passwords do not match', 'danger');
-                return;
-            }
-            
-            fetch('/api/change_password', {
-                method: 'POST',
-                headers: {'Content-Type': 'application/json'},
-                body: JSON.stringify({student_id: currentStudent.id, password: newPassword})
-            })
-            .then(response => response.json())
-            .then(result => {
-                if (result.success) {
-                    showAlert('Password changed successfully');
-                } else {
-                    showAlert(result.message, 'danger');
-                }
-            })
-            .catch(error => {
-                showAlert('Password change failed: ' + error.message, 'danger');
-            });
-        }
-    </script>
-</body>
-</html>
-        """
-        self.send_response(200)
-        self.send_header('Content-type', 'text/html')
-        self.end_headers()
-        self.wfile.write(html.encode())
+        self.send_prepared(STUDENT_PAGE)
     
     def serve_admin_page(self):
         """Serve the admin portal page"""
-        html = """
-<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Admin Portal</title>
-    <style>
-        body {
-            font-family: Arial, sans-serif;
-            max-width: 1200px;
-            margin: 0 auto;
-            padding: 20px;
-            background-color: #f5f5f5;
-        }
-        .container {
-            background: white;
-            padding: 30px;
-            border-radius: 10px;
-            box-shadow: 0 2px 10px rgba(0,0,0,0.1);
-        }
-        table {
-            width: 100%;
-            border-collapse: collapse;
-            margin-top: 20px;
-        }
-        th, td {
-            border: 1px solid #ddd;
-            padding: 8px;
-            text-align: left;
-        }
-        th {
-            background-color: #f2f2f2;
-        }
-        .btn {
-            padding: 10px 20px;
-            background-color: #007bff;
-            color: white;
-            border: none;
-            border-radius: 4px;
-            cursor: pointer;
-            margin-right: 10px;
-            margin-bottom: 10px;
-        }
-        .btn:hover {
-            background-color: #0056b3;
-        }
-        .btn-danger {
-            background-color: #dc3545;
-        }
-        .btn-success {
-            background-color: #28a745;
-        }
-        .alert {
-            padding: 10px;
-            margin: 10px 0;
-            border-radius: 4px;
-        }
-        .alert-success {
-            background-color: #d4edda;
-            color: #155724;
-            border: 1px solid #c3e6cb;
-        }
-        .alert-danger {
-            background-color: #f8d7da;
-            color: #721c24;
-            border: 1px solid #f5c6cb;
-        }
-    </style>
-</head>
-<body>
-    <div class="container">
-        <h1>Admin Portal</h1>
-        
-        <div>
-            <button class="btn" onclick="refreshStudents()">Refresh</button>
-            <button class="btn btn-success" onclick="groupByGrade()">Group by Grade</button>
-            <button class="btn btn-success" onclick="partitionPassFail()">Partition Pass/Fail</button>
-            <button class="btn btn-danger" onclick="clearDatabase()">Clear Database</button>
-        </div>
-        
-        <table id="studentsTable">
-            <thead>
-                <tr>
-                    <th>Student ID</th>
-                    <th>Name</th>
-                    <th>Email</th>
-                    <th>Avg Mark</th>
-                    <th>Status</th>
-                    <th>Subjects</th>
-                    <th>Action</th>
-                </tr>
-            </thead>
-            <tbody></tbody>
-        </table>
-        
-        <div id="alerts"></div>
-    </div>
-    
-    <script>
-        function showAlert(message, type = 'success') {
-            const alertsDiv = document.getElementById('alerts');
-            const alertDiv = document.createElement('div');
-            alertDiv.className = `alert alert-${type}`;
-            alertDiv.textContent = message;
-            alertsDiv.appendChild(alertDiv);
-            
-            setTimeout(() => {
-                alertDiv.remove();
-            }, 5000);
-        }
-        
-        async function refreshStudents() {
-            try {
-                const response = await fetch('/api/get_students');
-                const students = await response.json();
-                
-                const tbody = document.querySelector('#studentsTable tbody');
-                tbody.innerHTML = '';
-                
-                students.forEach(student => {
-                    const avgMark = student.subjects.reduce((sum, s) => sum + s.mark, 0) / student.subjects.length || 0;
-                    const status = avgMark >= 50 ? 'PASS' : 'FAIL';
-                    
-                    const row = tbody.insertRow();
-                    row.innerHTML = `
-                        <td>${student.id}</td>
-                        <td>${student.name}</td>
-                        <td>${student.email}</td>
-                        <td>${Math.round(avgMark)}</td>
-                        <td>${status}</td>
-                        <td>${student.subjects.length}</td>
-                        <td><button class="btn btn-danger" onclick="removeStudent('${student.id}')">Remove</button></td>
-                    `;
-                });
-            } catch (error) {
-                showAlert('Failed to load students: ' + error.message, 'danger');
-            }
-        }
-        
-        async function groupByGrade() {
-            try {
-                const response = await fetch('/api/get_students');
-                const students = await response.json();
-                
-                const gradeCounts = {HD: 0, D: 0, C: 0, P: 0, F: 0};
-                
-                students.forEach(student => {
-                    if (student.subjects.length > 0) {
-                        const highestGrade = student.subjects.reduce((highest, subject) => {
-                            const gradeOrder = {HD: 5, D: 4, C: 3, P: 2, F: 1};
-                            return gradeOrder[subject.grade] > gradeOrder[highest] ? subject.grade : highest;
-                        }, 'F');
-                        gradeCounts[highestGrade]++;
-                    }
-                });
-                
-                const message = `Grade Distribution:\\nHD: ${gradeCounts.HD}\\nD: ${gradeCounts.D}\\nC: ${gradeCounts.C}\\nP: ${gradeCounts.P}\\nF: ${gradeCounts.F}`;
-                alert(message);
-            } catch (error) {
-                showAlert('Failed to group by grade: ' + error.message, 'danger');
-            }
-        }
-        
-        async function partitionPassFail() {
-            try {
-                const response = await fetch('/api/get_students');
-                const students = await response.json();
-                
-                const passStudents = students.filter(s => {
-                    const avgMark = s.subjects.reduce((sum, sub) => sum + sub.mark, 0) / s.subjects.length || 0;
-                    return avgMark >= 50;
-                });
-                const failStudents = students.filter(s => {
-                    const avgMark = s.subjects.reduce((sum, sub) => sum + sub.mark, 0) / s.subjects.length || 0;
-                    return avgMark < 50;
-                });
-                
-                let message = `Pass/Fail Partition:\\n\\nPASS: ${passStudents.length} students\\n`;
-                passStudents.forEach(s => {
-                    const avgMark = s.subjects.reduce((sum, sub) => sum + sub.mark, 0) / s.subjects.length || 0;
-                    message += `  ${s.id} ${s.name} (avg ${Math.round(avgMark)})\\n`;
-                });
-                
-                message += `\\nFAIL: ${failStudents.length} students\\n`;
-                failStudents.forEach(s => {
-                    const avgMark = s.subjects.reduce((sum, sub) => sum + sub.mark, 0) / s.subjects.length || 0;
-                    message += `  ${s.id} ${s.name} (avg ${Math.round(avgMark)})\\n`;
-                });
-                
-                alert(message);
-            } catch (error) {
-                showAlert('Failed to partition students: ' + error.message, 'danger');
-            }
-        }
-        
-        async function removeStudent(studentId) {
-            if (!confirm('Are you sure you want to remove this student?')) return;
-            
-            try {
-                const response = await fetch('/api/remove_student', {
-                    method: 'POST',
-                    headers: {'Content-Type': 'application/json'},
-                    body: JSON.stringify({student_id: studentId})
-                });
-                
-                const result = await response.json();
-                if (result.success) {
-                    showAlert('Student removed successfully');
-                    refreshStudents();
-                } else {
-                    showAlert(result.message, 'danger');
-                }
-            } catch (error) {
-                showAlert('Failed to remove student: ' + error.message, 'danger');
-            }
-        }
-        
-        async function clearDatabase() {
-            if (!confirm('Are you sure you want to clear the entire database? This action cannot be undone.')) return;
-            
-            try {
-                const response = await fetch('/api/clear_database', {
-                    method: 'POST',
-                    headers: {'Content-Type': 'application/json'},
-                    body: JSON.stringify({})
-                });
-                
-                const result = await response.json();
-                if (result.success) {
-                    showAlert('Database cleared successfully');
-                    refreshStudents();
-                } else {
-                    showAlert(result.message, 'danger');
-                }
-            } catch (error) {
-                showAlert('Failed to clear database: ' + error.message, 'danger');
-            }
-        }
-        
-        // Load students on page load
-        refreshStudents();
-    </script>
-</body>
-</html>
-        """
-        self.send_response(200)
-        self.send_header('Content-type', 'text/html')
-        self.end_headers()
-        self.wfile.write(html.encode())
+        self.send_prepared(ADMIN_PAGE)
     
     def handle_register(self):
         """Handle student registration"""
@@ -799,19 +282,11 @@ class UniversityWebHandler(http.server.SimpleHTTPRequestHandler):
                 return
                 
             if not is_valid_password(password):
-                self.send_json_response({'success': False, 'message': 'Invalid password format. Must start with uppercase, have at least 5 letters, then at least 3 digits.'})
-                return
-                
-            if self.db.find_by_email(email):
-                self.send_json_response({'success': False, 'message': 'Email already registered'})
+                self.send_json_response({'success': False, 'message': INVALID_PASSWORD})
                 return
                 
-            # Create new student
-            student_id = new_student_id(self.db)
-            student = Student(student_id, name, email, password)
-            self.db.upsert(student)
-            
-            self.send_json_response({'success': True, 'student_id': student_id})
+            # Check and insert under one lock so concurrent sign-ups can't both claim the email or id
+            self.send_json_response(self.mutate(lambda store: register_student(store, name, email, password)))
             
         except Exception as e:
             self.send_json_response({'success': False, 'message': str(e)})
@@ -828,62 +303,48 @@ class UniversityWebHandler(http.server.SimpleHTTPRequestHandler):
         try:
             student = authenticate(email, password, self.db)
             if student:
-                # Convert student to dict for JSON serialization
-                student_dict = {
-                    'id': student.id,
-                    'name': student.name,
-                    'email': student.email,
-                    'subjects': [{'id': s.id, 'mark': s.mark, 'grade': s.grade} for s in student.subjects]
-                }
-                self.send_json_response({'success': True, 'student': student_dict})
+                self.send_json_response({
+                    'success': True,
+                    'student': student_row(student),
+                    'token': self.sessions.issue(student.id),
+                    'expires_in': self.sessions.ttl,
+                })
             else:
                 self.send_json_response({'success': False, 'message': 'Invalid credentials'})
                 
         except Exception as e:
             self.send_json_response({'success': False, 'message': str(e)})
     
+    def session_student_id(self):
+        """The student whose bearer token the request carries, or None having answered 401 Unauthorized"""
+        scheme, _, token = self.headers.get('Authorization', '').partition(' ')
+        if scheme.lower() != 'bearer':
+            self.send_unauthorized(LOGIN_REQUIRED)
+            return None
+        student_id = self.sessions.resolve(token.strip())
+        if student_id is None:
+            self.send_unauthorized(SESSION_EXPIRED)
+        return student_id
+    
+    def send_unauthorized(self, message):
+        """Answer 401 Unauthorized, asking the client to log in for a bearer token"""
+        body = json.dumps({'success': False, 'message': message}).encode()
+        self.send_response(401)
+        self.send_header('Content-type', 'application/json')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('WWW-Authenticate', 'Bearer')
+        self.send_encoded_body(body, None)
+    
     def handle_enroll(self):
         """Handle subject enrollment"""
-        content_length = int(self.headers['Content-Length'])
-        post_data = self.rfile.read(content_length)
-        data = json.loads(post_data.decode('utf-8'))
-        
-        student_id = data.get('student_id')
+        student_id = self.session_student_id()
+        if student_id is None:
+            return
         
         try:
-            student = self.db.find_by_id(student_id)
-            if not student:
-                self.send_json_response({'success': False, 'message': 'Student not found'})
-                return
-                
-            if len(student.subjects) >= 4:
-                self.send_json_response({'success': False, 'message': 'Cannot enroll more than four (4) subjects'})
-                return
-                
-            # Generate random mark and grade
-            mark = random.randint(25, 100)
-            grade = grade_from_mark(mark)
-            subject_id = new_subject_id(student)
-            
-            # Create and add subject
-            from models.subject import Subject
-            subject = Subject(subject_id, mark, grade)
-            student.add_subject(subject)
-            self.db.upsert(student)
-            
-            # Return updated student
-            student_dict = {
-                'id': student.id,
-                'name': student.name,
-                'email': student.email,
-                'subjects': [{'id': s.id, 'mark': s.mark, 'grade': s.grade} for s in student.subjects]
-            }
-            
-            self.send_json_response({
-                'success': True, 
-                'message': f'Enrolled subject {subject_id} with mark {mark} (grade {grade}). [{len(student.subjects)}/4]',
-                'student': student_dict
-            })
+            # Hold the write lock from lookup to upsert so concurrent enrolments
+            # for the same student don't overwrite each other
+            self.send_json_response(self.mutate(lambda store: enroll(store, student_id)))
             
         except Exception as e:
             self.send_json_response({'success': False, 'message': str(e)})
@@ -894,34 +355,14 @@ class UniversityWebHandler(http.server.SimpleHTTPRequestHandler):
         post_data = self.rfile.read(content_length)
         data = json.loads(post_data.decode('utf-8'))
         
-        student_id = data.get('student_id')
         subject_id = data.get('subject_id')
+        student_id = self.session_student_id()
+        if student_id is None:
+            return
         
         try:
-            student = self.db.find_by_id(student_id)
-            if not student:
-                self.send_json_response({'success': False, 'message': 'Student not found'})
-                return
-                
-            if student.remove_subject_by_id(subject_id):
-                self.db.upsert(student)
-                
-                # Return updated student
-                student_dict = {
-                    'id': student.id,
-                    'name': student.name,
-                    'email': student.email,
-                    'subjects': [{'id': s.id, 'mark': s.mark, 'grade': s.grade} for s in student.subjects]
-                }
-                
-                self.send_json_response({
-                    'success': True,
-                    'message': f'Removed subject {subject_id}',
-                    'student': student_dict
-                })
-            else:
-                self.send_json_response({'success': False, 'message': 'Subject not found'})
-                
+            self.send_json_response(self.mutate(lambda store: remove_subject(store, student_id, subject_id)))
+            
         except Exception as e:
             self.send_json_response({'success': False, 'message': str(e)})
     
@@ -931,42 +372,211 @@ class UniversityWebHandler(http.server.SimpleHTTPRequestHandler):
         post_data = self.rfile.read(content_length)
         data = json.loads(post_data.decode('utf-8'))
         
-        student_id = data.get('student_id')
         password = data.get('password')
+        student_id = self.session_student_id()
+        if student_id is None:
+            return
         
         try:
-            student = self.db.find_by_id(student_id)
-            if not student:
-                self.send_json_response({'success': False, 'message': 'Student not found'})
-                return
-                
-            if not is_valid_password(password):
-                self.send_json_response({'success': False, 'message': 'Invalid password format. Must start with uppercase, have at least 5 letters, then at least 3 digits.'})
-                return
-                
-            student.change_password(password)
-            self.db.upsert(student)
-            
-            self.send_json_response({'success': True, 'message': 'Password changed successfully'})
+            self.send_json_response(self.mutate(lambda store: change_password(store, student_id, password)))
             
         except Exception as e:
             self.send_json_response({'success': False, 'message': str(e)})
     
+    def data_etag(self):
+        """ETag for responses computed from the store's current data"""
+        return f'"{self.db.epoch}-{self.db.data_version()}"'
+    
+    def not_modified(self, etag):
+        """Answer 304 Not Modified if the client's cached copy has this ETag"""
+        cached = self.headers.get('If-None-Match')
+        if not cached:
+            return False
+        # Any compressed variant of the same data counts as a match
+        tags = [tag.strip() for tag in cached.split(',')]
+        matched = next((tag for tag in tags if tag == '*' or base_etag(tag) == etag), None)
+        if matched is None:
+            return False
+        self.send_response(304)
+        self.send_header('ETag', etag if matched == '*' else matched)
+        self.send_header('Vary', 'Accept-Encoding')
+        self.end_headers()
+        return True
+    
+    def negotiate_encoding(self, size):
+        """Content coding for a response body of the given size, or None to send it as-is"""
+        if size < COMPRESS_MIN_BYTES:
+            return None
+        return accepted_encoding(self.headers.get('Accept-Encoding'))
+    
     def handle_get_students(self):
-        """Handle get all students"""
+        """Handle a page of students, filtered and sorted
+        
+        Parameters come from the query string (GET) or JSON body (POST):
+        offset, limit, sort (id, name, avg), order (asc, desc), status
+        (pass, fail), min_avg, max_avg and subjects (enrolled subject count).
+        
+        With stream=1 every matching student is streamed in storage order
+        instead, ignoring offset, limit and sort.
+        """
+        if self.headers.get('Content-Length'):
+            post_data = self.rfile.read(int(self.headers['Content-Length']))
+            params = json.loads(post_data.decode('utf-8') or '{}')
+        else:
+            params = dict(urllib.parse.parse_qsl(urllib.parse.urlsplit(self.path).query))
+        
+        # Taken before reading so a concurrent write can only make the tag older than the data
+        etag = self.data_etag()
+        if self.not_modified(etag):
+            return
+        
         try:
-            students = self.db.read_all()
-            students_dict = []
-            for student in students:
-                students_dict.append({
-                    'id': student.id,
-                    'name': student.name,
-                    'email': student.email,
-                    'subjects': [{'id': s.id, 'mark': s.mark, 'grade': s.grade} for s in student.subjects]
-                })
-            self.send_json_response(students_dict)
+            filters = {
+                'status': params.get('status') or None,
+                'min_avg': int_param(params, 'min_avg'),
+                'max_avg': int_param(params, 'max_avg'),
+                'subject_count': int_param(params, 'subjects'),
+            }
+            if str(params.get('stream', '')).lower() in ('1', 'true'):
+                self.send_json_stream(iter_roster_json(self.db.iter_batches(STREAM_BATCH_SIZE), **filters), etag)
+                return
+            
+            offset = int_param(params, 'offset', 0)
+            limit = min(int_param(params, 'limit', 50), MAX_PAGE_SIZE)
+            total, page = query_students(
+                self.db.iter_students(), offset, limit,
+                sort=params.get('sort') or 'id',
+                descending=params.get('order') == 'desc',
+                **filters,
+            )
+            self.send_json_body(roster_page_json(total, offset, limit, page), etag=etag)
+        except Exception as e:
+            self.send_json_response({'success': False, 'message': str(e)})
+    
+    def handle_grade_stats(self):
+        """Handle cohort statistics: students per highest grade, pass/fail counts and average mark"""
+        etag = self.data_etag()
+        if self.not_modified(etag):
+            return
+        try:
+            self.send_json_response({'success': True, **cohort_summary(self.db)}, etag=etag)
         except Exception as e:
-            self.send_json_response({'error': str(e)})
+            self.send_json_response({'success': False, 'message': str(e)})
+    
+    def handle_partition_stats(self):
+        """Handle PASS/FAIL partition with counts and up to limit members per group"""
+        params = dict(urllib.parse.parse_qsl(urllib.parse.urlsplit(self.path).query))
+        etag = self.data_etag()
+        if self.not_modified(etag):
+            return
+        try:
+            limit = int_param(params, 'limit', PARTITION_LIMIT)
+            if limit < 0:
+                raise ValueError("limit must not be negative")
+            self.send_json_response({'success': True, **partition(self.db, limit)}, etag=etag)
+        except Exception as e:
+            self.send_json_response({'success': False, 'message': str(e)})
+    
+    def handle_events(self):
+        """Stream store changes as Server-Sent Events, on a thread of the stream's own
+        
+        The worker is freed straight away, so open admin pages never hold
+        up other requests. At most event_streams are open at once; beyond
+        that the request is answered 503 and the page retries later.
+        """
+        streams = self.event_streams
+        self.close_connection = True
+        if not streams.acquire(blocking=False):
+            self.metrics.count('event_rejected')
+            self.wfile.write(busy_response(DEFAULT_RETRY_AFTER))
+            return
+        self.detached = Future()
+        try:
+            threading.Thread(target=self.run_event_stream, args=(streams,), name='event-stream', daemon=True).start()
+        except BaseException:
+            self.detached = None
+            streams.release()
+            raise
+    
+    def run_event_stream(self, streams):
+        """Thread body of an event stream: send events, then hand the connection back to be closed"""
+        try:
+            with self.metrics.timer('event_stream'):
+                self.send_events()
+        except OSError:
+            pass  # The subscriber went away
+        finally:
+            streams.release()
+            try:
+                super().finish()
+            except OSError:
+                pass
+            finally:
+                self.detached.set_result(None)
+    
+    def send_events(self):
+        """Send change events until the stream's lifetime is up or the server stops
+        
+        Each event's id is the store epoch and change number, so a browser
+        reconnecting with Last-Event-ID gets the events it missed, or a reset
+        event telling it to reload if they are gone or the server restarted.
+        Changes made by another process are sent as a reset once noticed.
+        """
+        feed = self.db.changes
+        epoch, _, seq = (self.headers.get('Last-Event-ID') or '').partition('-')
+        pending = []
+        if epoch == self.db.epoch and seq.isdigit() and int(seq) <= feed.seq:
+            after = int(seq)
+        else:
+            reset = feed.reset_event()
+            after = reset.seq
+            if self.headers.get('Last-Event-ID'):
+                pending.append(reset)
+        chunked = self.request_version != 'HTTP/1.0'
+        
+        self.send_response(200)
+        self.send_header('Content-type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        if chunked:
+            self.send_header('Transfer-Encoding', 'chunked')
+        else:
+            self.send_header('Connection', 'close')
+        self.end_headers()
+        
+        # Tell a new subscriber where it starts, so its first reconnect can resume
+        self.write_chunk(f'retry: {EVENT_RETRY_MS}\nid: {self.db.epoch}-{after}\n\n'.encode(), chunked)
+        self.db.check_external_changes()
+        last_sent = time.monotonic()
+        deadline = last_sent + EVENT_STREAM_SECONDS
+        while True:
+            for event in pending:
+                self.write_chunk(self.event_message(event), chunked)
+                after = event.seq
+                last_sent = time.monotonic()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or feed.closed:
+                break
+            pending = feed.wait(after, min(remaining, EVENT_POLL_SECONDS))
+            # Writes by other processes (CLI, other server workers) only show up as a reset
+            if not pending and self.db.check_external_changes():
+                pending = feed.wait(after, 0)
+            if not pending and time.monotonic() - last_sent >= EVENT_HEARTBEAT_SECONDS:
+                self.write_chunk(b': heartbeat\n\n', chunked)
+                last_sent = time.monotonic()
+        if chunked:
+            self.wfile.write(b'0\r\n\r\n')
+        self.wfile.flush()
+    
+    def event_message(self, event):
+        """Encode a change event in the Server-Sent Events format"""
+        if event.kind == UPSERTED:
+            # Memoized, so every subscriber shares one encoding of the student
+            data = student_json(event.student)
+        elif event.kind == REMOVED:
+            data = json.dumps({'id': event.student_id}).encode()
+        else:
+            data = b'{}'
+        return f'id: {self.db.epoch}-{event.seq}\nevent: {event.kind}\ndata: '.encode() + data + b'\n\n'
     
     def handle_remove_student(self):
         """Handle student removal"""
@@ -977,38 +587,368 @@ class UniversityWebHandler(http.server.SimpleHTTPRequestHandler):
         student_id = data.get('student_id')
         
         try:
-            if self.db.remove_by_id(student_id):
-                self.send_json_response({'success': True, 'message': f'Removed student {student_id}'})
-            else:
-                self.send_json_response({'success': False, 'message': 'Student not found'})
+            self.send_json_response(self.mutate(lambda store: remove_student(store, student_id)))
+        except Exception as e:
+            self.send_json_response({'success': False, 'message': str(e)})
+    
+    def handle_batch(self):
+        """Apply several operations with one storage write and report each one's result
+        
+        The body is a JSON list of operations, or an object with the list
+        under "operations". Each has an "op" (enroll, remove_subject,
+        change_password or remove_student) and that operation's fields.
+        """
+        content_length = int(self.headers['Content-Length'])
+        post_data = self.rfile.read(content_length)
+        data = json.loads(post_data.decode('utf-8'))
+        
+        operations = data.get('operations') if isinstance(data, dict) else data
+        
+        try:
+            results = self.mutate(lambda store: apply_operations(store, operations))
+            self.send_json_response({'success': True, 'results': results})
         except Exception as e:
             self.send_json_response({'success': False, 'message': str(e)})
     
     def handle_clear_database(self):
         """Handle database clear"""
         try:
-            self.db.clear()
+            # Through the queue, so writes queued before it aren't persisted after it
+            self.mutate(lambda store: store.clear())
             self.send_json_response({'success': True, 'message': 'Database cleared successfully'})
         except Exception as e:
             self.send_json_response({'success': False, 'message': str(e)})
     
-    def send_json_response(self, data):
-        """Send JSON response"""
+    def send_json_response(self, data, etag=None):
+        """Send JSON response, revalidated by ETag on later requests if one is given"""
+        self.send_json_body(json.dumps(data).encode(), etag)
+    
+    def send_json_body(self, body, etag=None):
+        """Send an already encoded JSON response, revalidated by ETag on later requests if one is given"""
+        encoding = self.negotiate_encoding(len(body))
+        if encoding is not None:
+            body = compress(body, encoding)
         self.send_response(200)
         self.send_header('Content-type', 'application/json')
         self.send_header('Access-Control-Allow-Origin', '*')
+        if etag is not None:
+            self.send_header('ETag', variant_etag(etag, encoding))
+            self.send_header('Cache-Control', 'no-cache')
+        self.send_encoded_body(body, encoding)
+    
+    def send_json_stream(self, chunks, etag=None):
+        """Send a JSON document chunk by chunk as it is produced
+        
+        Uses chunked transfer encoding, or closes the connection to end the
+        body for HTTP/1.0 clients. Each chunk is flushed to the client before
+        the next is produced, so memory stays flat and the first bytes go
+        out as soon as the first batch is encoded.
+        
+        An error before the first chunk propagates to the caller; after it,
+        the body is left unterminated and the connection closed.
+        """
+        # Produce the first chunk before any headers so bad parameters still get a normal error reply
+        first = next(chunks)
+        encoding = accepted_encoding(self.headers.get('Accept-Encoding'))
+        stream = compressor(encoding) if encoding is not None else None
+        chunked = self.request_version != 'HTTP/1.0'
+        
+        self.send_response(200)
+        self.send_header('Content-type', 'application/json')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        if etag is not None:
+            self.send_header('ETag', variant_etag(etag, encoding))
+            self.send_header('Cache-Control', 'no-cache')
+        if encoding is not None:
+            self.send_header('Content-Encoding', encoding)
+        self.send_header('Vary', 'Accept-Encoding')
+        if chunked:
+            self.send_header('Transfer-Encoding', 'chunked')
+        else:
+            self.send_header('Connection', 'close')
+        self.end_headers()
+        
+        try:
+            for chunk in itertools.chain([first], chunks):
+                if stream is not None:
+                    # Sync flush so each batch reaches the client instead of waiting in the compressor
+                    chunk = stream.compress(chunk) + stream.flush(zlib.Z_SYNC_FLUSH)
+                self.write_chunk(chunk, chunked)
+            if stream is not None:
+                self.write_chunk(stream.flush(), chunked)
+        except Exception as e:
+            # The status line has gone out, so an error reply would land inside
+            # the body; cut the body short and close so the client sees it failed
+            self.close_connection = True
+            self.log_error("Streamed response aborted: %s", e)
+            return
+        if chunked:
+            self.wfile.write(b'0\r\n\r\n')
+        self.wfile.flush()
+    
+    def write_chunk(self, data, chunked):
+        """Write and flush one piece of a streamed body"""
+        if not data:
+            return
+        if chunked:
+            data = b'%X\r\n%s\r\n' % (len(data), data)
+        self.wfile.write(data)
+        self.wfile.flush()
+    
+    def send_prepared(self, prepared):
+        """Send a PreparedBody in the best content coding the client accepts"""
+        if self.not_modified(prepared.etag):
+            return
+        encoding, body = prepared.variant(accepted_encoding(self.headers.get('Accept-Encoding')))
+        self.send_response(200)
+        self.send_header('Content-type', prepared.content_type)
+        self.send_header('ETag', variant_etag(prepared.etag, encoding))
+        self.send_header('Cache-Control', PAGE_CACHE_CONTROL)
+        self.send_encoded_body(body, encoding)
+    
+    def send_encoded_body(self, body, encoding):
+        """Finish the headers for a body in the given content coding and send it"""
+        if encoding is not None:
+            self.send_header('Content-Encoding', encoding)
+        self.send_header('Vary', 'Accept-Encoding')
+        self.send_header('Content-Length', str(len(body)))
         self.end_headers()
-        self.wfile.write(json.dumps(data).encode())
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+# Longest the accepting thread waits to read a request it is turning away
+REJECT_READ_SECONDS = 0.05
 
-def run_web_server(port=8000):
-    """Run the web server"""
-    with socketserver.TCPServer(("", port), UniversityWebHandler) as httpd:
-        print(f"University Web GUI running at http://localhost:{port}")
+class PooledHTTPServer(http.server.HTTPServer):
+    """HTTP server handing each connection to a bounded pool of worker threads"""
+    
+    allow_reuse_address = True
+    
+    # The listen backlog; socketserver's default of 5 leaves a burst of clients
+    # retrying SYNs in the kernel instead of reaching admission control
+    request_queue_size = 128
+    
+    def __init__(self, server_address, handler_class, workers=8, keepalive_timeout=5.0, admission=None,
+                 reuse_port=False):
+        # Lets several processes listen on the same port; set before binding
+        self.reuse_port = reuse_port
+        super().__init__(server_address, handler_class)
+        self.workers = workers
+        # A kept-alive connection holds its worker until it goes idle this long
+        self.keepalive_timeout = keepalive_timeout
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='web-worker')
+        # Bounds the connections waiting for a worker; None queues without limit
+        self.admission = admission
+    
+    def server_bind(self):
+        """Bind the listening socket, sharing the port with other processes if reuse_port is set"""
+        if self.reuse_port:
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        super().server_bind()
+    
+    @property
+    def connections_waiting(self):
+        """Connections accepted but still waiting for a worker"""
+        return self.admission.queued if self.admission is not None else 0
+    
+    def process_request(self, request, client_address):
+        """Queue the connection for a worker, or turn it away if the queue is full"""
+        ticket = self.admission.admit() if self.admission is not None else nullcontext()
+        if ticket is None:
+            self.reject_request(request)
+            return
+        self.executor.submit(self.process_request_thread, request, client_address, ticket)
+    
+    def reject_request(self, request):
+        """Answer 503 from the accepting thread without waiting for a worker"""
+        try:
+            # Wait briefly for the request first: closing with it unread, or
+            # before it is sent, resets the connection and loses the reply
+            request.settimeout(REJECT_READ_SECONDS)
+            request.recv(1 << 16)
+            request.sendall(self.admission.busy)
+        except OSError:
+            pass
+        self.shutdown_request(request)
+    
+    def finish_request(self, request, client_address):
+        """Handle the requests on a connection, returning the handler"""
+        return self.RequestHandlerClass(request, client_address, self)
+    
+    def process_request_thread(self, request, client_address, ticket):
+        """Handle one connection on a worker thread"""
+        if self.admission is not None:
+            self.admission.started(ticket)
+        handler = None
+        try:
+            request.settimeout(self.keepalive_timeout)
+            handler = self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            detached = getattr(handler, 'detached', None)
+            if detached is not None:
+                # The handler carries on on a thread of its own and closes the connection when done
+                detached.add_done_callback(lambda _: self.shutdown_request(request))
+            else:
+                self.shutdown_request(request)
+            if self.admission is not None:
+                self.admission.finished()
+    
+    def server_close(self):
+        """Stop accepting connections and wait for in-flight requests"""
+        super().server_close()
+        self.executor.shutdown(wait=True)
+
+# Web server implementations selectable with --server or STUDENT_WEB_SERVER
+SERVERS = {
+    'threaded': PooledHTTPServer,
+    'asyncio': AsyncHTTPServer,
+}
+
+def make_server(port=8000, db=None, workers=None, host="", handler_class=UniversityWebHandler, server=None,
+                keepalive_timeout=None, max_queue=None, reuse_port=False, group_commit=None, max_streams=None):
+    """Create the web server with one SharedStore for all worker threads
+    
+    At most workers requests run at once and max_queue more wait for a
+    worker; the server answers anything beyond that with 503. Event
+    streams don't use the workers; max_streams of them may be open. With
+    reuse_port, other processes may listen on the same port. Given
+    group_commit milliseconds, changes go through a WriteQueue that persists
+    those arriving within that long of each other together.
+    
+    The server's handler_class is the one given, whose class attributes
+    hold the store and queue; stop_background_work(server) ends their work.
+    """
+    if server is None:
+        server = os.environ.get('STUDENT_WEB_SERVER', 'threaded')
+    if server not in SERVERS:
+        raise ValueError(f"Unknown web server {server!r}. Choose from: {', '.join(SERVERS)}")
+    if workers is None:
+        workers = int(os.environ.get('STUDENT_WEB_WORKERS', 8))
+    if db is None:
+        db = open_database()
+    handler_class.database = db if isinstance(db, SharedStore) else SharedStore(db, metrics=handler_class.metrics)
+    if group_commit is None and os.environ.get('STUDENT_GROUP_COMMIT_MS'):
+        group_commit = float(os.environ['STUDENT_GROUP_COMMIT_MS'])
+    handler_class.writes = WriteQueue(handler_class.database, group_commit) if group_commit is not None else None
+    if max_queue is None:
+        max_queue = int(os.environ.get('STUDENT_WEB_MAX_QUEUE', DEFAULT_MAX_QUEUE))
+    if max_streams is None:
+        max_streams = int(os.environ.get('STUDENT_WEB_MAX_STREAMS', DEFAULT_MAX_EVENT_STREAMS))
+    handler_class.event_streams = threading.BoundedSemaphore(max_streams)
+    options = {
+        'workers': workers,
+        'admission': AdmissionControl(workers, max_queue, metrics=handler_class.metrics),
+        'reuse_port': reuse_port,
+    }
+    if keepalive_timeout is None and os.environ.get('STUDENT_WEB_KEEPALIVE'):
+        keepalive_timeout = float(os.environ['STUDENT_WEB_KEEPALIVE'])
+    if keepalive_timeout is not None:
+        options['keepalive_timeout'] = keepalive_timeout
+    httpd = SERVERS[server]((host, port), handler_class, **options)
+    httpd.handler_class = handler_class
+    return httpd
+
+def run_web_server(port=8000, db=None, workers=None, server=None, keepalive_timeout=None, max_queue=None,
+                   processes=None, group_commit=None, max_streams=None):
+    """Run the web server, in processes forked processes sharing the port if more than one"""
+    if processes is None:
+        processes = int(os.environ.get('STUDENT_WEB_PROCESSES', 1))
+    options = {'workers': workers, 'server': server, 'keepalive_timeout': keepalive_timeout, 'max_queue': max_queue,
+               'group_commit': group_commit, 'max_streams': max_streams}
+    if processes > 1:
+        run_prefork_server(port, db, processes, **options)
+        return
+    with make_server(port, db, **options) as httpd:
+        print(f"University Web GUI running at http://localhost:{port} ({describe_server(httpd)})")
         print("Press Ctrl+C to stop the server")
         try:
             httpd.serve_forever()
         except KeyboardInterrupt:
             print("\nServer stopped")
+        finally:
+            stop_background_work(httpd)
+
+def stop_background_work(httpd):
+    """End a server's open event streams and persist its queued writes, before it closes"""
+    handler_class = httpd.handler_class
+    # Event streams would otherwise keep shutdown waiting out their lifetime
+    handler_class.database.changes.close()
+    if handler_class.writes is not None:
+        handler_class.writes.close()
+
+def describe_server(httpd):
+    """One-line summary of a server's configuration"""
+    summary = (f"{type(httpd).__name__}, {httpd.workers} worker threads, "
+               f"{httpd.admission.max_queue} queued requests, {httpd.keepalive_timeout:g}s keep-alive")
+    writes = httpd.handler_class.writes
+    if writes is not None:
+        summary += f", group commit every {writes.delay_ms:g} ms"
+    return summary
+
+def run_prefork_server(port, db, processes, host="", **options):
+    """Serve from processes forked workers, each with its own server and store, on one port
+    
+    The kernel spreads connections across the workers, so JSON encoding and
+    page rendering use as many cores as there are processes. Each worker
+    keeps its own cache of the data; writes are serialized across workers
+    by the backend's write lock, and every worker reloads when the data file
+    or data version changes. Store epochs, change feeds and metrics are per
+    worker, so ETags and event ids from one worker don't match another's.
+    """
+    if db is None:
+        db = open_database()
+    if isinstance(db, SharedStore):
+        db = db.db
+    if isinstance(db, MemoryDatabase):
+        raise ValueError("Multiple processes need a persistent storage backend; "
+                         "with memory storage each process would have its own data")
+    if hasattr(db, 'close'):
+        db.close()  # Connections must not be shared across the fork
+    reserved = reserve_port(host, port)
+    port = reserved.getsockname()[1]
+    
+    def make_worker_server():
+        httpd = make_server(port, db, host=host, reuse_port=True, **options)
+        print(f"Worker process {os.getpid()}: {describe_server(httpd)}")
+        return httpd
+    
+    print(f"University Web GUI running at http://localhost:{port} ({processes} processes)")
+    print("Press Ctrl+C to stop the server")
+    try:
+        run_workers(processes, make_worker_server, stop_background_work)
+    finally:
+        reserved.close()
+    print("\nServer stopped")
+
+def parse_args(argv=None):
+    """Parse web server command line options"""
+    parser = argparse.ArgumentParser(description="University Web GUI")
+    parser.add_argument('--port', type=int, default=8000, help="port to listen on (default: 8000)")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="worker threads (default: $STUDENT_WEB_WORKERS or 8)")
+    parser.add_argument('--server', choices=sorted(SERVERS), default=None,
+                        help="server implementation (default: $STUDENT_WEB_SERVER or threaded)")
+    parser.add_argument('--keepalive-timeout', type=float, default=None, metavar='SECONDS',
+                        help="close connections idle this long "
+                             "(default: $STUDENT_WEB_KEEPALIVE, or 5 threaded / 60 asyncio)")
+    parser.add_argument('--max-queue', type=int, default=None,
+                        help="requests that may wait for a worker before the rest get 503 "
+                             f"(default: $STUDENT_WEB_MAX_QUEUE or {DEFAULT_MAX_QUEUE})")
+    parser.add_argument('--max-streams', type=int, default=None,
+                        help="admin page event streams open at once, each on its own thread "
+                             f"(default: $STUDENT_WEB_MAX_STREAMS or {DEFAULT_MAX_EVENT_STREAMS})")
+    parser.add_argument('--processes', type=int, default=None,
+                        help="server processes sharing the port, each with its own worker threads "
+                             "(default: $STUDENT_WEB_PROCESSES or 1)")
+    parser.add_argument('--group-commit', type=float, default=None, metavar='MS',
+                        help="queue changes and persist those made within MS milliseconds of each other "
+                             "together (default: $STUDENT_GROUP_COMMIT_MS, or persist each change on its own)")
+    return parser.parse_args(argv)
 
 if __name__ == "__main__":
-    run_web_server()
+    args = parse_args()
+    run_web_server(args.port, workers=args.workers, server=args.server, keepalive_timeout=args.keepalive_timeout,
+                   max_queue=args.max_queue, processes=args.processes, group_commit=args.group_commit,
+                   max_streams=args.max_streams)
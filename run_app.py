@@ -4,11 +4,63 @@ University Student System Launcher
 Choose between CLI and GUI interfaces
 """
 
+import argparse
 import sys
 import os
 
+sys.path.append(os.path.join(os.path.dirname(__file__), 'cliuniapp'))
+
+def parse_args(argv=None):
+    """Parse launcher command line options"""
+    # Choices come from the registries so new backends and servers are listed automatically
+    from models.backends import DEFAULT_BACKEND, backend_names
+    from cliuniapp.web_gui import SERVERS
+    parser = argparse.ArgumentParser(description="University Student System Launcher")
+    parser.add_argument('--storage', default=None,
+                        help=f"storage backend: {', '.join(backend_names())} "
+                             f"(default: $STUDENT_STORAGE or {DEFAULT_BACKEND})")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="web server worker threads (default: $STUDENT_WEB_WORKERS or 8)")
+    parser.add_argument('--server', choices=sorted(SERVERS), default=None,
+                        help="web server implementation (default: $STUDENT_WEB_SERVER or threaded)")
+    parser.add_argument('--keepalive-timeout', type=float, default=None, metavar='SECONDS',
+                        help="close web connections idle this long (default: $STUDENT_WEB_KEEPALIVE)")
+    parser.add_argument('--max-queue', type=int, default=None,
+                        help="web requests that may wait for a worker before the rest get 503 "
+                             "(default: $STUDENT_WEB_MAX_QUEUE or 64)")
+    parser.add_argument('--max-streams', type=int, default=None,
+                        help="admin page event streams open at once (default: $STUDENT_WEB_MAX_STREAMS or 100)")
+    parser.add_argument('--processes', type=int, default=None,
+                        help="web server processes sharing the port (default: $STUDENT_WEB_PROCESSES or 1)")
+    parser.add_argument('--group-commit', type=float, default=None, metavar='MS',
+                        help="persist web changes made within MS milliseconds of each other together "
+                             "(default: $STUDENT_GROUP_COMMIT_MS, or off)")
+    parser.add_argument('--migrate-from', metavar='PICKLE_FILE',
+                        help="import students from a pickle data file into the sqlite database, then exit")
+    return parser.parse_args(argv)
+
 def main():
     """Main launcher function"""
+    args = parse_args()
+    
+    if args.migrate_from:
+        from models.sqlite_database import SqliteDatabase
+        db = SqliteDatabase()
+        try:
+            count = db.import_pickle(args.migrate_from)
+        except FileNotFoundError as e:
+            print(f"Error: {e}")
+            return
+        print(f"Imported {count} students from {args.migrate_from} into {db.file_path}")
+        return
+    
+    from models.backends import open_database
+    try:
+        db = open_database(args.storage)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return
+    
     print("=" * 50)
     print("University Student System")
     print("=" * 50)
@@ -28,18 +80,16 @@ def main():
                 print("\nStarting CLI interface...")
                 print("-" * 30)
                 # Import and run CLI app
-                sys.path.append(os.path.join(os.path.dirname(__file__), 'cliuniapp'))
                 from cliuniapp.app import main as cli_main
-                cli_main()
+                cli_main(db)
                 break
                 
             elif choice == '2':
                 print("\nStarting Desktop GUI interface...")
                 try:
                     # Import and run GUI app
-                    sys.path.append(os.path.join(os.path.dirname(__file__), 'cliuniapp'))
                     from cliuniapp.gui_app import UniversityGUI
-                    app = UniversityGUI()
+                    app = UniversityGUI(db)
                     app.run()
                     break
                 except ImportError as e:
@@ -52,9 +102,11 @@ def main():
                 print("The web interface will open in your browser at http://localhost:8000")
                 print("Press Ctrl+C to stop the server")
                 # Import and run Web GUI app
-                sys.path.append(os.path.join(os.path.dirname(__file__), 'cliuniapp'))
                 from cliuniapp.web_gui import run_web_server
-                run_web_server()
+                run_web_server(db=db, workers=args.workers, server=args.server,
+                               keepalive_timeout=args.keepalive_timeout, max_queue=args.max_queue,
+                               processes=args.processes, group_commit=args.group_commit,
+                               max_streams=args.max_streams)
                 break
                 
             elif choice == '4':